@@ -1,13 +1,465 @@
-from flask import Flask, request, send_file, jsonify, Response
-from ultralytics import YOLO
-from PIL import Image
-import io
+from flask import Flask, request, send_file, jsonify, Response, stream_with_context, g
+import os
+import json
+import time
+
+INICIO = time.perf_counter()
+
+import base64
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import numpy as np
+from batching import MicroBatcher, BATCH_MAX_SIZE, PRIORIDADES, Sobrecarga
+from decoding import decodificar_imagem, ImagemInvalida, ImagemGrande, UPLOAD_DECODE_SIZE, UPLOAD_MAX_BYTES
+from result_cache import ResultCache
+from interface_modelo.armazenamento import abrir_armazem
+from interface_modelo.backends import CarregadorModelo
+from interface_modelo.busca_filtros import BuscaFiltros, normalizar_criterio, resumo_busca
+from interface_modelo.codificacao import (codificar_imagem, codificadores_escolhidos, normalizar_formato, negociar_formato,
+                                          FormatoInvalido, OUTPUT_FORMAT, OUTPUT_QUALITY, OUTPUT_MAX_SIZE, OUTPUT_PREVIEW_SIZE)
+from interface_modelo.desenho import desenhar_deteccoes, arrays_resultado, contar_classes
+from interface_modelo.fatiamento import inferencia_fatiada, TAMANHO_FATIA, SOBREPOSICAO
+from interface_modelo.filtros import obter_pipeline, FILTROS
+from interface_modelo.metricas import Metricas, SERVER_TIMING
+from streaming import StreamRegistry, FonteNaoPermitida
 
 app = Flask(__name__)
 
-# Carrega o modelo
-model = YOLO("best.pt")
+# Carrega o modelo com o backend de CPU mais rápido (PyTorch, TorchScript, ONNX Runtime ou OpenVINO)
+# em segundo plano e aquece com uma imagem 640x640: importar o app não espera o ultralytics nem o modelo,
+# e /health só responde 200 depois do aquecimento (as requisições que chegarem antes esperam o carregamento)
+MODEL_PATH = "best.pt"
+carregador = CarregadorModelo(MODEL_PATH).iniciar()
+
+# Agrupa requisições concorrentes em uma única inferência em lote
+# Apenas a thread do agrupador chama o modelo, então ele nunca é usado em paralelo
+batcher = MicroBatcher(lambda imagens, parametros: carregador.modelo(imagens, **dict(parametros or ())))
+
+# Pipelines de vídeo ao vivo; os quadros passam pelo mesmo agrupador das requisições de imagem
+streams = StreamRegistry(
+    inferir=lambda quadro: batcher.submit(quadro),
+    desenhar=lambda quadro, resultado: desenhar_deteccoes(quadro, *arrays_resultado(resultado), carregador.class_names)[0],
+)
+
+# Busca automática da melhor combinação de filtros (filters=auto); as versões da imagem passam pelo
+# agrupador em blocos do tamanho do lote, então uma busca não ocupa a fila inteira
+busca_filtros = BuscaFiltros(lote=BATCH_MAX_SIZE)
+
+# Cache de resultados pelo hash do arquivo enviado (invalidado quando o best.pt muda)
+cache = ResultCache(MODEL_PATH)
+
+# Armazenamento das detecções para consultas de contagem por classe ao longo do tempo
+# (SQLite em DETECTION_STORE, gravado em segundo plano; None quando desligado)
+armazem = abrir_armazem()
+
+# Latência por etapa, contadores e memória do processo, exportados em /metrics (METRICS_ENABLED=0 desliga)
+# Com o gunicorn, cada worker tem as próprias métricas: o Prometheus vê o worker que atendeu a coleta
+metricas = Metricas()
+
+# Medidores do agrupador e do cache incluídos no /metrics
+def medidores_servidor():
+    fila = batcher.stats()
+    medidores = {'batch_queue_depth': fila['queue_depth']}
+    medidores.update({f'batch_rejected_{motivo}': n for motivo, n in fila['rejected'].items()})
+    medidores.update({f'cache_{nome}': n for nome, n in cache.stats().items()
+                      if isinstance(n, (int, float)) and not isinstance(n, bool)})
+    if armazem is not None:
+        medidores.update({f'store_{nome}': n for nome, n in armazem.stats().items() if isinstance(n, (int, float))})
+    return medidores
+
+metricas.registrar_coletor(medidores_servidor)
+
+# Estado do processo consultado por /health e /stats/startup (o modelo é acompanhado pelo carregador)
+estado = {'pid': os.getpid(), 'import_s': None}
+
+# Backends cujo runtime cria as próprias threads ao carregar a sessão (elas não sobrevivem ao fork),
+# então cada worker do gunicorn recarrega o modelo exportado em vez de herdar o do processo mestre
+BACKENDS_RECARREGAR = ('onnx', 'openvino', 'openvino_int8')
+
+# Função chamada em cada worker do gunicorn após o fork: ajusta as threads do PyTorch para a parte
+# dos núcleos deste worker, recarrega o modelo se o backend não puder ser compartilhado e aquece de novo
+# O processo mestre espera o carregamento antes do fork (when_ready em gunicorn.conf.py)
+def preparar_worker(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    estado['pid'] = os.getpid()
+    if carregador.info.get('backend') in BACKENDS_RECARREGAR:
+        carregador.recarregar()
+    else:
+        carregador.reaquecer()
+
+# Número máximo de imagens de um envio em lote sendo decodificadas/inferidas ao mesmo tempo
+# Só essas imagens ficam em memória; as demais são lidas do envio (ou do zip) conforme as anteriores terminam
+UPLOAD_BATCH_WINDOW = int(os.environ.get('UPLOAD_BATCH_WINDOW', str(2 * BATCH_MAX_SIZE)))
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp')
+
+# Função para montar a lista compacta de detecções e a contagem por classe a partir dos arrays
+def montar_deteccoes(xyxy, confs, classes):
+    xyxy = np.asarray(xyxy).round(1)
+    confs = np.asarray(confs).round(4)
+    classes = np.asarray(classes).astype(int)
+    class_names = carregador.class_names
+
+    detections = [
+        {'class_id': int(c), 'class': class_names[int(c)], 'confidence': float(p), 'box': caixa.tolist()}
+        for caixa, p, c in zip(xyxy, confs, classes)
+    ]
+    return detections, contar_classes(classes, class_names)
+
+# Função para ler os parâmetros opcionais de inferência (conf e imgsz) do formulário ou da query string
+# Retorna a chave de parâmetros usada pelo agrupador e pelo cache (ou None para o padrão do modelo)
+def parametros_inferencia():
+    parametros = []
+    conf = request.values.get('conf')
+    if conf:
+        conf = float(conf)
+        if conf > 1:
+            conf = conf / 100  # Aceita porcentagem, como no campo da interface
+        parametros.append(('conf', conf))
+    imgsz = request.values.get('imgsz')
+    if imgsz:
+        parametros.append(('imgsz', int(imgsz)))
+    return tuple(parametros) or None
+
+# Nomes aceitos no parâmetro filters (inglês ou os nomes da interface)
+NOMES_FILTROS = {
+    'clahe': 'equalizacao', 'equalize': 'equalizacao', 'bilateral': 'suavizacao', 'smooth': 'suavizacao',
+    'sharpen': 'nitidez', 'brightness': 'brilho', 'normalize': 'normalizacao',
+}
+
+# Valor de filters que pede a busca automática da melhor combinação de filtros
+FILTROS_AUTO = 'auto'
+
+# Função para ler os filtros de pré-processamento pedidos (ex.: filters=clahe,sharpen)
+# filters=auto procura a melhor combinação (filter_score=stability ou confidence escolhe o critério)
+# Retorna a tupla de opções na ordem de FILTROS, (FILTROS_AUTO, critério) ou None quando nenhum filtro foi pedido
+def parametros_filtros():
+    texto = request.values.get('filters', '')
+    if texto.strip().lower() == FILTROS_AUTO:
+        if request.values.get('sliced', '').lower() in ('1', 'true', 'yes'):
+            raise ValueError('filters=auto não pode ser combinado com sliced=1')
+        return FILTROS_AUTO, normalizar_criterio(request.values.get('filter_score') or busca_filtros.criterio)
+    nomes = {NOMES_FILTROS.get(n.strip().lower(), n.strip().lower()) for n in texto.split(',') if n.strip()}
+    if not nomes:
+        return None
+    if not nomes <= set(FILTROS):
+        raise ValueError(f'Filtros desconhecidos: {sorted(nomes - set(FILTROS))}')
+    return tuple(nome in nomes for nome in FILTROS)
+
+# Função para ler a prioridade (priority ou cabeçalho X-Priority: interactive/batch) e o prazo da requisição
+# (deadline_ms ou cabeçalho X-Request-Deadline-Ms, contado a partir de agora)
+# Retorna a prioridade e o prazo absoluto (time.perf_counter()) ou None para o prazo padrão do agrupador
+def parametros_admissao(prioridade_padrao=PRIORIDADES[0]):
+    prioridade = (request.values.get('priority') or request.headers.get('X-Priority') or prioridade_padrao).lower()
+    if prioridade not in PRIORIDADES:
+        raise ValueError(f'Prioridade desconhecida: {prioridade}')
+    prazo_ms = request.values.get('deadline_ms') or request.headers.get('X-Request-Deadline-Ms')
+    prazo = time.perf_counter() + float(prazo_ms) / 1000.0 if prazo_ms else None
+    return prioridade, prazo
+
+# Função para ler os parâmetros da inferência fatiada (sliced=1, tile e overlap)
+# Retorna (tamanho da fatia, sobreposição) ou None quando a inferência fatiada não foi pedida
+def parametros_fatiamento():
+    if request.values.get('sliced', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    tamanho = int(request.values.get('tile') or TAMANHO_FATIA)
+    sobreposicao = float(request.values.get('overlap') or SOBREPOSICAO)
+    if tamanho < 32 or not 0 <= sobreposicao < 1:
+        raise ValueError('tile/overlap fora do intervalo')
+    return tamanho, sobreposicao
+
+# Função para ler a fonte das detecções gravadas no armazenamento (source ou cabeçalho X-Source, ex.: o
+# canteiro de obras; padrão "api"); store=0 não grava esta requisição
+# Retorna o nome da fonte ou None quando nada deve ser gravado
+def parametros_armazenamento():
+    if armazem is None or request.values.get('store', '').lower() in ('0', 'false', 'no'):
+        return None
+    return request.values.get('source') or request.headers.get('X-Source') or 'api'
+
+# Saída padrão da imagem anotada: (formato, qualidade, lado máximo)
+SAIDA_PADRAO = (OUTPUT_FORMAT, OUTPUT_QUALITY, OUTPUT_MAX_SIZE)
+
+# Função para ler o formato da imagem anotada (format=jpeg/webp/png ou o cabeçalho Accept), a qualidade
+# (quality, 1-100) e o lado máximo (max_size; preview=1 usa OUTPUT_PREVIEW_SIZE)
+# Retorna a tupla (formato, qualidade, lado máximo)
+def parametros_saida():
+    formato = request.values.get('format')
+    formato = normalizar_formato(formato) if formato else negociar_formato(request.headers.get('Accept'))
+    qualidade = int(request.values.get('quality') or OUTPUT_QUALITY)
+    lado_maximo = request.values.get('max_size')
+    if not lado_maximo and request.values.get('preview', '').lower() in ('1', 'true', 'yes'):
+        lado_maximo = OUTPUT_PREVIEW_SIZE
+    lado_maximo = int(lado_maximo or OUTPUT_MAX_SIZE)
+    if not 1 <= qualidade <= 100 or lado_maximo < 0:
+        raise ValueError('quality/max_size fora do intervalo')
+    return formato, qualidade, lado_maximo
+
+# Função para inferir as fatias pelo agrupador, que junta as fatias em lotes (e com outras requisições)
+def inferir_fatias(imagens, parametros, prioridade=PRIORIDADES[0], prazo=None):
+    futuros = [batcher.submit_async(img, parametros, prioridade, prazo) for img in imagens]
+    return [futuro.result() for futuro in futuros]
+
+# Função para decodificar, inferir e (opcionalmente) desenhar o resultado de um arquivo enviado
+# Acertos no cache pulam a decodificação, a inferência e a codificação
+# A imagem é decodificada já perto do tamanho do modelo (UPLOAD_DECODE_SIZE ou imgsz) e as caixas voltam
+# para as coordenadas da imagem original; a imagem anotada sai no tamanho decodificado
+# Com fatias=(tamanho, sobreposição) a imagem é decodificada e inferida em resolução total, fatia por fatia
+# prioridade e prazo: controle de admissão do agrupador (lança Sobrecarga se a fila não comportar o pedido)
+# saida: (formato, qualidade, lado máximo) da imagem anotada; as detecções ficam sempre na resolução original
+# Retorna a entrada com detections, counts, image_size, timing, image (bytes codificados ou None) e encoding
+# timing traz os tempos desta requisição: no acerto do cache, só {'cache': 'hit', 'lookup_ms': ...}
+def inferir_arquivo(data, parametros=None, com_imagem=False, fatias=None, filtros=None, prioridade=PRIORIDADES[0], prazo=None,
+                    saida=SAIDA_PADRAO):
+    tamanho_decodificacao = None if fatias or not UPLOAD_DECODE_SIZE else max(UPLOAD_DECODE_SIZE, dict(parametros or ()).get('imgsz', 0))
+    extras = ((('sliced', fatias),) if fatias else ()) + ((('filters', filtros),) if filtros else ()) + \
+        ((('decode', tamanho_decodificacao),) if tamanho_decodificacao else ()) + \
+        ((('output', saida),) if com_imagem and saida != SAIDA_PADRAO else ())
+    inicio_consulta = time.perf_counter()
+    with metricas.etapa('cache_lookup'):
+        chave = cache.key(data, (parametros or ()) + extras)
+        campos = ('detections', 'image') if com_imagem else ('detections',)
+        entrada = cache.get(chave, campos)
+    if entrada is not None:
+        metricas.contar('images', cache='hit')
+        # Os tempos são desta requisição: em um acerto não houve decodificação nem inferência
+        consulta_ms = round((time.perf_counter() - inicio_consulta) * 1000, 3)
+        return dict(entrada, timing={'cache': 'hit', 'lookup_ms': consulta_ms})
+    metricas.contar('images', cache='miss')
+
+    # Recusa logo, antes de decodificar, se a fila de inferência não comporta o pedido
+    batcher.verificar(prioridade, prazo)
+
+    # Decodifica a imagem já reduzida e com a orientação EXIF aplicada, em BGR: o ultralytics lê arrays
+    # NumPy como BGR (igual aos quadros do stream e à interface), e os filtros, o desenho e o codificador
+    # trabalham na mesma ordem de canais, sem conversões
+    with metricas.etapa('decode'):
+        image_np, decodificacao = decodificar_imagem(data, tamanho_decodificacao, bgr=True)
+    largura, altura = decodificacao['original_size']
+    escala = decodificacao['scale']
+
+    tempos_filtros = busca = None
+    if filtros and filtros[0] == FILTROS_AUTO:
+        # Busca da melhor combinação de filtros: as versões da imagem vão em lote pelo agrupador e a melhor
+        # segue como se tivesse sido pedida; o orçamento não passa do prazo da requisição
+        orcamento_ms = busca_filtros.orcamento_ms
+        if prazo is not None:
+            orcamento_ms = min(orcamento_ms, (prazo - time.perf_counter()) * 1000)
+        with metricas.etapa('filter_search'):
+            busca = busca_filtros.buscar(
+                image_np, lambda imagens: inferir_fatias(imagens, parametros, prioridade, prazo),
+                conf_min=dict(parametros or ()).get('conf', 0.25), criterio=filtros[1], orcamento_ms=orcamento_ms)
+        image_np = busca['image']
+        metricas.contar('filter_search_variants', busca['evaluated'])
+    elif filtros:
+        # Pré-processamento com os mesmos filtros da interface (cópia: o buffer do pipeline é reaproveitado)
+        with metricas.etapa('filters'):
+            pipeline = obter_pipeline(*filtros)
+            image_np = pipeline(image_np).copy()
+        tempos_filtros = pipeline.tempos
+
+    if fatias:
+        with metricas.etapa('inference'):
+            caixas, confs, classes, timing = inferencia_fatiada(
+                lambda imagens: inferir_fatias(imagens, parametros, prioridade, prazo), image_np, tamanho=fatias[0], sobreposicao=fatias[1])
+        for nome in ('slice', 'merge'):
+            metricas.observar(nome, timing[nome + '_ms'] / 1000)
+    else:
+        if busca is not None:
+            # A melhor versão já foi inferida na busca
+            result = busca['result']
+        else:
+            # Inferencia do Resultado (agrupada com outras requisições simultâneas)
+            # "inference" inclui a espera na fila; o tempo do modelo em si vem do Results.speed
+            with metricas.etapa('inference'):
+                result = batcher.submit(image_np, parametros, prioridade=prioridade, prazo=prazo)
+        caixas, confs, classes = arrays_resultado(result)
+        timing = {k + '_ms': round(v, 3) for k, v in result.speed.items()}
+        for nome, ms in result.speed.items():
+            metricas.observar('model_' + nome, ms / 1000)
+    detections, counts = montar_deteccoes(caixas / escala, confs, classes)
+
+    image = codificacao = None
+    if com_imagem:
+        # Desenha na própria imagem decodificada (sem results[0].plot() e sem cópias)
+        with metricas.etapa('render'):
+            anotada, _ = desenhar_deteccoes(image_np, caixas, confs, classes, carregador.class_names)
+        with metricas.etapa('encode'):
+            image, codificacao = codificar_imagem(anotada, *saida, bgr=True)
+        metricas.contar('encoded_bytes', codificacao['bytes'], format=codificacao['format'])
+
+    timing = dict(timing, cache='miss', decode_ms=decodificacao['decode_ms'], decoded_size=decodificacao['decoded_size'])
+    if tempos_filtros:
+        timing = dict(timing, filters=tempos_filtros)
+    if busca is not None:
+        timing = dict(timing, filter_search=resumo_busca(busca))
+
+    entrada = {
+        'detections': detections,
+        'counts': counts,
+        'image_size': [largura, altura],
+        'timing': timing,
+        'image': image,
+        'encoding': codificacao,
+        'filters': busca['filters'] if busca is not None else None,
+    }
+    # Os tempos valem só para esta requisição e não vão para o cache
+    cache.put(chave, **{campo: valor for campo, valor in entrada.items() if campo != 'timing'})
+    return entrada
+
+# Função para montar a resposta JSON de um arquivo (usada por /upload e /upload-batch)
+def resposta_deteccoes(nome, entrada, renderizar=False):
+    resposta = {
+        'filename': nome,
+        'image_size': entrada['image_size'],
+        'detections': entrada['detections'],
+        'counts': entrada['counts'],
+        'total': len(entrada['detections']),
+        'timing': entrada.get('timing'),
+    }
+    if entrada.get('filters') is not None:
+        resposta['filters'] = entrada['filters']  # Combinação escolhida pela busca automática (filters=auto)
+
+    if renderizar:
+        codificacao = entrada.get('encoding') or {'mimetype': 'image/jpeg'}
+        resposta['image'] = base64.b64encode(entrada['image']).decode('ascii')
+        resposta['image_mimetype'] = codificacao['mimetype']
+        resposta['encoding'] = codificacao
+    return resposta
+
+# Função para percorrer os arquivos de um envio em lote, um de cada vez
+# Arquivos .zip são abertos e suas imagens lidas uma a uma (sem extrair o zip inteiro)
+# arquivos: lista de (nome, arquivo aberto) de copiar_envio
+# Gera (nome, bytes) ou (nome, None) para arquivos que não puderam ser lidos
+def iterar_arquivos(arquivos):
+    for nome_arquivo, arquivo in arquivos:
+        if nome_arquivo.lower().endswith('.zip'):
+            try:
+                with zipfile.ZipFile(arquivo) as zip_envio:
+                    for info in zip_envio.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(EXTENSOES_IMAGEM):
+                            continue
+                        if UPLOAD_MAX_BYTES and info.file_size > UPLOAD_MAX_BYTES:
+                            yield f'{nome_arquivo}/{info.filename}', None  # Não descompacta membros acima do limite
+                        else:
+                            yield f'{nome_arquivo}/{info.filename}', zip_envio.read(info)
+            except zipfile.BadZipFile:
+                yield nome_arquivo, None
+        else:
+            yield nome_arquivo, arquivo.read()
+
+# Tamanho até o qual a cópia de um arquivo enviado fica em memória (acima dele vai para um arquivo temporário)
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Função para copiar os arquivos de um envio em lote para arquivos temporários do próprio app
+# A resposta em streaming é gerada depois que o Flask encerra a requisição, que fecha os FileStorage
+# do multipart; as cópias continuam abertas até o gerador terminar (fechar_envio)
+# Retorna a lista de (nome, arquivo aberto no início)
+def copiar_envio(arquivos):
+    copias = []
+    try:
+        for arquivo in arquivos:
+            if not arquivo.filename:
+                continue
+            copia = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+            copias.append((arquivo.filename, copia))
+            shutil.copyfileobj(arquivo.stream, copia)
+            copia.seek(0)
+    except BaseException:
+        fechar_envio(copias)
+        raise
+    return copias
+
+# Função para fechar as cópias de um envio em lote
+def fechar_envio(copias):
+    for _, copia in copias:
+        copia.close()
+
+# Função para processar os arquivos de um envio em lote com no máximo `janela` imagens em andamento
+# As imagens em andamento passam juntas pelo agrupador, que as infere em lotes
+# Cada imagem tem o prazo padrão do agrupador contado a partir do seu envio; imagens recusadas por
+# sobrecarga voltam com error e retry_after para o cliente reenviar só essas
+# arquivos: cópias de copiar_envio, fechadas quando o gerador termina
+# Gera uma linha NDJSON por imagem na ordem em que terminam e uma linha final com o resumo
+def processar_envio(arquivos, parametros, renderizar, fatias, filtros, prioridade='batch', janela=UPLOAD_BATCH_WINDOW,
+                    saida=SAIDA_PADRAO, fonte=None):
+    inicio = time.perf_counter()
+    total = erros = 0
+
+    def processar(indice, nome, data):
+        if data is None:
+            return {'index': indice, 'filename': nome, 'error': 'Invalid zip archive or file too large'}
+        try:
+            entrada = inferir_arquivo(data, parametros, com_imagem=renderizar, fatias=fatias, filtros=filtros,
+                                      prioridade=prioridade, saida=saida)
+        except Sobrecarga as e:
+            return {'index': indice, 'filename': nome, 'error': str(e), 'retry_after': e.retry_after}
+        except Exception as e:
+            return {'index': indice, 'filename': nome, 'error': str(e)}
+        if fonte:
+            armazem.registrar(fonte, entrada['detections'])
+        return dict(resposta_deteccoes(nome, entrada, renderizar), index=indice)
+
+    def concluidos(em_andamento):
+        nonlocal total, erros
+        prontos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+        linhas = [futuro.result() for futuro in prontos]
+        total += len(linhas)
+        erros += sum('error' in linha for linha in linhas)
+        return em_andamento, ''.join(json.dumps(linha) + '\n' for linha in linhas)
+
+    try:
+        with ThreadPoolExecutor(max(1, janela), thread_name_prefix='upload-batch') as executor:
+            em_andamento = set()
+            for indice, (nome, data) in enumerate(iterar_arquivos(arquivos)):
+                em_andamento.add(executor.submit(processar, indice, nome, data))
+                if len(em_andamento) >= janela:
+                    em_andamento, linhas = concluidos(em_andamento)
+                    yield linhas
+            while em_andamento:
+                em_andamento, linhas = concluidos(em_andamento)
+                yield linhas
+    finally:
+        fechar_envio(arquivos)
+
+    duracao = time.perf_counter() - inicio
+    yield json.dumps({'done': True, 'images': total, 'errors': erros, 'seconds': round(duracao, 3),
+                      'images_per_second': round(total / duracao, 2) if duracao else 0.0}) + '\n'
+
+# Início de cada requisição: guarda os tempos das etapas desta requisição e lê o multipart
+# (o Flask só lê o corpo no primeiro acesso a request.files, então a leitura é medida aqui)
+@app.before_request
+def iniciar_metricas():
+    if not metricas.ativo:
+        return
+    metricas.iniciar_requisicao()
+    g.inicio_requisicao = time.perf_counter()
+    if request.mimetype == 'multipart/form-data':
+        with metricas.etapa('multipart'):
+            request.files
+
+# Fim da requisição: conta a requisição por rota e status e, se pedido, devolve os tempos no Server-Timing
+# (SERVER_TIMING=1 ou ?server_timing=1)
+@app.after_request
+def finalizar_metricas(resposta):
+    if not metricas.ativo or 'inicio_requisicao' not in g:
+        return resposta
+    metricas.observar('request', time.perf_counter() - g.inicio_requisicao)
+    metricas.contar('requests', endpoint=request.endpoint or 'unknown', status=resposta.status_code)
+    tempos = metricas.tempos_requisicao()
+    if SERVER_TIMING or request.args.get('server_timing', '').lower() in ('1', 'true', 'yes'):
+        resposta.headers['Server-Timing'] = Metricas.server_timing(tempos)
+    return resposta
+
+# Pedidos recusados pelo controle de admissão: 429 (fila cheia) ou 503 (prazo inviável) com Retry-After
+@app.errorhandler(Sobrecarga)
+def sobrecarga(erro):
+    resposta = jsonify({'error': str(erro), 'retry_after': erro.retry_after})
+    resposta.status_code = erro.status
+    resposta.headers['Retry-After'] = str(erro.retry_after)
+    return resposta
 
 @app.route('/process-image', methods=['POST'])
 def process_image():
@@ -18,25 +470,203 @@ def process_image():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    # Ler o arquivo da Imagem
-    image = Image.open(file.stream)
+    try:
+        parametros = parametros_inferencia()
+        fatias = parametros_fatiamento()
+        filtros = parametros_filtros()
+        prioridade, prazo = parametros_admissao()
+        saida = parametros_saida()
+        fonte = parametros_armazenamento()
+    except ValueError:
+        return jsonify({'error': 'Invalid conf, imgsz, tile, overlap, filters, filter_score, priority, deadline, format, quality or max_size value'}), 400
+
+    # Ler o arquivo da Imagem, fazer a inferência e codificar o resultado (ou reaproveitar do cache)
+    try:
+        entrada = inferir_arquivo(file.read(), parametros, com_imagem=True, fatias=fatias, filtros=filtros,
+                                  prioridade=prioridade, prazo=prazo, saida=saida)
+    except ImagemInvalida as e:
+        return jsonify({'error': str(e)}), 413 if isinstance(e, ImagemGrande) else 400
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 406
+    if fonte:
+        armazem.registrar(fonte, entrada['detections'])
+
+    # Formato, codificador e tempo de codificação nos cabeçalhos (o tamanho vai no Content-Length)
+    codificacao = entrada.get('encoding') or {'mimetype': 'image/jpeg'}
+    resposta = Response(entrada['image'], mimetype=codificacao['mimetype'])
+    resposta.headers['Vary'] = 'Accept'
+    if 'encoder' in codificacao:
+        resposta.headers['X-Image-Encoder'] = codificacao['encoder']
+        resposta.headers['X-Encode-Ms'] = str(codificacao['encode_ms'])
+    if entrada.get('filters') is not None:
+        resposta.headers['X-Filters'] = ','.join(entrada['filters']) or 'none'
+    return resposta
+
+# Detecções em JSON, sem desenhar nem recodificar a imagem
+# Use render=1 para receber também a imagem anotada em base64 (format/quality/max_size ou preview=1 para uma
+# prévia reduzida; as detecções continuam na resolução original)
+@app.route('/upload', methods=['POST'])
+def upload():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    try:
+        parametros = parametros_inferencia()
+        fatias = parametros_fatiamento()
+        filtros = parametros_filtros()
+        prioridade, prazo = parametros_admissao()
+        saida = parametros_saida()
+        fonte = parametros_armazenamento()
+    except ValueError:
+        return jsonify({'error': 'Invalid conf, imgsz, tile, overlap, filters, filter_score, priority, deadline, format, quality or max_size value'}), 400
+
+    renderizar = request.values.get('render', '').lower() in ('1', 'true', 'yes')
+    try:
+        entrada = inferir_arquivo(file.read(), parametros, com_imagem=renderizar, fatias=fatias, filtros=filtros,
+                                  prioridade=prioridade, prazo=prazo, saida=saida)
+    except ImagemInvalida as e:
+        return jsonify({'error': str(e)}), 413 if isinstance(e, ImagemGrande) else 400
+    except FormatoInvalido as e:
+        return jsonify({'error': str(e)}), 406
+    if fonte:
+        armazem.registrar(fonte, entrada['detections'])
+
+    return jsonify(resposta_deteccoes(file.filename, entrada, renderizar))
+
+# Várias imagens (campos `file` repetidos e/ou arquivos .zip) em uma única requisição
+# Os resultados voltam em NDJSON (uma linha por imagem, na ordem em que terminam) enquanto as demais são processadas
+@app.route('/upload-batch', methods=['POST'])
+def upload_batch():
+    arquivos = request.files.getlist('file') + request.files.getlist('files')
+    if not any(arquivo.filename for arquivo in arquivos):
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    try:
+        parametros = parametros_inferencia()
+        fatias = parametros_fatiamento()
+        filtros = parametros_filtros()
+        prioridade, _ = parametros_admissao(prioridade_padrao='batch')
+        saida = parametros_saida()
+    except ValueError:
+        return jsonify({'error': 'Invalid conf, imgsz, tile, overlap, filters, filter_score, priority, format, quality or max_size value'}), 400
+
+    renderizar = request.values.get('render', '').lower() in ('1', 'true', 'yes')
+    # Os arquivos do multipart são fechados ao fim da requisição, antes de a resposta ser gerada
+    linhas = processar_envio(copiar_envio(arquivos), parametros, renderizar, fatias, filtros, prioridade, saida=saida,
+                             fonte=parametros_armazenamento())
+    return Response(stream_with_context(linhas), mimetype='application/x-ndjson')
+
+# Stream MJPEG com as detecções de uma das fontes configuradas (STREAM_SOURCES), escolhida pelo nome ou
+# pela posição (ex.: /stream?source=portao ou /stream?source=1; sem source, a primeira)
+# Todos os espectadores da mesma fonte compartilham um único pipeline de inferência
+@app.route('/stream', methods=['GET'])
+def stream():
+    try:
+        nome = streams.resolver(request.args.get('source'))
+    except FonteNaoPermitida as e:
+        return jsonify({'error': 'Unknown stream source', 'sources': list(streams.fontes)}), 400
+    streams.verificar(nome)  # Limite de pipelines simultâneos: LimiteStreams vira 503 com Retry-After
+    return Response(streams.assistir(nome), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+# Prontidão do processo: 200 depois do aquecimento do modelo, 503 enquanto carrega
+@app.route('/health', methods=['GET'])
+def health():
+    pronto = carregador.pronto and batcher.ativo
+    corpo = dict(carregador.relatorio(), pid=estado['pid'], status='ready' if pronto else 'starting')
+    if pronto:
+        import torch  # Já importado pelo carregador
 
-    # Converte a imagem para o formato YOLOv8 para processamento (numpy array)
-    image_np = np.array(image)
+        corpo['torch_threads'] = torch.get_num_threads()
+    return jsonify(corpo), 200 if pronto else 503
 
-    # Inferencia do Resultado
-    results = model(image_np)
+# Tempo de inicialização: importação do app e importação, carregamento e aquecimento do modelo (em segundos)
+@app.route('/stats/startup', methods=['GET'])
+def startup_stats():
+    return jsonify(dict(carregador.relatorio(), app_import_s=estado['import_s'], pid=estado['pid']))
 
-    # Processar o resultado e salvara imagem
-    result_image = results[0].plot()  
-    result_image_pil = Image.fromarray(result_image) 
+# FPS alcançado e latência por etapa de cada stream ativo
+@app.route('/stats/stream', methods=['GET'])
+def stream_stats():
+    return jsonify(streams.stats())
 
-    # Converter Imagem PIL para bytes
-    img_io = io.BytesIO()
-    result_image_pil.save(img_io, 'JPEG', quality=85)
-    img_io.seek(0)
+# Métricas no formato do Prometheus: histogramas por etapa, contadores de requisições e memória do processo
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(metricas.prometheus(), mimetype='text/plain; version=0.0.4')
 
-    return Response(img_io, mimetype='image/jpeg')
+# Estatísticas do agrupador de inferência (tamanho dos lotes e espera na fila)
+@app.route('/stats/batching', methods=['GET'])
+def batching_stats():
+    return jsonify(batcher.stats())
+
+# Backend de inferência escolhido e resultado do benchmark de inicialização
+@app.route('/stats/backend', methods=['GET'])
+def backend_stats():
+    return jsonify(dict(carregador.info, encoders=codificadores_escolhidos()))
+
+# Contadores do cache de resultados (acertos, faltas e remoções)
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.stats())
+
+# Contadores do armazenamento de detecções (gravadas, descartadas, lotes e fila)
+@app.route('/stats/store', methods=['GET'])
+def store_stats():
+    if armazem is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(armazem.stats(), enabled=True))
+
+# Função para ler a janela de tempo e os filtros das consultas ao armazenamento
+# start/end em segundos da época (padrão: as últimas 24 h); classes por nome ou id, separadas por vírgula
+# Retorna inicio, fim, ids das classes (ou None para todas) e a fonte
+def parametros_consulta():
+    fim = float(request.args.get('end') or time.time())
+    inicio = float(request.args.get('start') or fim - 86400)
+    ids = {nome: id_classe for id_classe, nome in carregador.class_names.items()}
+    classes = None
+    if request.args.get('classes'):
+        classes = [int(n) if n.strip().isdigit() else ids[n.strip()] for n in request.args['classes'].split(',') if n.strip()]
+    return inicio, fim, classes, request.args.get('source')
+
+# Contagem de detecções por classe em janelas de tempo (interval em segundos, padrão 3600), por fonte ou no total
+@app.route('/detections/counts', methods=['GET'])
+def detection_counts():
+    if armazem is None:
+        return jsonify({'error': 'Detection store disabled (set DETECTION_STORE)'}), 404
+    try:
+        inicio, fim, classes, fonte = parametros_consulta()
+        intervalo = int(request.args.get('interval') or 3600)
+    except (ValueError, KeyError):
+        return jsonify({'error': 'Invalid start, end, interval or classes value'}), 400
+
+    janelas = armazem.contagens(inicio, fim, intervalo, classes, fonte)
+    nomes = carregador.class_names
+    for janela in janelas:
+        janela['counts'] = {nomes.get(c, str(c)): n for c, n in janela['counts'].items()}
+    return jsonify({'start': inicio, 'end': fim, 'interval': intervalo, 'source': fonte, 'windows': janelas})
+
+# Detecções gravadas (as mais recentes primeiro), com class (uma classe), source e limit
+@app.route('/detections', methods=['GET'])
+def detection_list():
+    if armazem is None:
+        return jsonify({'error': 'Detection store disabled (set DETECTION_STORE)'}), 404
+    try:
+        inicio, fim, _, fonte = parametros_consulta()
+        classe = request.args.get('class')
+        if classe is not None:
+            classe = int(classe) if classe.isdigit() else {nome: c for c, nome in carregador.class_names.items()}[classe]
+        limite = min(int(request.args.get('limit') or 1000), 100000)
+    except (ValueError, KeyError):
+        return jsonify({'error': 'Invalid start, end, class or limit value'}), 400
+
+    deteccoes = armazem.deteccoes(inicio, fim, classe, fonte, limite)
+    for d in deteccoes:
+        d['class'] = carregador.class_names.get(d['class_id'], str(d['class_id']))
+    return jsonify({'detections': deteccoes, 'sources': armazem.fontes()})
 
 @app.route('/')
 def index():
@@ -56,77 +686,10 @@ def index():
         </html>
     '''
 
+# Tempo de importação do app (sem o modelo, que continua carregando em segundo plano)
+estado['import_s'] = round(time.perf_counter() - INICIO, 3)
+
+# Desenvolvimento: python app.py (sem o reloader, que carregaria o modelo duas vezes)
+# Produção: gunicorn -c gunicorn.conf.py app:app
 if __name__ == '__main__':
-    app.run(debug=True)
-
-# from ultralytics import YOLO
-# import cv2
-# import math 
-
-# # iniciar webcam
-# cap = cv2.VideoCapture(0)
-# cap.set(3, 640)
-# cap.set(4, 480)
-
-# # modelo
-# model = YOLO("best.pt")
-
-# # classes de objetos
-# classNames = ["pessoa", "bicicleta", "carro", "moto", "avião", "ônibus", "trem", "caminhão", "barco",
-#               "sinal de trânsito", "hidrante", "placa de pare", "parquímetro", "banco", "pássaro", "gato",
-#               "cachorro", "cavalo", "ovelha", "vaca", "elefante", "urso", "zebra", "girafa", "mochila", "guarda-chuva",
-#               "bolsa", "gravata", "mala", "frisbee", "esquis", "snowboard", "bola esportiva", "pipa", "bastão de beisebol",
-#               "luva de beisebol", "skate", "prancha de surfe", "raquete de tênis", "garrafa", "copo de vinho", "xícara",
-#               "garfo", "faca", "colher", "tigela", "banana", "maçã", "sanduíche", "laranja", "brócolis",
-#               "cenoura", "cachorro-quente", "pizza", "donut", "bolo", "cadeira", "sofá", "planta em vaso", "cama",
-#               "mesa de jantar", "vaso sanitário", "monitor de TV", "laptop", "mouse", "controle remoto", "teclado", "celular",
-#               "micro-ondas", "forno", "torradeira", "pia", "geladeira", "livro", "relógio", "vaso", "tesoura",
-#               "ursinho de pelúcia", "secador de cabelo", "escova de dentes", "escavadora", "luvas", "capacete", "máscara"]
-
-# while True:
-#     sucesso, img = cap.read()
-#     if not sucesso:
-#         print("Falha ao capturar o quadro")
-#         break
-
-#     resultados = model(img, stream=True)
-
-#     # coordenadas
-#     for r in resultados:
-#         caixas = r.boxes
-
-#         for caixa in caixas:
-#             # caixa delimitadora
-#             x1, y1, x2, y2 = caixa.xyxy[0]
-#             x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2) # converter para valores inteiros
-
-#             # desenhar a caixa na imagem
-#             cv2.rectangle(img, (x1, y1), (x2, y2), (255, 0, 255), 3)
-
-#             # confiança
-#             confianca = math.ceil((caixa.conf[0]*100))/100
-#             print("Confiança --->", confianca)
-
-#             # nome da classe
-#             cls = int(caixa.cls[0])
-#             print("Nome da classe -->", classNames[cls])
-
-#             # detalhes do objeto
-#             org = [x1, y1]
-#             fonte = cv2.FONT_HERSHEY_SIMPLEX
-#             escalaFonte = 1
-#             cor = (255, 0, 0)
-#             espessura = 2
-
-#             cv2.putText(img, classNames[cls], org, fonte, escalaFonte, cor, espessura)
-
-#     if img is not None and img.size > 0:
-#         cv2.imshow('Webcam', img)
-#     else:
-#         print("Quadro vazio recebido")
-
-#     if cv2.waitKey(1) == ord('q'):
-#         break
-
-# cap.release()
-# cv2.destroyAllWindows()
\ No newline at end of file
+    app.run(debug=True, use_reloader=False)
@@ -0,0 +1,254 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+# Configuração da janela de agrupamento (pode ser ajustada por variáveis de ambiente)
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', '8'))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', '10'))
+# Controle de admissão: tamanho máximo da fila e prazo padrão de cada pedido
+BATCH_MAX_QUEUE = int(os.environ.get('BATCH_MAX_QUEUE', '64'))
+REQUEST_DEADLINE_MS = float(os.environ.get('REQUEST_DEADLINE_MS', '10000'))
+
+# Filas de prioridade, da mais para a menos prioritária
+# Pedidos "batch" só ocupam metade da fila, deixando espaço para os interativos
+PRIORIDADES = ('interactive', 'batch')
+
+
+# Pedido recusado por sobrecarga; retry_after é a estimativa (s) de quando a fila terá espaço
+class Sobrecarga(Exception):
+    status = 503
+
+    def __init__(self, mensagem, retry_after=1):
+        super().__init__(mensagem)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+# Fila cheia: o cliente deve tentar de novo depois (HTTP 429)
+class FilaCheia(Sobrecarga):
+    status = 429
+
+
+# O prazo do pedido não pode ser cumprido (estimativa na chegada) ou já passou quando ele saiu da fila (HTTP 503)
+class PrazoInviavel(Sobrecarga):
+    status = 503
+
+
+# Item aguardando na fila do agrupador
+class _Pedido:
+    __slots__ = ('payload', 'chave', 'future', 'chegada', 'prioridade', 'prazo')
+
+    def __init__(self, payload, chave, prioridade=PRIORIDADES[0], prazo=None):
+        self.payload = payload
+        self.chave = chave
+        self.future = Future()
+        self.chegada = time.perf_counter()
+        self.prioridade = prioridade
+        self.prazo = prazo
+
+
+# Classe que agrupa requisições concorrentes em uma única inferência em lote
+# Requisições que chegam dentro da janela (max_batch_size / max_wait_ms) são
+# executadas juntas pela função infer_fn e os resultados são devolvidos para cada uma
+# A fila é limitada (max_queue) e dividida em prioridades; pedidos que não cabem ou cujo prazo não pode
+# ser cumprido são recusados na hora com Sobrecarga, em vez de esperar e estourar o tempo do cliente
+class MicroBatcher:
+    def __init__(self, infer_fn, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS, historico=256,
+                 max_queue=BATCH_MAX_QUEUE):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue = max(1, int(max_queue))
+        self._filas = {prioridade: deque() for prioridade in PRIORIDADES}
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._historico = deque(maxlen=historico)
+        self._total_lotes = 0
+        self._total_pedidos = 0
+        self._total_erros = 0
+        self._recusados = {'queue_full': 0, 'deadline': 0, 'expired': 0}
+        self._tamanhos = {}
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._tempo_lote = None  # Média móvel do tempo de inferência de um lote (s), usada nas estimativas
+        self._iniciar_thread()
+        # Threads não sobrevivem ao fork (ex.: workers do gunicorn com preload_app): o filho recria a fila e a thread
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_apos_fork)
+
+    def _iniciar_thread(self):
+        self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    # Executado no processo filho logo após o fork, quando só existe a thread que chamou o fork
+    def _reiniciar_apos_fork(self):
+        self._filas = {prioridade: deque() for prioridade in PRIORIDADES}
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._iniciar_thread()
+
+    # Indica se a thread do agrupador está rodando neste processo
+    @property
+    def ativo(self):
+        return self._thread.is_alive()
+
+    # Estimativa (s) do tempo até um pedido com `a_frente` pedidos na frente ser executado
+    def _estimar_espera(self, a_frente):
+        tempo_lote = self._tempo_lote if self._tempo_lote is not None else 0.0
+        return (a_frente // self.max_batch_size + 1) * (tempo_lote + self.max_wait)
+
+    # Verifica se um pedido com esta prioridade e prazo (time.perf_counter()) seria aceito agora
+    # Lança FilaCheia ou PrazoInviavel; chamado antes de enviar, permite recusar antes de decodificar a imagem
+    def verificar(self, prioridade=PRIORIDADES[0], prazo=None):
+        if prioridade not in self._filas:
+            raise ValueError(f'Prioridade desconhecida: {prioridade}')
+        total = sum(len(fila) for fila in self._filas.values())
+        limite = self.max_queue if prioridade == PRIORIDADES[0] else max(1, self.max_queue // 2)
+        if total >= limite:
+            with self._lock:
+                self._recusados['queue_full'] += 1
+            raise FilaCheia(f'Fila de inferência cheia ({total} pedidos)', self._estimar_espera(total))
+
+        # Pedidos à frente: os da mesma prioridade e os das prioridades maiores
+        indice = PRIORIDADES.index(prioridade)
+        a_frente = sum(len(self._filas[p]) for p in PRIORIDADES[:indice + 1])
+        espera = self._estimar_espera(a_frente)
+        if prazo is not None and time.perf_counter() + espera > prazo:
+            with self._lock:
+                self._recusados['deadline'] += 1
+            raise PrazoInviavel(f'Prazo não pode ser cumprido (espera estimada de {espera * 1000:.0f} ms)', espera)
+
+    # Envia um item para a fila e retorna um Future com o resultado
+    # Itens com chaves diferentes (ex.: confiança diferente) nunca são agrupados juntos
+    # prazo: instante (time.perf_counter()) até o qual o item precisa começar a ser inferido
+    # (None usa REQUEST_DEADLINE_MS a partir do envio; REQUEST_DEADLINE_MS=0 desliga o prazo padrão)
+    def submit_async(self, payload, chave=None, prioridade=PRIORIDADES[0], prazo=None):
+        pedido = _Pedido(payload, chave, prioridade)
+        if prazo is None and REQUEST_DEADLINE_MS:
+            prazo = pedido.chegada + REQUEST_DEADLINE_MS / 1000.0
+        pedido.prazo = prazo
+        with self._cond:
+            self.verificar(prioridade, pedido.prazo)
+            self._filas[prioridade].append(pedido)
+            self._cond.notify()
+        return pedido.future
+
+    # Envia um item e bloqueia até o resultado ficar pronto
+    def submit(self, payload, chave=None, timeout=None, prioridade=PRIORIDADES[0], prazo=None):
+        return self.submit_async(payload, chave, prioridade, prazo).result(timeout=timeout)
+
+    # Obtém o próximo pedido, da fila de maior prioridade primeiro
+    # Pedidos cujo prazo já passou são descartados com PrazoInviavel sem chegar ao modelo
+    def _proximo(self, timeout=None):
+        limite = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            while True:
+                for fila in self._filas.values():
+                    while fila:
+                        pedido = fila.popleft()
+                        if pedido.prazo is not None and time.perf_counter() > pedido.prazo:
+                            self._expirar(pedido)
+                            continue
+                        return pedido
+                restante = None if limite is None else limite - time.perf_counter()
+                if restante is not None and restante <= 0:
+                    return None
+                self._cond.wait(restante)
+
+    def _expirar(self, pedido):
+        with self._lock:
+            self._recusados['expired'] += 1
+        espera = time.perf_counter() - pedido.chegada
+        pedido.future.set_exception(PrazoInviavel(f'Prazo esgotado na fila ({espera * 1000:.0f} ms)', self._estimar_espera(0)))
+
+    def _tem_pedidos(self):
+        with self._cond:
+            return any(self._filas.values())
+
+    # Laço principal: junta pedidos até encher o lote ou estourar o tempo de espera
+    def _loop(self):
+        while True:
+            primeiro = self._proximo()
+            lote = [primeiro]
+            adiados = []
+            prazo = primeiro.chegada + self.max_wait
+
+            while len(lote) < self.max_batch_size:
+                restante = prazo - time.perf_counter()
+                if restante <= 0 and not self._tem_pedidos():
+                    break
+                pedido = self._proximo(timeout=max(0.0, restante))
+                if pedido is None:
+                    break
+                if pedido.chave == primeiro.chave:
+                    lote.append(pedido)
+                else:
+                    adiados.append(pedido)
+
+            # Pedidos com outra chave voltam para o início das suas filas, na ordem de chegada
+            with self._cond:
+                for pedido in reversed(adiados):
+                    self._filas[pedido.prioridade].appendleft(pedido)
+            self._executar(lote)
+
+    # Executa o lote e distribui os resultados (ou a exceção) para cada pedido
+    def _executar(self, lote):
+        inicio = time.perf_counter()
+        esperas = [inicio - pedido.chegada for pedido in lote]
+        try:
+            resultados = list(self.infer_fn([pedido.payload for pedido in lote], lote[0].chave))
+            if len(resultados) != len(lote):
+                raise RuntimeError(f'infer_fn retornou {len(resultados)} resultados para um lote de {len(lote)}')
+        except Exception as e:
+            with self._lock:
+                self._total_erros += 1
+            for pedido in lote:
+                pedido.future.set_exception(e)
+            return
+        duracao = time.perf_counter() - inicio
+
+        for pedido, resultado in zip(lote, resultados):
+            pedido.future.set_result(resultado)
+
+        self._registrar(len(lote), esperas, duracao)
+
+    # Atualiza as estatísticas por lote (tamanho, espera na fila e tempo de inferência)
+    def _registrar(self, tamanho, esperas, duracao):
+        with self._lock:
+            self._total_lotes += 1
+            self._total_pedidos += tamanho
+            self._tamanhos[tamanho] = self._tamanhos.get(tamanho, 0) + 1
+            self._espera_total += sum(esperas)
+            self._espera_max = max(self._espera_max, max(esperas))
+            self._tempo_lote = duracao if self._tempo_lote is None else 0.8 * self._tempo_lote + 0.2 * duracao
+            self._historico.append({
+                'batch_size': tamanho,
+                'queue_wait_ms_max': round(max(esperas) * 1000, 3),
+                'queue_wait_ms_avg': round(sum(esperas) / tamanho * 1000, 3),
+                'inference_ms': round(duracao * 1000, 3),
+                'timestamp': time.time(),
+            })
+
+    # Retorna as estatísticas acumuladas para ajuste da janela de agrupamento
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': sum(len(fila) for fila in self._filas.values()),
+                'queue_depth_by_priority': {p: len(fila) for p, fila in self._filas.items()},
+                'max_queue': self.max_queue,
+                'rejected': dict(self._recusados),
+                'estimated_batch_ms': round(self._tempo_lote * 1000, 3) if self._tempo_lote is not None else None,
+                'batches': self._total_lotes,
+                'requests': self._total_pedidos,
+                'errors': self._total_erros,
+                'avg_batch_size': round(self._total_pedidos / self._total_lotes, 3) if self._total_lotes else 0.0,
+                'avg_queue_wait_ms': round(self._espera_total / self._total_pedidos * 1000, 3) if self._total_pedidos else 0.0,
+                'max_queue_wait_ms': round(self._espera_max * 1000, 3),
+                'batch_size_histogram': {str(k): v for k, v in sorted(self._tamanhos.items())},
+                'recent_batches': list(self._historico)[-20:],
+            }
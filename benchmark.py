@@ -0,0 +1,263 @@
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.abspath(__file__))
+IMAGEM_PADRAO = os.path.join(DIRETORIO_RAIZ, 'teste.jpg')
+MODELO_PADRAO = os.path.join(DIRETORIO_RAIZ, 'best.pt')
+ENDPOINTS_PADRAO = ('/process-image', '/upload')
+
+
+# Função para resumir uma lista de latências (s) em p50/p95/p99 e média (ms)
+def percentis(tempos):
+    tempos_ms = np.asarray(tempos, dtype=np.float64) * 1000
+    if tempos_ms.size == 0:
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(tempos_ms, (50, 95, 99))
+    return {'n': int(tempos_ms.size), 'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3), 'mean_ms': round(float(tempos_ms.mean()), 3)}
+
+
+# Função para ler o pico de memória (RSS) deste processo em MB
+def pico_memoria_mb():
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(pico / 1024 if sys.platform != 'darwin' else pico / 2**20, 1)
+    except ImportError:
+        from interface_modelo.metricas import memoria_processo
+        memoria = memoria_processo()
+        return round(memoria / 2**20, 1) if memoria else None
+
+
+# Função para gerar uma cópia da imagem com bytes diferentes a cada requisição
+# Os bytes extras ficam depois do fim da imagem (ignorados pelo decodificador) e evitam acertos no cache de resultados
+def variar(data, indice):
+    return data + b'\0bench' + indice.to_bytes(8, 'little')
+
+
+# Função para montar o corpo multipart/form-data com o campo `file`
+# Retorna o corpo e o Content-Type
+def corpo_multipart(data, nome_arquivo, campos=None):
+    limite = uuid.uuid4().hex
+    partes = []
+    for nome, valor in (campos or {}).items():
+        partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="{nome}"\r\n\r\n{valor}\r\n'.encode())
+    partes.append(f'--{limite}\r\nContent-Disposition: form-data; name="file"; filename="{nome_arquivo}"\r\n'
+                  f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n')
+    partes.append(f'--{limite}--\r\n'.encode())
+    return b''.join(partes), f'multipart/form-data; boundary={limite}'
+
+
+# Função para disparar `n` requisições com `concorrencia` clientes simultâneos
+# enviar(indice) faz uma requisição e retorna o status HTTP
+# Retorna as latências, a vazão e a contagem de status
+def rodar_carga(enviar, n, concorrencia):
+    def medir(indice):
+        inicio = time.perf_counter()
+        try:
+            status = enviar(indice)
+        except Exception as e:
+            status = type(e).__name__
+        return time.perf_counter() - inicio, status
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        medicoes = list(executor.map(medir, range(n)))
+    duracao = time.perf_counter() - inicio
+
+    status = {}
+    for _, s in medicoes:
+        status[str(s)] = status.get(str(s), 0) + 1
+    sucesso = [t for t, s in medicoes if s == 200]
+    return dict(percentis(sucesso), concurrency=concorrencia, requests=n, status=status,
+                throughput_rps=round(len(sucesso) / duracao, 3) if duracao else 0.0, seconds=round(duracao, 3))
+
+
+# Benchmark do servidor no próprio processo (cliente de teste do Flask, sem rede)
+def benchmark_processo(data, nome_arquivo, endpoints, concorrencias, n, aquecimento=3):
+    import app as servidor
+
+    resultados = {}
+    for endpoint in endpoints:
+        def enviar(indice, endpoint=endpoint):
+            with servidor.app.test_client() as cliente:
+                resposta = cliente.post(endpoint, data={'file': (io.BytesIO(variar(data, indice)), nome_arquivo)},
+                                        content_type='multipart/form-data')
+                resposta.get_data()
+                return resposta.status_code
+
+        rodar_carga(enviar, aquecimento, 1)
+        for concorrencia in concorrencias:
+            resultados[f'inprocess {endpoint} c={concorrencia}'] = rodar_carga(enviar, n, concorrencia)
+            print(f'inprocess {endpoint} c={concorrencia}: {resultados[f"inprocess {endpoint} c={concorrencia}"]}', flush=True)
+    return resultados, {'backend': servidor.carregador.info.get('backend'), 'startup': servidor.carregador.relatorio(),
+                        'peak_rss_mb': pico_memoria_mb()}
+
+
+# Benchmark de um servidor já rodando (ex.: gunicorn -c gunicorn.conf.py app:app) por HTTP local
+def benchmark_http(url, data, nome_arquivo, endpoints, concorrencias, n, aquecimento=3, timeout=120):
+    url = url.rstrip('/')
+    resultados = {}
+    for endpoint in endpoints:
+        def enviar(indice, endpoint=endpoint):
+            corpo, tipo = corpo_multipart(variar(data, indice), nome_arquivo)
+            pedido = urllib.request.Request(url + endpoint, data=corpo, headers={'Content-Type': tipo})
+            try:
+                with urllib.request.urlopen(pedido, timeout=timeout) as resposta:
+                    resposta.read()
+                    return resposta.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        rodar_carga(enviar, aquecimento, 1)
+        for concorrencia in concorrencias:
+            resultados[f'http {endpoint} c={concorrencia}'] = rodar_carga(enviar, n, concorrencia)
+            print(f'http {endpoint} c={concorrencia}: {resultados[f"http {endpoint} c={concorrencia}"]}', flush=True)
+
+    # Memória do servidor pelo /metrics (do worker que atender a coleta)
+    extras = {}
+    try:
+        with urllib.request.urlopen(url + '/metrics', timeout=10) as resposta:
+            for linha in resposta.read().decode().splitlines():
+                if linha.endswith(tuple('0123456789')) and '_process_resident_memory_bytes ' in linha:
+                    extras['server_rss_mb'] = round(float(linha.split()[-1]) / 2**20, 1)
+    except (urllib.error.URLError, OSError, ValueError):
+        pass
+    return resultados, extras
+
+
+# Benchmark das etapas da interface sem abrir a janela: carregar a imagem, cada combinação de filtros,
+# detecção (letterbox + modelo) e desenho das detecções, com as funções do núcleo da interface
+# (interface_modelo.deteccao); inclui o tempo de importação do núcleo e de carregamento do modelo
+def benchmark_interface(caminho_imagem, caminho_modelo, repeticoes):
+    inicio = time.perf_counter()
+    from interface_modelo import deteccao
+    from interface_modelo.backends import CarregadorModelo
+    from interface_modelo.filtros import FILTROS
+    importacao_s = round(time.perf_counter() - inicio, 3)
+
+    def medir(funcao):
+        funcao()  # Aquecimento
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return percentis(tempos)
+
+    carregador = CarregadorModelo(caminho_modelo).iniciar().aguardar()
+    modelo, class_names = carregador.modelo, carregador.class_names
+    img = deteccao.carregar_imagem(caminho_imagem)
+
+    resultados = {'gui carregar_imagem': medir(lambda: deteccao.carregar_imagem(caminho_imagem))}
+    for combinacao in product((False, True), repeat=len(FILTROS)):
+        if any(combinacao):
+            nomes = '+'.join(n for n, ligado in zip(FILTROS, combinacao) if ligado)
+            resultados[f'gui pre_processar_imagem {nomes}'] = medir(
+                lambda combinacao=combinacao: deteccao.pre_processar_imagem(img, combinacao))
+
+    def detectar_objetos():
+        return deteccao.detectar_objetos(modelo, img, 0.25)[0]
+
+    resultados['gui detectar_objetos'] = medir(detectar_objetos)
+    resultados_modelo = detectar_objetos()
+    img_exibicao = deteccao.letterbox.imagem.copy()
+    resultados['gui exibir_resultados'] = medir(
+        lambda: deteccao.exibir_resultados(img_exibicao, resultados_modelo, class_names))
+    for nome, valores in resultados.items():
+        print(f'{nome}: {valores}', flush=True)
+    inicializacao = dict(carregador.relatorio(), core_import_s=importacao_s)
+    return resultados, {'backend': carregador.info.get('backend'), 'startup': inicializacao, 'peak_rss_mb': pico_memoria_mb()}
+
+
+# Função para comparar os resultados com uma baseline salva
+# Regressão: p50/p95 acima de (1 + limite) vezes a baseline ou vazão abaixo de (1 - limite) vezes
+# Retorna a lista de regressões encontradas
+def comparar(resultados, baseline, limite=0.10):
+    regressoes = []
+    for nome, atual in resultados.items():
+        anterior = baseline.get(nome)
+        if not anterior:
+            continue
+        for campo in ('p50_ms', 'p95_ms'):
+            if campo in atual and anterior.get(campo) and atual[campo] > anterior[campo] * (1 + limite):
+                regressoes.append(f'{nome}: {campo} {anterior[campo]} -> {atual[campo]} '
+                                  f'(+{(atual[campo] / anterior[campo] - 1) * 100:.1f}%)')
+        if anterior.get('throughput_rps') and atual.get('throughput_rps', 0) < anterior['throughput_rps'] * (1 - limite):
+            regressoes.append(f'{nome}: throughput_rps {anterior["throughput_rps"]} -> {atual["throughput_rps"]}')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do servidor e das etapas da interface.')
+    parser.add_argument('alvo', choices=('servidor', 'interface', 'tudo'))
+    parser.add_argument('--imagem', default=IMAGEM_PADRAO)
+    parser.add_argument('--modelo', default=MODELO_PADRAO)
+    parser.add_argument('--modo', choices=('processo', 'http', 'ambos'), default='processo',
+                        help='Servidor no próprio processo, por HTTP em --url ou os dois')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS_PADRAO))
+    parser.add_argument('--concorrencia', default='1,4,8', help='Níveis de concorrência separados por vírgula')
+    parser.add_argument('--requisicoes', type=int, default=50, help='Requisições por nível de concorrência')
+    parser.add_argument('--repeticoes', type=int, default=20, help='Repetições por etapa da interface')
+    parser.add_argument('--saida', help='Arquivo JSON de resultados (padrão: benchmark_<data>.json)')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--limite', type=float, default=10, help='Piora máxima aceita em relação à baseline (%%)')
+    args = parser.parse_args()
+
+    with open(args.imagem, 'rb') as f:
+        data = f.read()
+    nome_arquivo = os.path.basename(args.imagem)
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    concorrencias = [int(c) for c in args.concorrencia.split(',') if c.strip()]
+
+    resultados = {}
+    meta = {'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'image': nome_arquivo}
+    if args.alvo in ('servidor', 'tudo'):
+        if args.modo in ('processo', 'ambos'):
+            parcial, extras = benchmark_processo(data, nome_arquivo, endpoints, concorrencias, args.requisicoes)
+            resultados.update(parcial)
+            meta['inprocess'] = extras
+        if args.modo in ('http', 'ambos'):
+            parcial, extras = benchmark_http(args.url, data, nome_arquivo, endpoints, concorrencias, args.requisicoes)
+            resultados.update(parcial)
+            meta['http'] = dict(extras, url=args.url)
+    if args.alvo in ('interface', 'tudo'):
+        parcial, extras = benchmark_interface(args.imagem, args.modelo, args.repeticoes)
+        resultados.update(parcial)
+        meta['gui'] = extras
+    meta['peak_rss_mb'] = pico_memoria_mb()
+
+    saida = args.saida or f'benchmark_{datetime.now():%Y%m%d_%H%M%S}.json'
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': resultados}, f, indent=2)
+    print(f'Resultados salvos em {saida} (pico de memória: {meta["peak_rss_mb"]} MB)')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressoes = comparar(resultados, baseline, args.limite / 100)
+        if regressoes:
+            print(f'{len(regressoes)} regressões acima de {args.limite}%:')
+            for regressao in regressoes:
+                print(f'  {regressao}')
+            sys.exit(1)
+        print(f'Sem regressões acima de {args.limite}% em relação a {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
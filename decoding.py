@@ -0,0 +1,125 @@
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+
+# Configuração da decodificação dos envios (pode ser ajustada por variáveis de ambiente)
+UPLOAD_MAX_BYTES = int(float(os.environ.get('UPLOAD_MAX_BYTES_MB', '25')) * 1024 * 1024)
+UPLOAD_MAX_PIXELS = int(float(os.environ.get('UPLOAD_MAX_MEGAPIXELS', '50')) * 1_000_000)
+UPLOAD_DECODE_SIZE = int(os.environ.get('UPLOAD_DECODE_SIZE', '640'))  # 0 decodifica sempre em resolução total
+COR_FUNDO = (255, 255, 255)  # Fundo usado no lugar da transparência
+
+# O limite do próprio Pillow (contra "bombas de descompressão") acompanha o limite configurado
+Image.MAX_IMAGE_PIXELS = max(Image.MAX_IMAGE_PIXELS or 0, UPLOAD_MAX_PIXELS)
+
+
+# Imagem que não pôde ser decodificada (arquivo corrompido ou formato não suportado)
+class ImagemInvalida(ValueError):
+    pass
+
+
+# Imagem acima dos limites de bytes ou de pixels
+class ImagemGrande(ImagemInvalida):
+    pass
+
+
+# Função para converter qualquer modo do Pillow (RGBA, LA, P, L, I;16, CMYK...) para RGB
+# A transparência é composta sobre um fundo branco em vez de ser simplesmente descartada
+def converter_rgb(img):
+    if img.mode == 'RGB':
+        return img
+    if img.mode == 'P' and 'transparency' in img.info:
+        img = img.convert('RGBA')
+    if img.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La'):
+        fundo = Image.new('RGB', img.size, COR_FUNDO)
+        fundo.paste(img.convert('RGBA'), mask=img.convert('RGBA').getchannel('A'))
+        return fundo
+    if img.mode in ('I', 'I;16', 'I;16B', 'I;16L', 'F'):
+        # Imagens de 16 bits / ponto flutuante: reduz para 8 bits antes de converter
+        img = Image.fromarray(np.clip(np.asarray(img, dtype=np.float32) / 256, 0, 255).astype(np.uint8))
+    return img.convert('RGB')
+
+
+# Função para decodificar um arquivo enviado já perto do tamanho usado pelo modelo
+# JPEGs são decodificados em escala reduzida (draft: 1/2, 1/4 ou 1/8 direto no decodificador), sem nunca
+# alocar a imagem inteira; outros formatos são reduzidos logo após a decodificação
+# O lado maior da imagem decodificada fica >= tamanho_alvo (o letterbox do modelo faz o ajuste final)
+# tamanho_alvo=None ou 0 decodifica em resolução total (ex.: inferência fatiada)
+# bgr=True devolve os canais na ordem BGR, a que o ultralytics e o OpenCV esperam de arrays NumPy
+# Retorna o array RGB (ou BGR) uint8 e as informações da decodificação (tamanho original, tamanho decodificado,
+# escala decodificada/original e tempo em ms); as caixas na imagem decodificada / escala = caixas no original
+def decodificar_imagem(data, tamanho_alvo=UPLOAD_DECODE_SIZE, max_bytes=UPLOAD_MAX_BYTES, max_pixels=UPLOAD_MAX_PIXELS,
+                       bgr=False):
+    inicio = time.perf_counter()
+    if max_bytes and len(data) > max_bytes:
+        raise ImagemGrande(f'Arquivo com {len(data)} bytes excede o limite de {max_bytes} bytes')
+
+    try:
+        img = Image.open(io.BytesIO(data))
+    except (OSError, SyntaxError) as e:
+        raise ImagemInvalida(f'Não foi possível ler a imagem: {e}') from None
+
+    # O cabeçalho já traz as dimensões: o limite de pixels é verificado antes de decodificar
+    largura, altura = img.size
+    if max_pixels and largura * altura > max_pixels:
+        raise ImagemGrande(f'Imagem com {largura}x{altura} pixels excede o limite de {max_pixels} pixels')
+
+    # Orientação EXIF (5 a 8 trocam largura e altura)
+    orientacao = img.getexif().get(0x0112, 1)
+    if orientacao in (5, 6, 7, 8):
+        largura, altura = altura, largura
+
+    try:
+        if tamanho_alvo and max(largura, altura) > tamanho_alvo:
+            escala_alvo = tamanho_alvo / max(largura, altura)
+            pedido = (int(np.ceil(img.size[0] * escala_alvo)), int(np.ceil(img.size[1] * escala_alvo)))
+            if img.format == 'JPEG':
+                img.draft('RGB', pedido)
+            img.load()
+            fator = min(img.size[0] // pedido[0], img.size[1] // pedido[1])
+            if fator >= 2:
+                img = img.reduce(fator)
+        img = ImageOps.exif_transpose(img)
+        img = converter_rgb(img)
+        img_np = np.asarray(img)
+    except (OSError, SyntaxError, ValueError) as e:
+        raise ImagemInvalida(f'Não foi possível decodificar a imagem: {e}') from None
+
+    if bgr:
+        img_np = np.ascontiguousarray(img_np[..., ::-1])  # Já é uma cópia gravável
+    elif not img_np.flags.writeable:
+        img_np = img_np.copy()
+    info = {
+        'original_size': [largura, altura],
+        'decoded_size': [img_np.shape[1], img_np.shape[0]],
+        'scale': img_np.shape[1] / largura,
+        'decode_ms': round((time.perf_counter() - inicio) * 1000, 3),
+    }
+    return img_np, info
+
+
+# Benchmark de linha de comando: python decoding.py [imagem] [repetições]
+# Compara a decodificação em resolução total (Image.open + np.array) com a decodificação reduzida
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'teste.jpg')
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with open(caminho, 'rb') as f:
+        data = f.read()
+
+    def medir(funcao):
+        medicoes = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            img_np = funcao()
+            medicoes.append(time.perf_counter() - inicio)
+        return float(np.median(medicoes)) * 1000, img_np
+
+    tempo_total, img_total = medir(lambda: np.array(Image.open(io.BytesIO(data))))
+    tempo_reduzido, img_reduzida = medir(lambda: decodificar_imagem(data, max_bytes=0, max_pixels=0)[0])
+    print(f'Resolução total: {tempo_total:.2f} ms, {img_total.shape[1]}x{img_total.shape[0]}, {img_total.nbytes / 2**20:.1f} MB')
+    print(f'Reduzida ({UPLOAD_DECODE_SIZE}): {tempo_reduzido:.2f} ms, {img_reduzida.shape[1]}x{img_reduzida.shape[0]}, '
+          f'{img_reduzida.nbytes / 2**20:.1f} MB ({tempo_total / tempo_reduzido:.1f}x)')
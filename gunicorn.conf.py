@@ -0,0 +1,53 @@
+# Configuração do gunicorn para produção: gunicorn -c gunicorn.conf.py app:app
+# O modelo é carregado, escolhido (benchmark de backend) e aquecido uma única vez no processo mestre;
+# os workers são criados por fork e compartilham os pesos por copy-on-write.
+# Os núcleos são divididos entre os workers: workers x TORCH_THREADS ~= núcleos (ver README)
+import gc
+import os
+
+NUCLEOS = os.cpu_count() or 1
+TORCH_THREADS = max(1, int(os.environ.get('TORCH_THREADS', '2')))
+
+# As threads de inferência precisam ser limitadas antes de o PyTorch ser importado (pelo app, no preload)
+os.environ.setdefault('OMP_NUM_THREADS', str(TORCH_THREADS))
+os.environ.setdefault('MKL_NUM_THREADS', str(TORCH_THREADS))
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', str(max(1, NUCLEOS // TORCH_THREADS))))
+# Threads de requisição por worker: várias requisições simultâneas no mesmo worker são agrupadas em lote
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '4'))
+preload_app = True
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+
+# Depois do preload: espera o modelo, que o app carrega em segundo plano (a thread do carregamento não
+# sobreviveria ao fork), e congela os objetos já criados (modelo incluído) para o coletor de lixo não tocar
+# nas páginas compartilhadas, o que faria cada worker copiar a memória
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        from interface_modelo.codificacao import FORMATOS, FormatoInvalido, codificadores_escolhidos, escolher_codificador
+
+        app.carregador.aguardar()
+        # Benchmark dos codificadores de imagem (OpenCV x Pillow) também uma vez só, no mestre
+        for formato in FORMATOS:
+            try:
+                escolher_codificador(formato)
+            except FormatoInvalido as e:
+                server.log.warning(str(e))
+        server.log.info(f'Codificadores: {codificadores_escolhidos()}')
+        server.log.info(f'Inicialização do mestre: {app.carregador.relatorio()} (app: {app.estado["import_s"]} s)')
+    gc.freeze()
+    server.log.info(f'Modelo carregado no mestre; {workers} workers x {TORCH_THREADS} threads do PyTorch ({NUCLEOS} núcleos)')
+
+
+# Em cada worker, logo após o fork: threads do PyTorch deste worker e aquecimento antes de aceitar requisições
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import app
+
+        app.preparar_worker(TORCH_THREADS)
+        server.log.info(f'Worker {worker.pid} pronto (aquecimento: {app.carregador.relatorio().get("warmup_s")} s)')
@@ -0,0 +1,312 @@
+import argparse
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+
+# Configuração do armazenamento das detecções (pode ser ajustada por variáveis de ambiente)
+DETECTION_STORE = os.environ.get('DETECTION_STORE') or None  # Caminho do SQLite; sem ele nada é gravado
+DETECTION_STORE_BATCH = int(os.environ.get('DETECTION_STORE_BATCH', '2000'))  # Detecções por transação
+DETECTION_STORE_FLUSH_MS = float(os.environ.get('DETECTION_STORE_FLUSH_MS', '1000'))
+DETECTION_STORE_QUEUE = int(os.environ.get('DETECTION_STORE_QUEUE', '10000'))  # Imagens aguardando gravação
+
+# Classe usada na tabela de contagens para o número de imagens processadas em cada janela
+CLASSE_IMAGENS = -1
+# Resoluções (s) das contagens pré-agregadas, da maior para a menor
+RESOLUCOES = (3600, 60)
+
+ESQUEMA = '''
+CREATE TABLE IF NOT EXISTS fontes (id INTEGER PRIMARY KEY, nome TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS deteccoes (
+    ts INTEGER NOT NULL, fonte INTEGER NOT NULL, classe INTEGER NOT NULL, conf REAL NOT NULL,
+    x1 REAL NOT NULL, y1 REAL NOT NULL, x2 REAL NOT NULL, y2 REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deteccoes_ts ON deteccoes (ts);
+CREATE TABLE IF NOT EXISTS contagens (
+    resolucao INTEGER NOT NULL, classe INTEGER NOT NULL, janela INTEGER NOT NULL, fonte INTEGER NOT NULL,
+    n INTEGER NOT NULL, PRIMARY KEY (resolucao, classe, janela, fonte)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS contagens_janela ON contagens (resolucao, janela);
+'''
+
+
+# Armazenamento local (SQLite) das detecções, só de inserção
+# registrar() só coloca as detecções em uma fila em memória e retorna na hora; uma thread grava a fila em
+# transações de até `lote` detecções a cada `intervalo_ms`, então a requisição nunca espera o disco
+# (com a fila cheia, as detecções são descartadas e contadas em stats()['dropped'])
+# Cada detecção vira uma linha compacta (instante em ms, fonte, classe, confiança e caixa) e, na mesma
+# transação, as contagens por hora e por minuto de cada fonte/classe são atualizadas: as consultas de
+# contagem por janela de tempo leem essas contagens (indexadas), sem percorrer as detecções
+class ArmazemDeteccoes:
+    def __init__(self, caminho, lote=DETECTION_STORE_BATCH, intervalo_ms=DETECTION_STORE_FLUSH_MS,
+                 max_fila=DETECTION_STORE_QUEUE):
+        self.caminho = caminho
+        self.lote = max(1, int(lote))
+        self.intervalo = max(0.0, float(intervalo_ms)) / 1000.0
+        self.max_fila = max(1, int(max_fila))
+        self._fila = queue.Queue(self.max_fila)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._fontes = {}
+        self._contadores = {'images': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'errors': 0}
+        self._ultimo_lote_ms = None
+
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        os.makedirs(diretorio, exist_ok=True)
+        with self._conectar() as conexao:
+            conexao.executescript(ESQUEMA)
+        atexit.register(self.fechar)
+        # Threads não sobrevivem ao fork (ex.: workers do gunicorn): o filho recria a fila e as conexões
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_apos_fork)
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False)
+        conexao.execute('PRAGMA journal_mode=WAL')  # Leituras não bloqueiam a gravação (e vice-versa)
+        conexao.execute('PRAGMA synchronous=NORMAL')
+        return conexao
+
+    # Conexão de leitura da thread atual (o sqlite3 não compartilha conexões entre threads)
+    def _conexao_leitura(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = self._local.conexao = self._conectar()
+        return conexao
+
+    def _reiniciar_apos_fork(self):
+        self._fila = queue.Queue(self.max_fila)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._fontes = {}
+
+    # Registra as detecções de uma imagem (lista no formato do servidor: class_id, confidence e box)
+    # fonte: nome do local/câmera/cliente; instante: segundos desde a época (padrão: agora)
+    # Retorna False se a fila estava cheia e as detecções foram descartadas
+    def registrar(self, fonte, deteccoes, instante=None):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='armazem-deteccoes', daemon=True)
+                    self._thread.start()
+        try:
+            self._fila.put_nowait((int((instante or time.time()) * 1000), str(fonte), deteccoes))
+            return True
+        except queue.Full:
+            with self._lock:  # Chamado pelas threads das requisições ao mesmo tempo
+                self._contadores['dropped'] += 1
+            return False
+
+    def _loop(self):
+        conexao = self._conectar()
+        while True:
+            item = self._fila.get()
+            if item is None:
+                self._fila.task_done()
+                return
+            itens = [item]
+            linhas = len(item[2])
+            limite = time.monotonic() + self.intervalo
+            parar = False
+            while linhas < self.lote:
+                try:
+                    item = self._fila.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    parar = True
+                    break
+                itens.append(item)
+                linhas += len(item[2])
+            try:
+                self._gravar(conexao, itens)
+            except sqlite3.Error as e:
+                with self._lock:
+                    self._contadores['errors'] += 1
+                print(f"Erro ao gravar as detecções: {e}")
+            for _ in range(len(itens) + parar):
+                self._fila.task_done()
+            if parar:
+                return
+
+    # Id de cada fonte (criado na primeira vez em que a fonte aparece)
+    def _id_fonte(self, conexao, nome):
+        id_fonte = self._fontes.get(nome)
+        if id_fonte is None:
+            conexao.execute('INSERT OR IGNORE INTO fontes (nome) VALUES (?)', (nome,))
+            id_fonte = conexao.execute('SELECT id FROM fontes WHERE nome = ?', (nome,)).fetchone()[0]
+            self._fontes[nome] = id_fonte
+        return id_fonte
+
+    # Grava um lote de imagens em uma única transação: as detecções e as contagens de cada resolução
+    def _gravar(self, conexao, itens):
+        inicio = time.perf_counter()
+        with conexao:
+            linhas = []
+            contagens = Counter()
+            for ts, fonte, deteccoes in itens:
+                id_fonte = self._id_fonte(conexao, fonte)
+                janelas = [(resolucao, ts // (resolucao * 1000)) for resolucao in RESOLUCOES]
+                for resolucao, janela in janelas:
+                    contagens[(resolucao, CLASSE_IMAGENS, janela, id_fonte)] += 1
+                for d in deteccoes:
+                    classe = int(d['class_id'])
+                    linhas.append((ts, id_fonte, classe, round(float(d['confidence']), 4), *map(float, d['box'])))
+                    for resolucao, janela in janelas:
+                        contagens[(resolucao, classe, janela, id_fonte)] += 1
+            conexao.executemany('INSERT INTO deteccoes VALUES (?, ?, ?, ?, ?, ?, ?, ?)', linhas)
+            conexao.executemany(
+                'INSERT INTO contagens VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (resolucao, classe, janela, fonte) DO UPDATE SET n = n + excluded.n',
+                [(*chave, n) for chave, n in contagens.items()])
+        with self._lock:
+            self._contadores['images'] += len(itens)
+            self._contadores['written'] += len(linhas)
+            self._contadores['batches'] += 1
+        self._ultimo_lote_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+    # Espera a fila atual ser gravada (ex.: antes de consultar logo após registrar, ou ao encerrar)
+    def descarregar(self):
+        if self._thread is not None:
+            self._fila.join()
+
+    # Grava o que estiver na fila e encerra a thread de gravação
+    def fechar(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.put(None)
+            self._fila.join()
+        self._thread = None
+
+    # Função para resolver o id de uma fonte pelo nome (None se ela nunca foi registrada)
+    def _buscar_fonte(self, conexao, nome):
+        linha = conexao.execute('SELECT id FROM fontes WHERE nome = ?', (nome,)).fetchone()
+        return linha[0] if linha else None
+
+    # Contagem de detecções por classe em janelas de `intervalo_s` segundos entre inicio e fim (segundos da época)
+    # classes: ids das classes (padrão: todas); fonte: nome da fonte (padrão: todas)
+    # Com intervalos múltiplos de uma hora ou de um minuto a consulta usa as contagens pré-agregadas (início
+    # e fim arredondados para a hora/minuto); intervalos menores contam as detecções pelo índice de instante
+    # Retorna a lista de janelas com o início (s), o número de imagens (None nas janelas < 1 min) e a
+    # contagem de cada classe
+    def contagens(self, inicio, fim, intervalo_s=3600, classes=None, fonte=None):
+        conexao = self._conexao_leitura()
+        intervalo_s = max(1, int(intervalo_s))
+        filtros = []
+        argumentos = []
+        if fonte is not None:
+            id_fonte = self._buscar_fonte(conexao, fonte)
+            if id_fonte is None:
+                return []
+            filtros.append('fonte = ?')
+            argumentos.append(id_fonte)
+
+        resolucao = next((r for r in RESOLUCOES if intervalo_s % r == 0), None)
+        if resolucao is not None:
+            origem = int(inicio) // resolucao
+            passo = intervalo_s // resolucao
+            if classes is not None:
+                filtros.append(f'classe IN ({",".join("?" * (len(classes) + 1))})')
+                argumentos.extend([CLASSE_IMAGENS, *map(int, classes)])
+            consulta = (f'SELECT (janela - ?) / ?, classe, SUM(n) FROM contagens WHERE resolucao = ? AND janela >= ? '
+                        f'AND janela < ?{"".join(" AND " + f for f in filtros)} GROUP BY 1, 2 ORDER BY 1')
+            linhas = conexao.execute(consulta, [origem, passo, resolucao, origem, -(-int(fim) // resolucao),
+                                                *argumentos]).fetchall()
+            escala = resolucao
+        else:
+            origem = int(inicio * 1000)
+            passo = intervalo_s * 1000
+            if classes is not None:
+                filtros.append(f'classe IN ({",".join("?" * len(classes))})')
+                argumentos.extend(map(int, classes))
+            consulta = (f'SELECT (ts - ?) / ?, classe, COUNT(*) FROM deteccoes WHERE ts >= ? AND ts < ?'
+                        f'{"".join(" AND " + f for f in filtros)} GROUP BY 1, 2 ORDER BY 1')
+            linhas = conexao.execute(consulta, [origem, passo, origem, int(fim * 1000), *argumentos]).fetchall()
+            escala = 0.001
+
+        janelas = {}
+        for indice, classe, n in linhas:
+            janela = janelas.get(indice)
+            if janela is None:
+                janela = janelas[indice] = {'start': (origem + indice * passo) * escala,
+                                            'images': 0 if resolucao else None, 'counts': {}}
+            if classe == CLASSE_IMAGENS:
+                janela['images'] = n
+            else:
+                janela['counts'][classe] = n
+        return [janelas[indice] for indice in sorted(janelas)]
+
+    # Detecções individuais entre inicio e fim (segundos da época), das mais recentes para as mais antigas
+    def deteccoes(self, inicio, fim, classe=None, fonte=None, limite=1000):
+        conexao = self._conexao_leitura()
+        consulta = ('SELECT ts, fontes.nome, classe, conf, x1, y1, x2, y2 FROM deteccoes '
+                    'JOIN fontes ON fontes.id = deteccoes.fonte WHERE ts >= ? AND ts < ?')
+        argumentos = [int(inicio * 1000), int(fim * 1000)]
+        if classe is not None:
+            consulta += ' AND classe = ?'
+            argumentos.append(int(classe))
+        if fonte is not None:
+            consulta += ' AND fontes.nome = ?'
+            argumentos.append(fonte)
+        consulta += ' ORDER BY ts DESC LIMIT ?'
+        argumentos.append(int(limite))
+        return [{'timestamp': ts / 1000, 'source': nome, 'class_id': c, 'confidence': p, 'box': [x1, y1, x2, y2]}
+                for ts, nome, c, p, x1, y1, x2, y2 in conexao.execute(consulta, argumentos)]
+
+    # Nomes das fontes já registradas
+    def fontes(self):
+        return [nome for nome, in self._conexao_leitura().execute('SELECT nome FROM fontes ORDER BY nome')]
+
+    # Contadores de imagens e detecções gravadas, descartadas, lotes e tamanho da fila
+    def stats(self):
+        with self._lock:
+            contadores = dict(self._contadores)
+        return dict(contadores, queue_depth=self._fila.qsize(), max_queue=self.max_fila,
+                    last_batch_ms=self._ultimo_lote_ms, path=self.caminho)
+
+
+# Função para abrir o armazenamento configurado (DETECTION_STORE); retorna None se ele estiver desligado
+def abrir_armazem(caminho=DETECTION_STORE):
+    return ArmazemDeteccoes(caminho) if caminho else None
+
+
+# Benchmark de linha de comando: python interface_modelo/armazenamento.py [--linhas 10000000] [--banco arquivo]
+# Grava detecções sintéticas (vários locais e classes ao longo de 30 dias) e mede a vazão da gravação
+# e o tempo das consultas de contagem por hora e por dia
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark do armazenamento de detecções.')
+    parser.add_argument('--linhas', type=int, default=1_000_000, help='Detecções sintéticas a gravar')
+    parser.add_argument('--banco', default='benchmark_deteccoes.sqlite3')
+    args = parser.parse_args()
+
+    import random
+
+    gerador = random.Random(0)
+    armazem = ArmazemDeteccoes(args.banco, max_fila=1_000_000)
+    fim = time.time()
+    inicio_dados = fim - 30 * 86400
+    por_imagem = 5
+    inicio = time.perf_counter()
+    for i in range(args.linhas // por_imagem):
+        deteccoes = [{'class_id': gerador.randrange(8), 'confidence': gerador.random(), 'box': [10.0, 20.0, 110.0, 220.0]}
+                     for _ in range(por_imagem)]
+        while not armazem.registrar(f'canteiro{i % 12}', deteccoes, inicio_dados + (fim - inicio_dados) * i * por_imagem / args.linhas):
+            time.sleep(0.01)
+    armazem.descarregar()
+    duracao = time.perf_counter() - inicio
+    print(f'Gravação: {args.linhas} detecções em {duracao:.1f} s ({args.linhas / duracao:,.0f} detecções/s)')
+    print(json.dumps(armazem.stats()))
+
+    for descricao, kwargs in (('por hora, 30 dias, todas as classes', {'intervalo_s': 3600}),
+                              ('por dia, 30 dias, classe 0, um local', {'intervalo_s': 86400, 'classes': [0], 'fonte': 'canteiro3'}),
+                              ('por 10 s, última hora, classe 0', {'intervalo_s': 10, 'classes': [0]})):
+        janela = 3600 if kwargs['intervalo_s'] < 60 else 30 * 86400
+        inicio = time.perf_counter()
+        resultado = armazem.contagens(fim - janela, fim, **kwargs)
+        print(f'Contagem {descricao}: {len(resultado)} janelas em {(time.perf_counter() - inicio) * 1000:.1f} ms')
+    armazem.fechar()
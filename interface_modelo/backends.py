@@ -0,0 +1,306 @@
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+# Backends disponíveis: nome -> argumentos de exportação do ultralytics (None = pesos PyTorch originais)
+# As exportações usam batch dinâmico para funcionar com o agrupamento de inferência do servidor
+BACKENDS = {
+    'pytorch': None,
+    'torchscript': {'format': 'torchscript'},
+    'onnx': {'format': 'onnx', 'dynamic': True, 'simplify': True},
+    'openvino': {'format': 'openvino', 'dynamic': True},
+    'openvino_int8': {'format': 'openvino', 'dynamic': True, 'int8': True},
+}
+
+# Configuração da seleção automática (pode ser ajustada por variáveis de ambiente)
+# MODEL_BACKEND força um backend e pula o benchmark; MODEL_BACKENDS define os candidatos
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND') or None
+MODEL_BACKENDS = [b.strip() for b in os.environ.get('MODEL_BACKENDS', 'pytorch,torchscript,onnx,openvino').split(',') if b.strip()]
+MODEL_ACCURACY_TOLERANCE = float(os.environ.get('MODEL_ACCURACY_TOLERANCE', '0.02'))
+MODEL_BENCHMARK_RUNS = int(os.environ.get('MODEL_BENCHMARK_RUNS', '5'))
+MODEL_INT8_DATA = os.environ.get('MODEL_INT8_DATA') or None  # YAML do dataset de calibração INT8
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AMOSTRA_PADRAO = os.path.join(DIRETORIO_RAIZ, 'teste.jpg')
+
+
+# Função para calcular a matriz de IoU entre dois conjuntos de caixas (x1, y1, x2, y2)
+def iou_matriz(a, b):
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+# Função para medir a concordância entre as detecções de referência e as de um backend
+# Pares com a mesma classe e IoU >= iou_min são casados de forma gulosa
+# Retorna um valor entre 0 e 1 (1 = mesmas detecções)
+def concordancia(ref_caixas, ref_classes, caixas, classes, iou_min=0.5):
+    if len(ref_caixas) == 0 and len(caixas) == 0:
+        return 1.0
+    if len(ref_caixas) == 0 or len(caixas) == 0:
+        return 0.0
+    ious = iou_matriz(ref_caixas, caixas)
+    ious[np.asarray(ref_classes)[:, None] != np.asarray(classes)[None, :]] = 0
+    casados = 0
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < iou_min:
+            break
+        casados += 1
+        ious[i, :] = 0
+        ious[:, j] = 0
+    return casados / max(len(ref_caixas), len(caixas))
+
+
+# Função para criar o modelo do ultralytics
+# O ultralytics (e com ele o PyTorch) só é importado quando um modelo é carregado ou exportado,
+# então quem só usa as funções de IoU (fatiamento, rastreamento) não paga essa importação
+def YOLO(*args, **kwargs):
+    from ultralytics import YOLO as _YOLO
+    return _YOLO(*args, **kwargs)
+
+
+# Função para exportar os pesos para o backend pedido, reaproveitando a exportação se já existir
+# Retorna o caminho do modelo exportado
+def exportar_backend(caminho_pesos, nome):
+    argumentos = BACKENDS[nome]
+    if argumentos is None:
+        return caminho_pesos
+
+    base, _ = os.path.splitext(caminho_pesos)
+    if argumentos['format'] == 'openvino':
+        destino = f"{base}{'_int8' if argumentos.get('int8') else ''}_openvino_model"
+    else:
+        destino = f"{base}.{argumentos['format']}"
+
+    if os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(caminho_pesos):
+        return destino
+
+    argumentos = dict(argumentos)
+    if argumentos.get('int8') and MODEL_INT8_DATA:
+        argumentos['data'] = MODEL_INT8_DATA
+    exportado = YOLO(caminho_pesos).export(**argumentos)
+    return str(exportado)
+
+
+# Função para carregar a imagem de calibração no formato esperado pelo ultralytics (BGR)
+# Usa uma imagem sintética se a amostra não existir
+def carregar_amostra(caminho_amostra):
+    img = cv2.imread(caminho_amostra) if caminho_amostra else None
+    if img is None:
+        img = np.full((640, 640, 3), 114, dtype=np.uint8)
+    return img
+
+
+# Função para medir o tempo médio de inferência e extrair as detecções de um modelo na amostra
+def medir_backend(modelo, amostra, repeticoes):
+    resultado = modelo(amostra, verbose=False)[0]  # Aquecimento
+    tempos = []
+    for _ in range(max(1, repeticoes)):
+        inicio = time.perf_counter()
+        modelo(amostra, verbose=False)
+        tempos.append(time.perf_counter() - inicio)
+    caixas = resultado.boxes.xyxy.cpu().numpy()
+    classes = resultado.boxes.cls.cpu().numpy().astype(int)
+    return float(np.median(tempos)) * 1000, caixas, classes
+
+
+# Função para ler a seleção salva de uma inicialização anterior
+# Só é reaproveitada se os pesos, os candidatos e a tolerância forem os mesmos
+def _ler_selecao(caminho_selecao, impressao):
+    try:
+        with open(caminho_selecao, 'r', encoding='utf-8') as f:
+            selecao = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return selecao if selecao.get('fingerprint') == impressao else None
+
+
+# Função para carregar o modelo com o backend de CPU mais rápido dentro da tolerância de precisão
+# Exporta os pesos para cada candidato, mede o tempo na amostra e compara as detecções com a referência PyTorch
+# Retorna o modelo, os nomes das classes e o relatório da seleção
+def carregar_modelo_otimizado(caminho_pesos, caminho_amostra=AMOSTRA_PADRAO, backends=None, backend=MODEL_BACKEND,
+                              tolerancia=MODEL_ACCURACY_TOLERANCE, repeticoes=MODEL_BENCHMARK_RUNS):
+    backends = list(backends or MODEL_BACKENDS)
+
+    # Backend forçado ou pesos já exportados (ex.: best.torchscript): carrega direto, sem benchmark
+    if backend or not caminho_pesos.endswith('.pt'):
+        nome = backend or 'pytorch'
+        caminho = exportar_backend(caminho_pesos, nome) if caminho_pesos.endswith('.pt') else caminho_pesos
+        modelo = YOLO(caminho, task='detect')
+        return modelo, modelo.names, {'backend': nome, 'path': caminho, 'benchmark': None}
+
+    caminho_selecao = os.path.splitext(caminho_pesos)[0] + '.backend.json'
+    st = os.stat(caminho_pesos)
+    impressao = f'{st.st_size}:{st.st_mtime_ns}:{",".join(backends)}:{tolerancia}'
+    selecao = _ler_selecao(caminho_selecao, impressao)
+    if selecao is not None:
+        try:
+            modelo = YOLO(selecao['path'], task='detect')
+            return modelo, modelo.names, selecao
+        except Exception as e:
+            print(f"Erro ao carregar o backend salvo '{selecao['backend']}': {e}")
+
+    amostra = carregar_amostra(caminho_amostra)
+    referencia = YOLO(caminho_pesos)
+    tempo_ref, ref_caixas, ref_classes = medir_backend(referencia, amostra, repeticoes)
+
+    relatorio = {'pytorch': {'path': caminho_pesos, 'latency_ms': round(tempo_ref, 3), 'agreement': 1.0}}
+    escolhido, modelo_escolhido, melhor_tempo = 'pytorch', referencia, tempo_ref
+
+    for nome in backends:
+        if nome == 'pytorch':
+            continue
+        if nome not in BACKENDS:
+            relatorio[nome] = {'error': 'backend desconhecido'}
+            continue
+        try:
+            caminho = exportar_backend(caminho_pesos, nome)
+            modelo = YOLO(caminho, task='detect')
+            tempo, caixas, classes = medir_backend(modelo, amostra, repeticoes)
+        except Exception as e:
+            # Dependência opcional ausente (onnxruntime, openvino...) ou falha na exportação
+            relatorio[nome] = {'error': str(e)}
+            continue
+
+        acordo = concordancia(ref_caixas, ref_classes, caixas, classes)
+        aceito = acordo >= 1 - tolerancia
+        relatorio[nome] = {'path': caminho, 'latency_ms': round(tempo, 3), 'agreement': round(acordo, 4), 'accepted': aceito}
+        if aceito and tempo < melhor_tempo:
+            escolhido, modelo_escolhido, melhor_tempo = nome, modelo, tempo
+
+    selecao = {
+        'backend': escolhido,
+        'path': relatorio[escolhido]['path'],
+        'fingerprint': impressao,
+        'tolerance': tolerancia,
+        'benchmark': relatorio,
+    }
+    try:
+        with open(caminho_selecao, 'w', encoding='utf-8') as f:
+            json.dump(selecao, f, indent=2)
+    except OSError as e:
+        print(f"Não foi possível salvar a seleção de backend: {e}")
+
+    print(f"Backend selecionado: {escolhido} ({melhor_tempo:.1f} ms na amostra)")
+    return modelo_escolhido, modelo_escolhido.names, selecao
+
+
+# Carregador do modelo em segundo plano: importa o ultralytics, carrega o modelo com carregar_modelo_otimizado
+# e aquece com uma imagem sintética 640x640 em uma thread, sem bloquear quem o criou (janela, servidor, CLI)
+# Quem precisa do modelo acessa .modelo/.class_names/.info, que esperam o carregamento terminar
+# relatorio() traz o tempo de cada etapa da inicialização
+class CarregadorModelo:
+    def __init__(self, caminho_pesos, aquecer=True, tamanho_aquecimento=640):
+        self.caminho_pesos = caminho_pesos
+        self.aquecer = aquecer
+        self.tamanho_aquecimento = tamanho_aquecimento
+        self._modelo = None
+        self._class_names = None
+        self._info = {}
+        self._erro = None
+        self._pronto = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._tempos = {}
+
+    # Inicia o carregamento em segundo plano (chamadas repetidas não fazem nada); retorna o próprio carregador
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._carregar, name='carregador-modelo', daemon=True)
+                self._thread.start()
+        return self
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        try:
+            import ultralytics  # noqa: F401  (importação medida separadamente do carregamento)
+            self._tempos['import_s'] = round(time.perf_counter() - inicio, 3)
+
+            inicio = time.perf_counter()
+            self._modelo, self._class_names, self._info = carregar_modelo_otimizado(self.caminho_pesos)
+            self._tempos['load_s'] = round(time.perf_counter() - inicio, 3)
+
+            if self.aquecer:
+                self._aquecer()
+        except Exception as e:
+            self._erro = e
+            print(f"Erro ao carregar o modelo: {e}")
+        finally:
+            self._pronto.set()
+
+    # Roda o modelo uma vez em uma imagem sintética para criar o preditor, alocar os buffers e iniciar as threads
+    def _aquecer(self):
+        inicio = time.perf_counter()
+        lado = self.tamanho_aquecimento
+        self._modelo(np.full((lado, lado, 3), 114, dtype=np.uint8), verbose=False)
+        self._tempos['warmup_s'] = round(time.perf_counter() - inicio, 3)
+
+    # Espera o carregamento terminar; relança o erro do carregamento, se houver
+    def aguardar(self, timeout=None):
+        self.iniciar()
+        if not self._pronto.wait(timeout):
+            raise TimeoutError('O modelo ainda está carregando')
+        if self._erro is not None:
+            raise self._erro
+        return self
+
+    @property
+    def pronto(self):
+        return self._pronto.is_set() and self._erro is None
+
+    @property
+    def modelo(self):
+        return self.aguardar()._modelo
+
+    @property
+    def class_names(self):
+        return self.aguardar()._class_names
+
+    @property
+    def info(self):
+        return self.aguardar()._info
+
+    # Recarrega o modelo a partir do backend já escolhido (ex.: em um worker após o fork) e aquece de novo
+    # Enquanto isso o carregador não fica pronto (quem acessar .modelo espera)
+    def recarregar(self):
+        self.aguardar()
+        self._pronto.clear()
+        try:
+            caminho = self._info.get('path') or self.caminho_pesos
+            inicio = time.perf_counter()
+            self._modelo, self._class_names, _ = carregar_modelo_otimizado(caminho)
+            self._tempos['load_s'] = round(time.perf_counter() - inicio, 3)
+            if self.aquecer:
+                self._aquecer()
+        finally:
+            self._pronto.set()
+
+    # Aquece de novo o modelo já carregado (ex.: depois de mudar o número de threads do PyTorch)
+    def reaquecer(self):
+        self.aguardar()
+        self._pronto.clear()
+        try:
+            self._aquecer()
+        finally:
+            self._pronto.set()
+
+    # Relatório da inicialização: tempo de importação, carregamento e aquecimento, backend e estado
+    def relatorio(self):
+        relatorio = dict(self._tempos, ready=self.pronto, backend=self._info.get('backend'))
+        if self._erro is not None:
+            relatorio['error'] = str(self._erro)
+        return relatorio
@@ -0,0 +1,208 @@
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from interface_modelo.backends import iou_matriz
+from interface_modelo.desenho import arrays_resultado
+from interface_modelo.filtros import COMBINACOES, FILTROS, VariantesFiltros, nomes_filtros
+
+
+# Configuração da busca automática de filtros (pode ser ajustada por variáveis de ambiente)
+FILTER_SEARCH_BUDGET_MS = float(os.environ.get('FILTER_SEARCH_BUDGET_MS', '2000'))  # Orçamento de latência da busca
+FILTER_SEARCH_BATCH = int(os.environ.get('FILTER_SEARCH_BATCH', '32'))  # Combinações por chamada do modelo
+FILTER_SEARCH_MAX = int(os.environ.get('FILTER_SEARCH_MAX', '32'))  # Máximo de combinações avaliadas (das mais baratas)
+FILTER_SEARCH_SCORE = os.environ.get('FILTER_SEARCH_SCORE', 'estabilidade').lower()
+
+# Critérios de pontuação das combinações (com os nomes em inglês aceitos pela API)
+CRITERIOS = ('estabilidade', 'confianca')
+APELIDOS_CRITERIOS = {'stability': 'estabilidade', 'confidence': 'confianca'}
+
+# Uma detecção é "a mesma" em outra versão da imagem se tiver a mesma classe e IoU >= IOU_APOIO
+IOU_APOIO = 0.5
+
+# Peso de cada filtro no custo estimado de uma combinação: o bilateral é de longe o mais caro,
+# as operações ponto a ponto (brilho e normalização) entram na LUT e quase não custam
+_CUSTO_FILTROS = (1.0, 4.0, 1.0, 0.1, 0.1)
+
+
+# Critério de pontuação desconhecido
+class CriterioInvalido(ValueError):
+    pass
+
+
+# Função para normalizar o nome do critério (estabilidade/stability ou confianca/confidence)
+def normalizar_criterio(nome):
+    criterio = APELIDOS_CRITERIOS.get(nome.strip().lower(), nome.strip().lower())
+    if criterio not in CRITERIOS:
+        raise CriterioInvalido(f'Critério de pontuação desconhecido: {nome}')
+    return criterio
+
+
+# Função para ordenar as combinações pelo custo estimado (a imagem sem filtros primeiro)
+# Se o orçamento acabar, ficam de fora as combinações com os filtros mais caros
+def ordenar_combinacoes(combinacoes):
+    return sorted(set(tuple(bool(o) for o in c) for c in combinacoes),
+                  key=lambda c: (sum(p for p, ligado in zip(_CUSTO_FILTROS, c) if ligado), sum(c), c))
+
+
+# Função para pontuar as versões da imagem a partir das detecções de cada uma
+# confianca: soma das confianças (mais detecções e mais confiantes)
+# estabilidade: soma das confianças ponderadas pela fração das outras versões em que a mesma detecção
+# aparece; detecções que só um filtro "inventa" valem pouco, e as que se mantêm entre os filtros valem mais
+# Retorna a lista de pontuações, na ordem das versões
+def pontuar(deteccoes, criterio='estabilidade'):
+    if criterio == 'confianca' or len(deteccoes) < 2:
+        return [float(confs.sum()) for _, confs, _ in deteccoes]
+
+    apoios = [np.zeros(len(confs)) for _, confs, _ in deteccoes]
+    for i, (caixas_i, _, classes_i) in enumerate(deteccoes):
+        if len(caixas_i) == 0:
+            continue
+        for j in range(i + 1, len(deteccoes)):
+            caixas_j, _, classes_j = deteccoes[j]
+            if len(caixas_j) == 0:
+                continue
+            casadas = (iou_matriz(caixas_i, caixas_j) >= IOU_APOIO) & (classes_i[:, None] == classes_j[None, :])
+            apoios[i] += casadas.any(axis=1)
+            apoios[j] += casadas.any(axis=0)
+    outras = len(deteccoes) - 1
+    return [float((confs * apoio / outras).sum()) for (_, confs, _), apoio in zip(deteccoes, apoios)]
+
+
+# Busca automática da melhor combinação de filtros de pré-processamento para uma imagem
+# As versões da imagem são geradas a partir de uma única decodificação, compartilhando os prefixos dos
+# filtros (VariantesFiltros), e inferidas em lote (até `lote` versões por chamada do modelo)
+# O tempo por versão (filtros + inferência) é guardado entre as buscas: quando o orçamento não comporta
+# todas as combinações, o lote é reduzido e as combinações mais caras ficam de fora
+class BuscaFiltros:
+    def __init__(self, orcamento_ms=FILTER_SEARCH_BUDGET_MS, lote=FILTER_SEARCH_BATCH, maximo=FILTER_SEARCH_MAX,
+                 criterio=FILTER_SEARCH_SCORE):
+        self.orcamento_ms = orcamento_ms
+        self.lote = max(1, lote)
+        self.maximo = max(1, maximo)
+        self.criterio = normalizar_criterio(criterio)
+        self._ms_por_versao = None  # Média móvel do custo de uma versão (filtros + inferência)
+        self._lock = threading.Lock()
+
+    # Atualiza a média móvel do custo de uma versão
+    def _observar(self, ms_por_versao):
+        with self._lock:
+            if self._ms_por_versao is None:
+                self._ms_por_versao = ms_por_versao
+            else:
+                self._ms_por_versao = 0.7 * self._ms_por_versao + 0.3 * ms_por_versao
+
+    # Procura a melhor combinação de filtros para a imagem (array uint8 HxWx3)
+    # inferir: função que recebe uma lista de imagens e retorna a lista de Results (uma chamada em lote)
+    # combinacoes: subconjunto das combinações a avaliar (padrão: todas as 32)
+    # conf_min: confiança mínima das detecções consideradas na pontuação
+    # A imagem sem filtros é sempre avaliada, então sempre há um resultado, mesmo com o orçamento estourado
+    # Retorna um dicionário com a melhor combinação (best, filters), a imagem filtrada (image), o Results
+    # (result), a pontuação, a classificação das combinações avaliadas e os tempos
+    def buscar(self, img, inferir, combinacoes=None, conf_min=0.0, criterio=None, orcamento_ms=None):
+        inicio = time.perf_counter()
+        criterio = normalizar_criterio(criterio) if criterio else self.criterio
+        orcamento_ms = self.orcamento_ms if orcamento_ms is None else orcamento_ms
+        limite = inicio + orcamento_ms / 1000
+
+        pendentes = ordenar_combinacoes(COMBINACOES if combinacoes is None else combinacoes)
+        if not pendentes or any(pendentes[0]):
+            pendentes.insert(0, (False,) * len(FILTROS))
+        pendentes = pendentes[:self.maximo]
+        variantes = VariantesFiltros(img)
+        avaliadas, imagens, resultados = [], [], []
+        filtros_ms = inferencia_ms = 0.0
+
+        while pendentes:
+            n = min(self.lote, len(pendentes))
+            if self._ms_por_versao:
+                # Só as versões que cabem no que resta do orçamento (pelo menos a imagem sem filtros)
+                restante_ms = (limite - time.perf_counter()) * 1000
+                n = min(n, int(restante_ms // self._ms_por_versao))
+                if n <= 0:
+                    if avaliadas:
+                        break
+                    n = 1
+            bloco, pendentes = pendentes[:n], pendentes[n:]
+
+            inicio_bloco = time.perf_counter()
+            versoes = [variantes(c) for c in bloco]
+            meio = time.perf_counter()
+            resultados_bloco = inferir(versoes)
+            fim = time.perf_counter()
+            filtros_ms += (meio - inicio_bloco) * 1000
+            inferencia_ms += (fim - meio) * 1000
+            self._observar((fim - inicio_bloco) * 1000 / len(bloco))
+
+            avaliadas.extend(bloco)
+            imagens.extend(versoes)
+            resultados.extend(resultados_bloco)
+
+        inicio_pontuacao = time.perf_counter()
+        deteccoes = []
+        for resultado in resultados:
+            caixas, confs, classes = arrays_resultado(resultado)
+            mantidas = confs >= conf_min
+            deteccoes.append((caixas[mantidas], confs[mantidas], classes[mantidas]))
+        pontuacoes = pontuar(deteccoes, criterio)
+        # Em caso de empate fica a combinação mais barata (avaliada antes)
+        ordem = sorted(range(len(avaliadas)), key=lambda i: (-pontuacoes[i], i))
+        melhor = ordem[0]
+        fim = time.perf_counter()
+
+        return {
+            'best': avaliadas[melhor],
+            'filters': nomes_filtros(avaliadas[melhor]),
+            'image': imagens[melhor],
+            'result': resultados[melhor],
+            'score': round(pontuacoes[melhor], 4),
+            'criterion': criterio,
+            'ranking': [{'filters': nomes_filtros(avaliadas[i]), 'score': round(pontuacoes[i], 4),
+                         'detections': len(deteccoes[i][1])} for i in ordem],
+            'evaluated': len(avaliadas),
+            'skipped': len(pendentes),
+            'budget_ms': orcamento_ms,
+            'filters_ms': round(filtros_ms, 3),
+            'filter_stages_ms': variantes.tempos,
+            'inference_ms': round(inferencia_ms, 3),
+            'score_ms': round((fim - inicio_pontuacao) * 1000, 3),
+            'total_ms': round((fim - inicio) * 1000, 3),
+        }
+
+
+# Função para resumir uma busca em um dicionário serializável em JSON (sem a imagem e o Results)
+# limite: quantas combinações da classificação incluir
+def resumo_busca(busca, limite=5):
+    resumo = {k: v for k, v in busca.items() if k not in ('best', 'image', 'result')}
+    resumo['ranking'] = busca['ranking'][:limite]
+    return resumo
+
+
+# Busca de linha de comando: python interface_modelo/busca_filtros.py [imagem] [orçamento em ms] [critério]
+# Mostra a classificação das combinações de filtros para a imagem com o modelo best.pt
+if __name__ == '__main__':
+    from interface_modelo.backends import carregar_modelo_otimizado
+
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join(raiz, 'teste.jpg')
+    orcamento = float(sys.argv[2]) if len(sys.argv) > 2 else FILTER_SEARCH_BUDGET_MS
+    criterio = sys.argv[3] if len(sys.argv) > 3 else FILTER_SEARCH_SCORE
+    img = cv2.imread(caminho)
+    if img is None:
+        sys.exit(f'Não foi possível ler a imagem: {caminho}')
+
+    modelo, _, _ = carregar_modelo_otimizado(os.path.join(raiz, 'best.pt'))
+    busca_filtros = BuscaFiltros(orcamento_ms=orcamento, criterio=criterio)
+    inferir = lambda imagens: modelo(imagens, verbose=False)
+    busca_filtros.buscar(img, inferir, combinacoes=[(False,) * len(FILTROS)])  # Aquecimento (e primeira medida do custo)
+    busca = busca_filtros.buscar(img, inferir, conf_min=0.25)
+
+    print(f'Imagem {caminho} ({img.shape[1]}x{img.shape[0]}), {busca["evaluated"]} combinações avaliadas, '
+          f'{busca["skipped"]} fora do orçamento de {orcamento:.0f} ms')
+    for posicao, item in enumerate(busca['ranking'], 1):
+        print(f'{posicao:2}. {"+".join(item["filters"]) or "(sem filtros)":55} {item["score"]:8.3f} {item["detections"]:4} detecções')
+    print({k: busca[k] for k in ('filters_ms', 'filter_stages_ms', 'inference_ms', 'score_ms', 'total_ms')})
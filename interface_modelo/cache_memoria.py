@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Função para estimar quantos bytes um valor ocupa (arrays NumPy, imagens PIL e tuplas/listas deles)
+def tamanho_aproximado(valor):
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if hasattr(valor, 'size') and hasattr(valor, 'getbands'):  # Imagem PIL
+        return valor.size[0] * valor.size[1] * len(valor.getbands())
+    if isinstance(valor, (tuple, list)):
+        return sum(tamanho_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sum(tamanho_aproximado(v) for v in valor.values())
+    return 64
+
+
+# Função para montar a chave de um arquivo (caminho, tamanho e data de modificação)
+# Assim a imagem é decodificada de novo se o arquivo for alterado no disco
+def chave_arquivo(caminho):
+    try:
+        st = os.stat(caminho)
+        return (os.path.abspath(caminho), st.st_size, st.st_mtime_ns)
+    except OSError:
+        return (caminho, None, None)
+
+
+# Cache LRU em memória limitado pelo total de bytes
+# Usado pela interface para guardar a imagem decodificada, as versões pré-processadas e as detecções
+class CacheMemoria:
+    def __init__(self, limite_mb=512):
+        self.limite_bytes = int(limite_mb * 1024 * 1024)
+        self._itens = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return item[0]
+
+    def guardar(self, chave, valor):
+        tamanho = tamanho_aproximado(valor)
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= antigo[1]
+            if tamanho > self.limite_bytes:
+                return valor
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while self._bytes > self.limite_bytes:
+                _, (_, removido) = self._itens.popitem(last=False)
+                self._bytes -= removido
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'itens': len(self._itens), 'bytes': self._bytes, 'acertos': self.acertos, 'faltas': self.faltas}
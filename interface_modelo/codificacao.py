@@ -0,0 +1,216 @@
+import io
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# Configuração da codificação das imagens anotadas (pode ser ajustada por variáveis de ambiente)
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'jpeg').lower()
+OUTPUT_QUALITY = int(os.environ.get('OUTPUT_QUALITY', '85'))
+OUTPUT_MAX_SIZE = int(os.environ.get('OUTPUT_MAX_SIZE', '0'))  # 0 mantém o tamanho da imagem anotada
+OUTPUT_PREVIEW_SIZE = int(os.environ.get('OUTPUT_PREVIEW_SIZE', '320'))  # Lado maior da prévia (preview=1)
+OUTPUT_PNG_COMPRESSION = int(os.environ.get('OUTPUT_PNG_COMPRESSION', '3'))  # 0-9: níveis altos são bem mais lentos
+OUTPUT_ENCODER = os.environ.get('OUTPUT_ENCODER', 'auto').lower()  # auto, cv2 ou pil
+
+# Formatos de saída: nome -> tipo MIME (a ordem é a preferência em caso de empate no Accept)
+FORMATOS = {'jpeg': 'image/jpeg', 'webp': 'image/webp', 'png': 'image/png'}
+APELIDOS = {'jpg': 'jpeg', 'image/jpeg': 'jpeg', 'image/webp': 'webp', 'image/png': 'png'}
+EXTENSOES = {'jpeg': '.jpg', 'webp': '.webp', 'png': '.png'}
+
+DIRETORIO_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AMOSTRA_PADRAO = os.path.join(DIRETORIO_RAIZ, 'teste.jpg')
+
+
+# Formato, qualidade ou tamanho de saída inválido
+class FormatoInvalido(ValueError):
+    pass
+
+
+# Função para normalizar o nome de um formato (jpg, image/png...); lança FormatoInvalido se não for suportado
+def normalizar_formato(nome):
+    formato = APELIDOS.get(nome.strip().lower(), nome.strip().lower())
+    if formato not in FORMATOS:
+        raise FormatoInvalido(f'Formato de saída desconhecido: {nome}')
+    return formato
+
+
+# Função para escolher o formato pelo cabeçalho Accept (ex.: "image/webp,image/*;q=0.8")
+# Tipos exatos valem mais que image/* e */* com o mesmo q; sem Accept (ou só */*) fica o formato padrão
+def negociar_formato(accept, padrao=OUTPUT_FORMAT):
+    pesos = {}
+    for item in (accept or '').split(','):
+        partes = [p.strip() for p in item.split(';')]
+        if not partes[0]:
+            continue
+        q = 1.0
+        for parametro in partes[1:]:
+            if parametro.startswith('q='):
+                try:
+                    q = float(parametro[2:])
+                except ValueError:
+                    q = 0.0
+        pesos[partes[0].lower()] = q
+
+    candidatos = []
+    for ordem, (formato, mime) in enumerate(FORMATOS.items()):
+        if mime in pesos:
+            q, exato = pesos[mime], 1
+        else:
+            q, exato = pesos.get('image/*', pesos.get('*/*', 0.0)), 0
+        if q > 0:
+            candidatos.append((q, exato, formato == padrao, -ordem, formato))
+    if not candidatos:
+        return padrao
+    return max(candidatos)[-1]
+
+
+# Função para reduzir a imagem para que o lado maior fique <= lado_maximo (INTER_AREA; sem ampliar)
+# Retorna a imagem e a escala aplicada
+def limitar_tamanho(img_np, lado_maximo):
+    altura, largura = img_np.shape[:2]
+    if not lado_maximo or max(altura, largura) <= lado_maximo:
+        return img_np, 1.0
+    escala = lado_maximo / max(altura, largura)
+    tamanho = (max(1, round(largura * escala)), max(1, round(altura * escala)))
+    return cv2.resize(img_np, tamanho, interpolation=cv2.INTER_AREA), escala
+
+
+# Codificador do OpenCV (libjpeg-turbo, libwebp e libpng embutidos); a imagem RGB é convertida para BGR
+# (imagens que já estão em BGR vão direto, sem conversão)
+def _codificar_cv2(img_rgb, formato, qualidade, bgr=False):
+    if formato == 'jpeg':
+        parametros = [int(cv2.IMWRITE_JPEG_QUALITY), qualidade]
+    elif formato == 'webp':
+        parametros = [int(cv2.IMWRITE_WEBP_QUALITY), qualidade]
+    else:
+        parametros = [int(cv2.IMWRITE_PNG_COMPRESSION), OUTPUT_PNG_COMPRESSION]
+    sucesso, dados = cv2.imencode(EXTENSOES[formato], img_rgb if bgr else cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR), parametros)
+    if not sucesso:
+        raise OSError(f'O OpenCV não codificou a imagem em {formato}')
+    return dados.tobytes()
+
+
+# Codificador do Pillow (imagens em BGR são convertidas para RGB)
+def _codificar_pil(img_rgb, formato, qualidade, bgr=False):
+    if bgr:
+        img_rgb = cv2.cvtColor(img_rgb, cv2.COLOR_BGR2RGB)
+    saida = io.BytesIO()
+    if formato == 'png':
+        Image.fromarray(img_rgb).save(saida, 'PNG', compress_level=OUTPUT_PNG_COMPRESSION)
+    else:
+        Image.fromarray(img_rgb).save(saida, formato.upper(), quality=qualidade)
+    return saida.getvalue()
+
+
+CODIFICADORES = {'cv2': _codificar_cv2, 'pil': _codificar_pil}
+
+# Codificador escolhido para cada formato (pelo benchmark na primeira codificação do formato)
+# e as medições do benchmark, consultadas em codificadores_escolhidos()
+_escolhidos = {}
+_medicoes = {}
+_lock = threading.Lock()
+
+
+# Função para ler a imagem de amostra do benchmark dos codificadores (teste.jpg ou uma imagem sintética)
+def _amostra(caminho=AMOSTRA_PADRAO, lado=640):
+    img = cv2.imread(caminho) if caminho else None
+    if img is None:
+        gerador = np.random.default_rng(0)
+        gradiente = np.linspace(0, 255, lado, dtype=np.float32)
+        img = (gradiente[None, :, None] + gerador.normal(0, 12, (lado, lado, 3))).clip(0, 255).astype(np.uint8)
+    img, _ = limitar_tamanho(img, lado)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+# Função para medir os codificadores disponíveis em um formato
+# Retorna {codificador: {'ms': mediana em ms, 'bytes': tamanho}}; codificadores sem suporte ao formato ficam de fora
+def medir_codificadores(formato, img_rgb=None, qualidade=OUTPUT_QUALITY, repeticoes=5):
+    img_rgb = _amostra() if img_rgb is None else img_rgb
+    medicoes = {}
+    for nome, codificador in CODIFICADORES.items():
+        try:
+            dados = codificador(img_rgb, formato, qualidade)  # Aquecimento (e teste de suporte)
+        except (OSError, KeyError, ValueError, cv2.error):
+            continue
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            codificador(img_rgb, formato, qualidade)
+            tempos.append(time.perf_counter() - inicio)
+        medicoes[nome] = {'ms': round(float(np.median(tempos)) * 1000, 3), 'bytes': len(dados)}
+    return medicoes
+
+
+# Função para obter o codificador de um formato: o forçado por OUTPUT_ENCODER ou o mais rápido no benchmark
+def escolher_codificador(formato):
+    if formato not in _escolhidos:
+        with _lock:
+            if formato not in _escolhidos:
+                if OUTPUT_ENCODER in CODIFICADORES:
+                    _escolhidos[formato] = OUTPUT_ENCODER
+                else:
+                    medicoes = medir_codificadores(formato)
+                    # Sem nenhum codificador (ex.: Pillow e OpenCV sem libwebp) o formato fica marcado como indisponível
+                    _escolhidos[formato] = min(medicoes, key=lambda n: medicoes[n]['ms']) if medicoes else None
+                    _medicoes[formato] = medicoes
+    if _escolhidos[formato] is None:
+        raise FormatoInvalido(f'Nenhum codificador disponível para {formato}')
+    return _escolhidos[formato]
+
+
+# Função para consultar os codificadores já escolhidos
+# Retorna {formato: {'encoder': codificador ou None, 'measurements': medições do benchmark ou None}}
+def codificadores_escolhidos():
+    with _lock:
+        return {formato: {'encoder': codificador, 'measurements': _medicoes.get(formato)}
+                for formato, codificador in _escolhidos.items()}
+
+
+# Função para codificar uma imagem RGB anotada no formato pedido
+# lado_maximo reduz a imagem antes (prévia); a qualidade vale para JPEG e WebP (PNG é sem perdas)
+# bgr=True indica que a imagem está em BGR (ex.: a do servidor, que é inferida em BGR)
+# Retorna os bytes e as informações da codificação (formato, tipo MIME, codificador, qualidade,
+# tamanho da imagem, bytes e tempo em ms)
+def codificar_imagem(img_rgb, formato=OUTPUT_FORMAT, qualidade=OUTPUT_QUALITY, lado_maximo=OUTPUT_MAX_SIZE, bgr=False):
+    formato = normalizar_formato(formato)
+    if not 1 <= qualidade <= 100:
+        raise FormatoInvalido(f'Qualidade fora do intervalo 1-100: {qualidade}')
+    codificador = escolher_codificador(formato)
+
+    inicio = time.perf_counter()
+    img_rgb, escala = limitar_tamanho(np.ascontiguousarray(img_rgb), lado_maximo)
+    dados = CODIFICADORES[codificador](img_rgb, formato, qualidade, bgr)
+    info = {
+        'format': formato,
+        'mimetype': FORMATOS[formato],
+        'encoder': codificador,
+        'quality': qualidade if formato != 'png' else None,
+        'size': [img_rgb.shape[1], img_rgb.shape[0]],
+        'scale': escala,
+        'bytes': len(dados),
+        'encode_ms': round((time.perf_counter() - inicio) * 1000, 3),
+    }
+    return dados, info
+
+
+# Benchmark de linha de comando: python interface_modelo/codificacao.py [imagem] [repetições]
+# Compara OpenCV e Pillow em cada formato (tempo e bytes) na imagem em 640 e em resolução total
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else AMOSTRA_PADRAO
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    original = cv2.imread(caminho)
+    if original is None:
+        sys.exit(f'Imagem não encontrada: {caminho}')
+    original = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
+
+    for lado in (640, 0):
+        img, _ = limitar_tamanho(original, lado)
+        print(f'Imagem {img.shape[1]}x{img.shape[0]}:')
+        for formato in FORMATOS:
+            for nome, medicao in medir_codificadores(formato, img, repeticoes=repeticoes).items():
+                print(f'  {formato:5} {nome:4} {medicao["ms"]:8.2f} ms {medicao["bytes"] / 1024:9.1f} KB')
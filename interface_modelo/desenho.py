@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+# Cores usadas para as classes (em BGR), repetidas de forma cíclica
+CORES = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255), (0, 255, 255)]
+CORES_RGB = [cor[::-1] for cor in CORES]
+COR_RESUMO = (0, 255, 255)
+
+
+# Função para extrair caixas, confianças e classes de um resultado do ultralytics como arrays NumPy
+# Cada tensor é copiado para a CPU uma única vez
+def arrays_resultado(result):
+    boxes = result.boxes
+    return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
+
+
+# Função para contar as detecções por classe com bincount
+# Retorna o dicionário {nome da classe: quantidade} na ordem dos ids das classes
+def contar_classes(classes, class_names):
+    classes = np.asarray(classes, dtype=np.intp)
+    if classes.size == 0:
+        return {}
+    contagem = np.bincount(classes, minlength=len(class_names))
+    return {class_names[int(i)]: int(contagem[i]) for i in np.flatnonzero(contagem)}
+
+
+# Função para desenhar as caixas, rótulos e a contagem por classe em uma imagem (no próprio array)
+# caixas: array Nx4 (x1, y1, x2, y2); confs e classes: arrays de tamanho N
+# prefixos: textos opcionais antes do nome da classe (ex.: id do rastreamento)
+# rgb=True desenha direto em uma imagem RGB, sem converter a imagem para BGR e de volta
+# Retorna a imagem desenhada e a contagem por classe
+def desenhar_deteccoes(img, caixas, confs, classes, class_names, prefixos=None, rgb=False):
+    cores = CORES_RGB if rgb else CORES
+    caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4).astype(np.int32)
+    classes = np.asarray(classes, dtype=np.intp)
+    confs = np.asarray(confs, dtype=np.float32)
+
+    # Conversões e textos preparados de uma vez só, fora do laço de desenho
+    pontos = caixas.tolist()
+    indices_cor = (classes % len(cores)).tolist()
+    nomes = [class_names[c] for c in classes.tolist()]
+    rotulos = [f'{nome} {conf:.2%}' for nome, conf in zip(nomes, confs.tolist())]
+    if prefixos is not None:
+        rotulos = [f'{prefixo} {rotulo}' for prefixo, rotulo in zip(prefixos, rotulos)]
+
+    for (x1, y1, x2, y2), indice_cor, rotulo in zip(pontos, indices_cor, rotulos):
+        color = cores[indice_cor]
+        cv2.rectangle(img, (x1, y1), (x2, y2), color, 2, lineType=cv2.LINE_AA)
+        cv2.putText(img, rotulo, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+    detections_count = contar_classes(classes, class_names)
+    cor_resumo = COR_RESUMO[::-1] if rgb else COR_RESUMO
+    for i, (class_name, count) in enumerate(detections_count.items()):
+        cv2.putText(img, f'{class_name}: {count} itens', (10, 30 + i * 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, cor_resumo, 2, lineType=cv2.LINE_AA)
+
+    return img, detections_count
+
+
+# Renderizador com buffer reaproveitado: copia a imagem de fundo para o mesmo array a cada chamada
+# (realocado só quando o tamanho muda) e desenha as detecções sobre ele
+# O array retornado é o buffer interno: copie-o se for guardar o resultado depois da próxima chamada
+class Renderizador:
+    def __init__(self, class_names, rgb=False):
+        self.class_names = class_names
+        self.rgb = rgb
+        self._buffer = None
+
+    def __call__(self, img, caixas, confs, classes, prefixos=None):
+        img = np.asarray(img)
+        if self._buffer is None or self._buffer.shape != img.shape:
+            self._buffer = np.empty_like(img)
+        np.copyto(self._buffer, img)
+        return desenhar_deteccoes(self._buffer, caixas, confs, classes, self.class_names, prefixos, self.rgb)
+
+
+# Benchmark de linha de comando: python interface_modelo/desenho.py [repetições]
+# Compara o desenho vetorizado com o laço antigo (indexação elemento a elemento e conversões RGB/BGR)
+if __name__ == '__main__':
+    import torch
+
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    caminho = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'teste.jpg')
+    fundo = cv2.imread(caminho)
+    fundo = cv2.cvtColor(fundo, cv2.COLOR_BGR2RGB) if fundo is not None else np.zeros((640, 640, 3), dtype=np.uint8)
+    altura, largura = fundo.shape[:2]
+    class_names = {i: f'classe{i}' for i in range(84)}
+    gerador = np.random.default_rng(0)
+
+    def laco_antigo(img, xyxy, conf, cls):
+        img_np = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+        for i in range(len(xyxy)):
+            x1, y1, x2, y2 = xyxy[i:i + 1][0]
+            c = int(cls[i:i + 1][0])
+            color = CORES[c % len(CORES)]
+            cv2.rectangle(img_np, (int(x1), int(y1)), (int(x2), int(y2)), color, 2, lineType=cv2.LINE_AA)
+            cv2.putText(img_np, f'{class_names[c]} {conf[i:i + 1][0]:.2%}', (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        return cv2.cvtColor(img_np, cv2.COLOR_BGR2RGB)
+
+    renderizador = Renderizador(class_names, rgb=True)
+    for n in (10, 100, 1000):
+        xy = gerador.uniform(0, [largura - 50, altura - 50], size=(n, 2))
+        caixas = np.hstack([xy, xy + gerador.uniform(10, 50, size=(n, 2))]).astype(np.float32)
+        confs = gerador.uniform(0.25, 1, size=n).astype(np.float32)
+        classes = gerador.integers(0, 84, size=n)
+        tensores = (torch.from_numpy(caixas), torch.from_numpy(confs), torch.from_numpy(classes.astype(np.float32)))
+
+        tempos = {}
+        for nome, funcao in (('antigo', lambda: laco_antigo(fundo, *tensores)),
+                             ('vetorizado', lambda: renderizador(fundo, *(t.numpy() for t in tensores)))):
+            medicoes = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                funcao()
+                medicoes.append(time.perf_counter() - inicio)
+            tempos[nome] = float(np.median(medicoes)) * 1000
+        print(f'{n:5d} caixas: antigo {tempos["antigo"]:.2f} ms, vetorizado {tempos["vetorizado"]:.2f} ms '
+              f'({tempos["antigo"] / tempos["vetorizado"]:.1f}x)')
@@ -0,0 +1,269 @@
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from interface_modelo.armazenamento import abrir_armazem
+from interface_modelo.backends import carregar_modelo_otimizado
+from interface_modelo.busca_filtros import BuscaFiltros
+from interface_modelo.cache_memoria import CacheMemoria, chave_arquivo
+from interface_modelo.codificacao import limitar_tamanho
+from interface_modelo.desenho import arrays_resultado, Renderizador
+from interface_modelo.fatiamento import inferencia_fatiada
+from interface_modelo.filtros import obter_pipeline
+from interface_modelo.letterbox import Letterbox
+from interface_modelo.metricas import Metricas
+
+# Núcleo da detecção da interface, sem Tk: pode ser importado por scripts, benchmarks e testes
+# Importar este módulo não importa o PyTorch nem o ultralytics nem carrega o modelo;
+# o modelo vem de um CarregadorModelo (interface_modelo.backends), carregado em segundo plano
+
+# Buffers do letterbox 640x640, reaproveitados entre as detecções (usados só pela thread de detecção)
+letterbox = Letterbox(640)
+
+# Cache em memória da imagem decodificada, das versões pré-processadas e das detecções
+# As detecções são guardadas com a confiança mínima CONF_BASE; mudar só a confiança refiltra o cache
+cache_memoria = CacheMemoria(limite_mb=512)
+CONF_BASE = 0.05
+
+# Tempo de cada etapa da detecção (METRICS_ENABLED=0 desliga); os tempos da última detecção aparecem no status
+metricas = Metricas(prefixo='interface')
+
+# Armazenamento das detecções (DETECTION_STORE; None quando desligado), com a fonte "interface"
+armazem = abrir_armazem()
+FONTE_INTERFACE = 'interface'
+
+# Busca automática da melhor combinação de filtros: opcoes=FILTROS_AUTO no lugar da tupla de opções
+# A busca é feita na imagem reduzida para o tamanho do modelo (LADO_BUSCA), onde os filtros custam pouco
+FILTROS_AUTO = 'auto'
+LADO_BUSCA = 640
+busca_filtros = BuscaFiltros()
+
+# Renderizador das detecções (buffer de desenho reaproveitado), criado com os nomes das classes do modelo
+_renderizador = None
+
+
+# Função para carregar o modelo treinado e obter as classes (carregamento síncrono, para scripts)
+# Usa o mesmo carregador do servidor, que escolhe o backend de CPU mais rápido
+# Retorna o modelo e os nomes das classes
+def carregar_modelo(caminho_modelo):
+    try:
+        model, class_names, _ = carregar_modelo_otimizado(caminho_modelo)
+        return model, class_names
+    except (AttributeError, OSError) as e:
+        print(f"Erro ao carregar o modelo: {e}")
+        return None, None
+
+# Função para obter o renderizador das detecções para as classes do modelo
+def obter_renderizador(class_names):
+    global _renderizador
+    if _renderizador is None:
+        _renderizador = Renderizador(class_names, rgb=True)
+    _renderizador.class_names = class_names
+    return _renderizador
+
+# Função para carregar a imagem
+# Retorna a imagem carregada como um objeto PIL
+def carregar_imagem(caminho):
+    img = cv2.imread(caminho)
+    if img is not None:
+        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(img_rgb)
+    return None
+
+# Função para obter a imagem decodificada do cache (ou carregá-la do disco na primeira vez)
+# Retorna a imagem como um objeto PIL e a chave do arquivo
+def obter_imagem(caminho):
+    chave = chave_arquivo(caminho)
+    img = cache_memoria.obter(('original', chave))
+    if img is None:
+        img = carregar_imagem(caminho)
+        if img is not None:
+            cache_memoria.guardar(('original', chave), img)
+    return img, chave
+
+# Função para aplicar pré-processamento na imagem
+# Usa o pipeline compilado das opções marcadas (buffers, CLAHE e tabelas reaproveitados entre chamadas)
+# opcoes: tupla com as cinco opções (equalização, suavização, nitidez, brilho, normalização)
+# Retorna a imagem pré-processada
+def pre_processar_imagem(img, opcoes):
+    pipeline = obter_pipeline(*opcoes)
+    if not pipeline.ativo:
+        return img
+
+    img_final = pipeline(np.array(img))
+    img_final_pil = Image.fromarray(img_final)  # Copia o buffer interno do pipeline
+
+    return img_final_pil
+
+
+# Função para fazer a detecção com o modelo
+# Um único redimensionamento letterbox gera o tensor do modelo e a imagem de exibição
+# Retorna as detecções, a imagem redimensionada e as caixas na resolução original
+def detectar_objetos(modelo, img, conf_threshold):
+    img_tensor = letterbox(img)
+
+    results = modelo(img_tensor, conf=conf_threshold)  # Ajuste o limite de confiança conforme necessário
+
+    img_resized = Image.fromarray(letterbox.imagem.copy())
+    caixas_originais = letterbox.para_original(results[0].boxes.xyxy.cpu().numpy())
+    return results, img_resized, caixas_originais
+
+# Função para fazer a detecção fatiada na resolução original (objetos pequenos em fotos grandes)
+# As fatias são inferidas em lote e as caixas são levadas para a imagem redimensionada de exibição
+# Retorna a imagem de exibição, as caixas (no espaço da exibição), confianças, classes e os tempos por etapa
+def detectar_objetos_fatiado(modelo, img, conf_threshold):
+    img_np = np.array(img)
+    caixas, confs, classes, tempos = inferencia_fatiada(
+        lambda imagens: modelo([cv2.cvtColor(i, cv2.COLOR_RGB2BGR) for i in imagens], conf=conf_threshold, verbose=False),
+        img_np,
+    )
+
+    letterbox(img, gerar_tensor=False)
+    return letterbox.imagem.copy(), letterbox.para_letterbox(caixas), confs, classes, tempos
+
+# Função para procurar a melhor combinação de filtros e detectar na versão escolhida
+# As 32 versões saem de uma única imagem reduzida e são inferidas em lote; a pontuação usa só as
+# detecções acima de conf_min (a confiança pedida), e as detecções voltam com a confiança conf_threshold
+# Retorna a imagem de exibição, as caixas (no espaço da exibição), confianças, classes e o resumo da busca
+def detectar_objetos_auto(modelo, img, conf_threshold, conf_min):
+    img_np, reducao = limitar_tamanho(np.array(img), LADO_BUSCA)
+    busca = busca_filtros.buscar(
+        img_np,
+        lambda imagens: modelo([cv2.cvtColor(i, cv2.COLOR_RGB2BGR) for i in imagens], conf=conf_threshold, verbose=False),
+        conf_min=conf_min,
+    )
+
+    caixas, confs, classes = arrays_resultado(busca['result'])
+    letterbox(busca['image'], gerar_tensor=False)
+    resumo = {k: busca[k] for k in ('filters', 'score', 'evaluated', 'skipped', 'total_ms')}
+    resumo['scale'] = reducao
+    return letterbox.imagem.copy(), letterbox.para_letterbox(caixas), confs, classes, resumo
+
+# Função para exibir a imagem com as detecções
+# Retorna a imagem com as caixas delimitadoras e as classes
+def exibir_resultados(img, results, class_names):
+    # Desenha direto em RGB em um buffer reaproveitado, sem converter a imagem para BGR e de volta
+    caixas, confs, classes = arrays_resultado(results[0])
+    img_np, _ = obter_renderizador(class_names)(img, caixas, confs, classes)
+
+    img_final = Image.fromarray(img_np)  # Copia o buffer do renderizador
+    return img_final
+
+
+# Função para gravar no armazenamento as detecções de uma imagem acima da confiança pedida
+# As caixas voltam do espaço da exibição para a imagem original; o instante é a data de modificação do arquivo
+# reducao: escala da imagem detectada em relação à original (na busca de filtros a imagem é reduzida antes)
+def registrar_deteccoes(caminho_imagem, caixas, confs, classes, conf_threshold, reducao=1.0):
+    if armazem is None:
+        return
+    mantidas = confs >= conf_threshold
+    caixas_originais = letterbox.para_original(caixas[mantidas]) / reducao
+    deteccoes = [{'class_id': int(c), 'confidence': float(p), 'box': caixa.tolist()}
+                 for caixa, p, c in zip(caixas_originais, confs[mantidas], classes[mantidas])]
+    try:
+        instante = os.path.getmtime(caminho_imagem)
+    except OSError:
+        instante = None
+    armazem.registrar(FONTE_INTERFACE, deteccoes, instante)
+
+
+# Tarefa nula para rodar a detecção fora do trabalhador da interface (scripts e benchmarks)
+class _SemTarefa:
+    def progresso(self, mensagem):
+        pass
+
+
+# Função para esperar o modelo, que na primeira detecção pode ainda estar carregando em segundo plano
+# Retorna o modelo carregado
+def _aguardar_modelo(carregador, tarefa):
+    if not carregador.pronto:
+        tarefa.progresso("Carregando o modelo...")
+        with metricas.etapa('aguardar_modelo'):
+            while True:
+                try:
+                    carregador.aguardar(timeout=0.2)
+                    break
+                except TimeoutError:
+                    tarefa.progresso("Carregando o modelo...")  # Interrompe se a detecção foi cancelada
+    return carregador.modelo
+
+
+# Função que roda a detecção completa (na interface, na thread de segundo plano)
+# carregador: CarregadorModelo; se o modelo ainda estiver carregando, espera por ele
+# Entre as etapas, tarefa.progresso() informa a etapa atual e interrompe se a detecção foi cancelada
+# Reaproveita do cache a imagem decodificada, a versão pré-processada e as detecções já calculadas
+# opcoes=FILTROS_AUTO procura a melhor combinação de filtros (sem fatiamento)
+# Retorna a imagem com as detecções, o título a exibir e o tempo de cada etapa (ms)
+def executar_deteccao(carregador, caminho_imagem, opcoes, conf_threshold, fatiada, tarefa=None):
+    tarefa = tarefa or _SemTarefa()
+    metricas.iniciar_requisicao()
+    tarefa.progresso("Carregando a imagem...")
+    with metricas.etapa('carregar'):
+        img, chave_img = obter_imagem(caminho_imagem)
+    if img is None:
+        raise FileNotFoundError(f"Erro ao carregar a imagem: {caminho_imagem}")
+
+    # As detecções são calculadas com uma confiança mais baixa e filtradas depois,
+    # então mudar só a confiança não roda o modelo de novo
+    conf_base = min(conf_threshold, CONF_BASE)
+    automatico = opcoes == FILTROS_AUTO
+    # Na busca automática a combinação escolhida depende da confiança pedida, que entra na chave
+    chave_deteccoes = ('deteccoes', chave_img, opcoes, fatiada and not automatico,
+                       (conf_base, conf_threshold) if automatico else conf_base)
+    deteccoes = cache_memoria.obter(chave_deteccoes)
+    if deteccoes is None and automatico:
+        modelo = _aguardar_modelo(carregador, tarefa)
+        tarefa.progresso("Procurando a melhor combinação de filtros...")
+        with metricas.etapa('busca_filtros'):
+            deteccoes = detectar_objetos_auto(modelo, img, conf_base, conf_threshold)
+        cache_memoria.guardar(chave_deteccoes, deteccoes)
+        registrar_deteccoes(caminho_imagem, *deteccoes[1:4], conf_threshold, reducao=deteccoes[4]['scale'])
+    elif deteccoes is None:
+        # Aplicar pré-processamento na imagem
+        tarefa.progresso("Aplicando o pré-processamento...")
+        chave_pre = ('preprocessada', chave_img, opcoes)
+        img_preprocessada = cache_memoria.obter(chave_pre)
+        if img_preprocessada is None:
+            with metricas.etapa('preprocessar'):
+                img_preprocessada = pre_processar_imagem(img, opcoes)
+            if any(opcoes):
+                cache_memoria.guardar(chave_pre, img_preprocessada)
+
+        # Na primeira detecção o modelo pode ainda estar carregando em segundo plano
+        modelo = _aguardar_modelo(carregador, tarefa)
+
+        if fatiada:
+            # Detecção fatiada na resolução original
+            tarefa.progresso("Detectando objetos (fatias)...")
+            with metricas.etapa('detectar'):
+                deteccoes = detectar_objetos_fatiado(modelo, img_preprocessada, conf_base)
+        else:
+            # Realizar a detecção de objetos
+            tarefa.progresso("Detectando objetos...")
+            with metricas.etapa('detectar'):
+                results, img_resized, _ = detectar_objetos(modelo, img_preprocessada, conf_base)
+            for nome, ms in results[0].speed.items():
+                metricas.observar('modelo_' + nome, ms / 1000)
+            deteccoes = (np.asarray(img_resized),) + arrays_resultado(results[0]) + (None,)
+        cache_memoria.guardar(chave_deteccoes, deteccoes)
+        # Só detecções novas são gravadas (reexibições do cache, ex.: mudar a confiança, não)
+        registrar_deteccoes(caminho_imagem, *deteccoes[1:4], conf_threshold)
+
+    # Exibir os resultados com a confiança pedida
+    tarefa.progresso("Desenhando as detecções...")
+    img_exibicao, caixas, confs, classes, tempos = deteccoes
+    mantidas = confs >= conf_threshold
+    with metricas.etapa('desenhar'):
+        renderizador = obter_renderizador(carregador.class_names)
+        img_np, _ = renderizador(img_exibicao, caixas[mantidas], confs[mantidas], classes[mantidas])
+        img_resultado = Image.fromarray(img_np)  # Copia o buffer do renderizador
+
+    titulo = "Imagem Com Detecções"
+    if automatico:
+        filtros = ', '.join(tempos['filters']) or 'sem filtros'
+        titulo = f"Imagem Com Detecções (automático: {filtros}; {tempos['evaluated']} combinações, {tempos['total_ms']:.0f} ms)"
+    elif tempos is not None:
+        titulo = f"Imagem Com Detecções ({tempos['tiles']} fatias, {tempos['inference_ms']:.0f} ms)"
+    return img_resultado, titulo, metricas.tempos_requisicao()
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+
+from interface_modelo.backends import iou_matriz
+
+
+# Configuração padrão das fatias
+TAMANHO_FATIA = 640
+SOBREPOSICAO = 0.2
+
+
+# Função para calcular as posições das fatias sobrepostas que cobrem a imagem inteira
+# Retorna a lista de (x1, y1, x2, y2); a última fatia de cada eixo é encostada na borda
+def gerar_fatias(largura, altura, tamanho=TAMANHO_FATIA, sobreposicao=SOBREPOSICAO):
+    passo = max(1, int(tamanho * (1 - sobreposicao)))
+
+    def posicoes(total):
+        if total <= tamanho:
+            return [0]
+        inicios = list(range(0, total - tamanho, passo))
+        inicios.append(total - tamanho)
+        return inicios
+
+    return [(x, y, min(x + tamanho, largura), min(y + tamanho, altura))
+            for y in posicoes(altura) for x in posicoes(largura)]
+
+
+# Função de NMS por classe (as caixas de classes diferentes nunca se suprimem)
+# Retorna os índices mantidos, em ordem decrescente de confiança
+def nms_por_classe(caixas, confs, classes, iou_limite=0.5):
+    if len(caixas) == 0:
+        return np.zeros(0, dtype=int)
+    # Desloca cada classe para uma região diferente do plano para fazer um único NMS
+    deslocamento = (np.asarray(classes, dtype=np.float32) * (caixas.max() + 1))[:, None]
+    deslocadas = caixas + deslocamento
+    ordem = np.argsort(-confs)
+    mantidos = []
+    while len(ordem):
+        i = ordem[0]
+        mantidos.append(i)
+        if len(ordem) == 1:
+            break
+        ious = iou_matriz(deslocadas[i], deslocadas[ordem[1:]])[0]
+        ordem = ordem[1:][ious <= iou_limite]
+    return np.array(mantidos, dtype=int)
+
+
+# Função para fazer a inferência fatiada em uma imagem de alta resolução
+# inferir_lote recebe uma lista de imagens e retorna a lista de resultados do ultralytics
+# As fatias são enviadas em lotes, as caixas voltam para as coordenadas originais e são unidas por NMS entre fatias
+# Com incluir_global, a imagem inteira também é inferida para manter os objetos grandes
+# Retorna caixas, confianças, classes e os tempos por etapa (ms)
+def inferencia_fatiada(inferir_lote, img, tamanho=TAMANHO_FATIA, sobreposicao=SOBREPOSICAO, lote=8,
+                       incluir_global=True, iou_limite=0.5):
+    tempos = {}
+    inicio = time.perf_counter()
+    altura, largura = img.shape[:2]
+    fatias = gerar_fatias(largura, altura, tamanho, sobreposicao)
+    imagens = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in fatias]  # Recortes são views, sem cópia
+    origens = [(x1, y1) for x1, y1, _, _ in fatias]
+    if incluir_global and len(fatias) > 1:
+        imagens.append(img)
+        origens.append((0, 0))
+    tempos['slice_ms'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    todas_caixas, todas_confs, todas_classes = [], [], []
+    for i in range(0, len(imagens), lote):
+        resultados = inferir_lote(imagens[i:i + lote])
+        for resultado, (dx, dy) in zip(resultados, origens[i:i + lote]):
+            boxes = resultado.boxes
+            if len(boxes) == 0:
+                continue
+            todas_caixas.append(boxes.xyxy.cpu().numpy() + np.array([dx, dy, dx, dy], dtype=np.float32))
+            todas_confs.append(boxes.conf.cpu().numpy())
+            todas_classes.append(boxes.cls.cpu().numpy().astype(int))
+    tempos['inference_ms'] = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    if todas_caixas:
+        caixas = np.concatenate(todas_caixas)
+        confs = np.concatenate(todas_confs)
+        classes = np.concatenate(todas_classes)
+        mantidos = nms_por_classe(caixas, confs, classes, iou_limite)
+        caixas, confs, classes = caixas[mantidos], confs[mantidos], classes[mantidos]
+    else:
+        caixas = np.zeros((0, 4), dtype=np.float32)
+        confs = np.zeros(0, dtype=np.float32)
+        classes = np.zeros(0, dtype=int)
+    tempos['merge_ms'] = (time.perf_counter() - inicio) * 1000
+    tempos['tiles'] = len(fatias)
+
+    return caixas, confs, classes, {k: round(v, 3) for k, v in tempos.items()}
@@ -0,0 +1,270 @@
+import os
+import sys
+import threading
+import time
+from itertools import product
+
+import cv2
+import numpy as np
+
+
+# Nomes dos filtros na ordem em que são aplicados (mesma ordem das caixas de seleção da interface)
+FILTROS = ('equalizacao', 'suavizacao', 'nitidez', 'brilho', 'normalizacao')
+
+# Parâmetros fixos dos filtros (iguais aos usados na interface)
+CLAHE_CLIP = 2.0
+CLAHE_GRADE = (8, 8)
+BILATERAL_D = 9             # Diâmetro do pixel
+BILATERAL_SIGMA_COR = 75    # Filtro sigma no espaço de cor
+BILATERAL_SIGMA_ESPACO = 75  # Filtro sigma no espaço de coordenadas
+KERNEL_NITIDEZ = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+BRILHO_ALPHA = 2  # Contraste (1.0 - 3.0)
+BRILHO_BETA = 20  # Brilho (0 - 100)
+
+_VALORES = np.arange(256, dtype=np.float64)
+
+
+# Função que reproduz o cv2.normalize(NORM_MINMAX, 0..255) de uma imagem uint8 como tabela de 256 valores
+# O OpenCV converte uint8 -> uint8 com escala e deslocamento em float32 e uma multiplicação-soma fundida
+# (um único arredondamento para float32); em float64 alguns valores arredondariam para o inteiro vizinho
+def _lut_normalizar(minimo, maximo):
+    escala = 255.0 / (maximo - minimo) if maximo - minimo > 0 else 0.0
+    escala, deslocamento = float(np.float32(escala)), float(np.float32(-minimo * escala))
+    return np.clip(np.rint((_VALORES * escala + deslocamento).astype(np.float32)), 0, 255)
+
+
+# Função que reproduz o cv2.convertScaleAbs(alpha, beta) como tabela de 256 valores
+def _lut_brilho():
+    return np.clip(np.rint(np.abs(_VALORES * BRILHO_ALPHA + BRILHO_BETA)), 0, 255)
+
+
+_LUT_BRILHO = _lut_brilho()
+
+
+# Função que junta as operações ponto a ponto (normalização após a nitidez, brilho/contraste e normalização
+# final) em uma tabela de 256 valores para uma imagem com o mínimo/máximo dados
+# As tabelas são crescentes, então o mínimo/máximo depois de cada etapa é a imagem do mínimo/máximo atual
+def lut_pontual(minimo, maximo, nitidez=False, brilho=False, normalizacao=False):
+    lut = _VALORES.copy()
+    if nitidez:
+        lut = _lut_normalizar(minimo, maximo)[lut.astype(np.intp)]  # Normalizar para mitigar aumento de brilho
+    if brilho:
+        lut = _LUT_BRILHO[lut.astype(np.intp)]
+    if normalizacao:
+        lut = _lut_normalizar(lut[int(minimo)], lut[int(maximo)])[lut.astype(np.intp)]
+    return lut.astype(np.uint8)
+
+
+# Pipeline de pré-processamento "compilado" a partir das cinco opções da interface
+# Reaproveita o objeto CLAHE, o kernel e os buffers entre as chamadas, trabalha sobre um único buffer
+# (mais um auxiliar para os filtros que não podem ser feitos no próprio array) e junta as operações
+# ponto a ponto (normalização após a nitidez, brilho/contraste e normalização final) em uma única tabela (LUT)
+# Como todos os filtros tratam os canais da mesma forma, funciona igual em RGB ou BGR, sem conversões
+# O array retornado é o buffer interno: copie-o se for guardar o resultado depois da próxima chamada
+class PipelinePreprocessamento:
+    def __init__(self, equalizacao=False, suavizacao=False, nitidez=False, brilho=False, normalizacao=False,
+                 largura_maxima=None):
+        self.opcoes = dict(zip(FILTROS, (equalizacao, suavizacao, nitidez, brilho, normalizacao)))
+        self.largura_maxima = largura_maxima
+        self._clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP, tileGridSize=CLAHE_GRADE) if equalizacao else None
+        self._buffer = None
+        self._auxiliar = None
+        self.tempos = {}
+
+    @property
+    def ativo(self):
+        return any(self.opcoes.values())
+
+    # Garante buffers do tamanho da imagem (alocados de novo só quando o tamanho muda)
+    def _preparar(self, img):
+        if self.largura_maxima and img.shape[1] > self.largura_maxima:
+            escala = self.largura_maxima / img.shape[1]
+            tamanho = (self.largura_maxima, max(1, round(img.shape[0] * escala)))
+            if self._buffer is None or self._buffer.shape != (tamanho[1], tamanho[0], 3):
+                self._buffer = np.empty((tamanho[1], tamanho[0], 3), dtype=np.uint8)
+            cv2.resize(img, tamanho, dst=self._buffer, interpolation=cv2.INTER_AREA)
+        else:
+            if self._buffer is None or self._buffer.shape != img.shape:
+                self._buffer = np.empty_like(img)
+            np.copyto(self._buffer, img)
+        if self._auxiliar is None or self._auxiliar.shape != self._buffer.shape:
+            self._auxiliar = np.empty_like(self._buffer)
+
+    # Troca o buffer principal pelo auxiliar depois de um filtro que escreveu no auxiliar
+    def _trocar(self):
+        self._buffer, self._auxiliar = self._auxiliar, self._buffer
+
+    # Aplica os filtros escolhidos na imagem (array uint8 HxWx3)
+    # Retorna o buffer interno com o resultado
+    def __call__(self, img):
+        tempos = {}
+        inicio = time.perf_counter()
+        self._preparar(np.asarray(img))
+        tempos['copia'] = time.perf_counter() - inicio
+
+        if self._clahe is not None:
+            # Equalização adaptativa de histograma (CLAHE), canal por canal sobre planos contíguos
+            inicio = time.perf_counter()
+            canais = cv2.split(self._buffer)
+            for canal in canais:
+                self._clahe.apply(canal, dst=canal)
+            cv2.merge(canais, dst=self._buffer)
+            tempos['equalizacao'] = time.perf_counter() - inicio
+
+        if self.opcoes['suavizacao']:
+            # Suavização bilateral
+            inicio = time.perf_counter()
+            cv2.bilateralFilter(self._buffer, BILATERAL_D, BILATERAL_SIGMA_COR, BILATERAL_SIGMA_ESPACO, dst=self._auxiliar)
+            self._trocar()
+            tempos['suavizacao'] = time.perf_counter() - inicio
+
+        if self.opcoes['nitidez']:
+            # Nitidez com kernel de nitidez padrão (a normalização que vem depois entra na LUT)
+            inicio = time.perf_counter()
+            cv2.filter2D(self._buffer, -1, KERNEL_NITIDEZ, dst=self._auxiliar)
+            self._trocar()
+            tempos['nitidez'] = time.perf_counter() - inicio
+
+        if self.opcoes['nitidez'] or self.opcoes['brilho'] or self.opcoes['normalizacao']:
+            inicio = time.perf_counter()
+            self._aplicar_lut()
+            tempos['lut'] = time.perf_counter() - inicio
+
+        self.tempos = {k: round(v * 1000, 3) for k, v in tempos.items()}
+        return self._buffer
+
+    # Junta as operações ponto a ponto em uma tabela de 256 valores e aplica uma única vez
+    def _aplicar_lut(self):
+        minimo, maximo = cv2.minMaxLoc(self._buffer.reshape(-1, 1))[:2]
+        lut = lut_pontual(minimo, maximo, self.opcoes['nitidez'], self.opcoes['brilho'], self.opcoes['normalizacao'])
+        cv2.LUT(self._buffer, lut, dst=self._buffer)
+
+    # Mede o custo de cada filtro isoladamente e do pipeline completo na imagem
+    # Retorna o tempo mediano (ms) por filtro
+    def benchmark(self, img, repeticoes=10):
+        resultado = {}
+        for nome in FILTROS:
+            pipeline = PipelinePreprocessamento(largura_maxima=self.largura_maxima, **{nome: True})
+            resultado[nome] = _mediana_ms(pipeline, img, repeticoes)
+        resultado['pipeline'] = _mediana_ms(self, img, repeticoes)
+        return resultado
+
+
+def _mediana_ms(pipeline, img, repeticoes):
+    pipeline(img)  # Aquecimento (alocação dos buffers)
+    tempos = []
+    for _ in range(max(1, repeticoes)):
+        inicio = time.perf_counter()
+        pipeline(img)
+        tempos.append(time.perf_counter() - inicio)
+    return round(float(np.median(tempos)) * 1000, 3)
+
+
+# Todas as combinações das cinco opções (32), da imagem sem filtros até todos os filtros ligados
+COMBINACOES = tuple(product((False, True), repeat=len(FILTROS)))
+
+
+# Função para obter os nomes dos filtros ligados em uma combinação de opções
+def nomes_filtros(combinacao):
+    return [nome for nome, ligado in zip(FILTROS, combinacao) if ligado]
+
+
+# Gerador das versões pré-processadas de uma imagem para várias combinações de opções
+# Os filtros caros vêm antes das operações ponto a ponto, então as combinações formam uma árvore de prefixos:
+# o resultado de cada prefixo (equalização, suavização, nitidez) é calculado uma vez e guardado, e cada
+# combinação só acrescenta a LUT final. As 32 combinações custam 1 CLAHE, 2 filtros bilaterais, 4 nitidezes
+# e até 28 LUTs, em vez de 16 de cada filtro caro aplicando os pipelines um a um
+# Os resultados são idênticos aos do PipelinePreprocessamento com as mesmas opções; as versões sem operações
+# ponto a ponto são os próprios prefixos guardados (e a imagem de entrada, sem filtros): não as altere
+class VariantesFiltros:
+    def __init__(self, img):
+        self._prefixos = {(): np.ascontiguousarray(img)}
+        self._clahe = None
+        self.tempos = {}
+
+    # Soma o tempo de um filtro desde `inicio` (ms)
+    def _medir(self, nome, inicio):
+        self.tempos[nome] = round(self.tempos.get(nome, 0.0) + (time.perf_counter() - inicio) * 1000, 3)
+
+    # Retorna a imagem depois dos filtros caros do prefixo (equalizacao, suavizacao, nitidez), calculando
+    # só o último filtro a partir do prefixo anterior (guardado)
+    def _prefixo(self, prefixo):
+        img = self._prefixos.get(prefixo)
+        if img is not None:
+            return img
+        anterior = self._prefixo(prefixo[:-1])
+        if not prefixo[-1]:
+            img = anterior
+        elif len(prefixo) == 1:
+            # Equalização adaptativa de histograma (CLAHE), canal por canal
+            inicio = time.perf_counter()
+            if self._clahe is None:
+                self._clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP, tileGridSize=CLAHE_GRADE)
+            img = cv2.merge([self._clahe.apply(canal) for canal in cv2.split(anterior)])
+            self._medir('equalizacao', inicio)
+        elif len(prefixo) == 2:
+            inicio = time.perf_counter()
+            img = cv2.bilateralFilter(anterior, BILATERAL_D, BILATERAL_SIGMA_COR, BILATERAL_SIGMA_ESPACO)
+            self._medir('suavizacao', inicio)
+        else:
+            inicio = time.perf_counter()
+            img = cv2.filter2D(anterior, -1, KERNEL_NITIDEZ)
+            self._medir('nitidez', inicio)
+        self._prefixos[prefixo] = img
+        return img
+
+    # Retorna a imagem pré-processada com as opções da combinação (tupla de cinco booleanos)
+    # Sem nenhum filtro ligado retorna a própria imagem de entrada
+    def __call__(self, combinacao):
+        equalizacao, suavizacao, nitidez, brilho, normalizacao = (bool(o) for o in combinacao)
+        img = self._prefixo((equalizacao, suavizacao, nitidez))
+        if not (nitidez or brilho or normalizacao):
+            return img
+        inicio = time.perf_counter()
+        minimo, maximo = cv2.minMaxLoc(img.reshape(-1, 1))[:2]
+        img = cv2.LUT(img, lut_pontual(minimo, maximo, nitidez, brilho, normalizacao))
+        self._medir('lut', inicio)
+        return img
+
+
+# Pipelines por combinação de opções, um conjunto por thread (os buffers não podem ser compartilhados)
+_local = threading.local()
+
+
+# Função para obter o pipeline das opções pedidas, criado uma vez por thread e reaproveitado
+def obter_pipeline(equalizacao=False, suavizacao=False, nitidez=False, brilho=False, normalizacao=False, largura_maxima=None):
+    chave = (equalizacao, suavizacao, nitidez, brilho, normalizacao, largura_maxima)
+    pipelines = getattr(_local, 'pipelines', None)
+    if pipelines is None:
+        pipelines = _local.pipelines = {}
+    if chave not in pipelines:
+        pipelines[chave] = PipelinePreprocessamento(*chave)
+    return pipelines[chave]
+
+
+# Benchmark de linha de comando: python interface_modelo/filtros.py [imagem] [repetições]
+if __name__ == '__main__':
+    caminho = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'teste.jpg')
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    img = cv2.imread(caminho)
+    if img is None:
+        sys.exit(f'Não foi possível ler a imagem: {caminho}')
+
+    print(f'Imagem {caminho} ({img.shape[1]}x{img.shape[0]}), mediana de {repeticoes} execuções (ms)')
+    print('Por filtro:', PipelinePreprocessamento(*([True] * 5)).benchmark(img, repeticoes))
+    total_pipelines = 0.0
+    for combinacao in COMBINACOES[1:]:
+        ms = _mediana_ms(PipelinePreprocessamento(*combinacao), img, repeticoes)
+        total_pipelines += ms
+        print(f'{"+".join(nomes_filtros(combinacao))}: {ms}')
+
+    # As 32 combinações de uma vez, compartilhando os prefixos
+    tempos = []
+    for _ in range(max(1, repeticoes)):
+        inicio = time.perf_counter()
+        variantes = VariantesFiltros(img)
+        for combinacao in COMBINACOES:
+            variantes(combinacao)
+        tempos.append(time.perf_counter() - inicio)
+    print(f'Todas as combinações, um pipeline por vez: {total_pipelines:.1f} ms; '
+          f'com prefixos compartilhados: {float(np.median(tempos)) * 1000:.1f} ms {variantes.tempos}')
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+
+# Pré-processamento "letterbox": um único redimensionamento que preserva a proporção da imagem,
+# com bordas cinzas até completar o quadrado de entrada do modelo
+# Os buffers (uint8 para exibição e tensor float para o modelo) são alocados uma vez e reaproveitados;
+# por isso uma instância não deve ser usada por duas threads ao mesmo tempo
+# O tensor só é criado (e o PyTorch importado) na primeira chamada com gerar_tensor=True
+class Letterbox:
+    def __init__(self, tamanho=640, cor=114):
+        self.tamanho = tamanho
+        self.cor = cor
+        self.imagem = np.full((tamanho, tamanho, 3), cor, dtype=np.uint8)
+        self.tensor = None
+        self._hwc = None
+        self.escala = 1.0
+        self.pad = (0, 0)
+        self.tamanho_original = (tamanho, tamanho)
+        self._area = (tamanho, tamanho)
+
+    # Redimensiona a imagem RGB (array ou PIL) para o buffer e preenche o tensor normalizado em [0, 1]
+    # Com gerar_tensor=False só o buffer de exibição (self.imagem) é atualizado
+    # Retorna o tensor (1, 3, tamanho, tamanho) pronto para o modelo
+    def __call__(self, img, gerar_tensor=True):
+        img = np.asarray(img)
+        altura, largura = img.shape[:2]
+        escala = min(self.tamanho / altura, self.tamanho / largura)
+        nova_largura, nova_altura = max(1, round(largura * escala)), max(1, round(altura * escala))
+        pad_x, pad_y = (self.tamanho - nova_largura) // 2, (self.tamanho - nova_altura) // 2
+
+        interpolacao = cv2.INTER_AREA if escala < 1 else cv2.INTER_LINEAR
+        redimensionada = cv2.resize(img, (nova_largura, nova_altura), interpolation=interpolacao)
+
+        # Só repinta as bordas quando a área útil muda em relação à chamada anterior
+        if (nova_largura, nova_altura) != self._area:
+            self.imagem[:] = self.cor
+            self._area = (nova_largura, nova_altura)
+        self.imagem[pad_y:pad_y + nova_altura, pad_x:pad_x + nova_largura] = redimensionada
+
+        if gerar_tensor:
+            if self.tensor is None:
+                import torch
+                self.tensor = torch.empty((1, 3, self.tamanho, self.tamanho), dtype=torch.float32)
+                self._hwc = torch.from_numpy(self.imagem).permute(2, 0, 1)  # View CHW do buffer, sem cópia
+            self.tensor[0].copy_(self._hwc).mul_(1 / 255)
+        self.escala = escala
+        self.pad = (pad_x, pad_y)
+        self.tamanho_original = (largura, altura)
+        return self.tensor
+
+    # Converte caixas (x1, y1, x2, y2) da resolução original para o espaço do letterbox
+    def para_letterbox(self, caixas):
+        caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4) * self.escala
+        pad_x, pad_y = self.pad
+        return caixas + np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+
+    # Converte caixas (x1, y1, x2, y2) do espaço do letterbox para a resolução original
+    def para_original(self, caixas):
+        caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4).copy()
+        pad_x, pad_y = self.pad
+        caixas -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        caixas /= self.escala
+        largura, altura = self.tamanho_original
+        caixas[:, [0, 2]] = caixas[:, [0, 2]].clip(0, largura)
+        caixas[:, [1, 3]] = caixas[:, [1, 3]].clip(0, altura)
+        return caixas
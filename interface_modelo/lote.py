@@ -0,0 +1,249 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import cv2
+
+# Permite rodar como script (python interface_modelo/lote.py) e importar os módulos compartilhados
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from interface_modelo.armazenamento import ArmazemDeteccoes, DETECTION_STORE
+from interface_modelo.backends import carregar_modelo_otimizado
+from interface_modelo.desenho import desenhar_deteccoes, arrays_resultado, contar_classes
+from interface_modelo.filtros import FILTROS, obter_pipeline
+
+EXTENSOES = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif')
+ARQUIVO_JSONL = 'deteccoes.jsonl'
+ARQUIVO_CSV = 'deteccoes.csv'
+ARQUIVO_CONTAGENS = 'contagens.csv'
+
+# Estado de cada processo trabalhador (um modelo por processo, carregado no inicializador)
+_trabalhador = {}
+
+
+# Função para listar as imagens de uma pasta (recursivamente), com caminhos relativos à pasta
+def listar_imagens(pasta):
+    imagens = []
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            if nome.lower().endswith(EXTENSOES):
+                imagens.append(os.path.relpath(os.path.join(raiz, nome), pasta))
+    return sorted(imagens)
+
+
+# Função para ler os arquivos já processados de um JSONL anterior (para retomar depois de uma interrupção)
+# Uma última linha incompleta (processo interrompido no meio da escrita) é removida do arquivo
+# Imagens que deram erro não entram no conjunto e são tentadas de novo
+def ler_processadas(caminho_jsonl):
+    processadas = set()
+    if not os.path.exists(caminho_jsonl):
+        return processadas
+    with open(caminho_jsonl, 'rb+') as f:
+        conteudo = f.read()
+        fim = conteudo.rfind(b'\n') + 1
+        if fim < len(conteudo):
+            f.truncate(fim)
+    for linha in conteudo[:fim].decode('utf-8').splitlines():
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            continue
+        if 'error' not in registro:
+            processadas.add(registro['file'])
+    return processadas
+
+
+# Inicializador de cada processo: limita as threads do processo e carrega o modelo uma única vez
+def _iniciar_trabalhador(caminho_modelo, pasta, pasta_anotadas, conf_threshold, opcoes, threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    modelo, class_names, _ = carregar_modelo_otimizado(caminho_modelo)
+    _trabalhador.update(modelo=modelo, class_names=class_names, pasta=pasta, pasta_anotadas=pasta_anotadas,
+                        conf=conf_threshold, opcoes=opcoes, leitor=ThreadPoolExecutor(max(1, threads)))
+
+
+# Função para ler e pré-processar uma imagem (roda em paralelo nas threads do leitor)
+# Retorna a imagem BGR ou None se ela não pôde ser lida
+def _ler_imagem(relativo):
+    img = cv2.imread(os.path.join(_trabalhador['pasta'], relativo))
+    if img is not None and any(_trabalhador['opcoes']):
+        img = obter_pipeline(*_trabalhador['opcoes'])(img).copy()
+    return img
+
+
+# Função executada nos processos: decodifica um lote de imagens, roda o modelo uma vez para o lote,
+# grava as imagens anotadas e retorna um registro por imagem
+def processar_lote(relativos):
+    modelo = _trabalhador['modelo']
+    class_names = _trabalhador['class_names']
+    imagens = list(_trabalhador['leitor'].map(_ler_imagem, relativos))
+
+    registros = {}
+    validas = []
+    for relativo, img in zip(relativos, imagens):
+        if img is None:
+            registros[relativo] = {'file': relativo, 'error': 'não foi possível ler a imagem'}
+        else:
+            validas.append((relativo, img))
+
+    if validas:
+        try:
+            resultados = modelo([img for _, img in validas], conf=_trabalhador['conf'], verbose=False)
+        except Exception as e:
+            for relativo, _ in validas:
+                registros[relativo] = {'file': relativo, 'error': str(e)}
+            resultados = []
+
+        for (relativo, img), resultado in zip(validas, resultados):
+            caixas, confs, classes = arrays_resultado(resultado)
+            altura, largura = img.shape[:2]
+            if _trabalhador['pasta_anotadas']:
+                desenhar_deteccoes(img, caixas, confs, classes, class_names)
+                destino = os.path.join(_trabalhador['pasta_anotadas'], relativo)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                cv2.imwrite(destino, img)
+            registros[relativo] = {
+                'file': relativo,
+                'image_size': {'width': largura, 'height': altura},
+                'detections': [
+                    {'class_id': int(c), 'class': class_names[int(c)], 'confidence': round(float(p), 4),
+                     'box': [round(float(v), 1) for v in caixa]}
+                    for caixa, p, c in zip(caixas, confs, classes)
+                ],
+                'counts': contar_classes(classes, class_names),
+            }
+
+    return [registros[relativo] for relativo in relativos]
+
+
+# Função para gerar os CSVs a partir do JSONL completo (inclui as imagens de execuções anteriores)
+# deteccoes.csv: uma linha por detecção; contagens.csv: uma linha por imagem com a contagem de cada classe
+def gerar_csv(pasta_saida):
+    registros = []
+    with open(os.path.join(pasta_saida, ARQUIVO_JSONL), encoding='utf-8') as f:
+        for linha in f:
+            registro = json.loads(linha)
+            if 'error' not in registro:
+                registros.append(registro)
+
+    with open(os.path.join(pasta_saida, ARQUIVO_CSV), 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['file', 'class_id', 'class', 'confidence', 'x1', 'y1', 'x2', 'y2'])
+        for registro in registros:
+            for d in registro['detections']:
+                escritor.writerow([registro['file'], d['class_id'], d['class'], d['confidence'], *d['box']])
+
+    classes = sorted({nome for registro in registros for nome in registro['counts']})
+    with open(os.path.join(pasta_saida, ARQUIVO_CONTAGENS), 'w', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(['file', 'total'] + classes)
+        for registro in registros:
+            contagem = registro['counts']
+            escritor.writerow([registro['file'], len(registro['detections'])] + [contagem.get(nome, 0) for nome in classes])
+
+
+# Função para processar todas as imagens de uma pasta com um conjunto de processos (um modelo em cada)
+# As imagens já presentes no JSONL de saída são puladas, então uma execução interrompida pode ser retomada
+# Com um armazém (ArmazemDeteccoes), as detecções também são gravadas com a fonte dada e a data de
+# modificação de cada imagem como instante
+# Retorna o relatório com imagens processadas, puladas, erros e imagens por segundo
+def processar_pasta(pasta, pasta_saida, caminho_modelo, processos=2, lote=8, conf_threshold=0.25, opcoes=(False,) * 5,
+                    anotar=True, threads=None, armazem=None, fonte=None):
+    os.makedirs(pasta_saida, exist_ok=True)
+    caminho_jsonl = os.path.join(pasta_saida, ARQUIVO_JSONL)
+    processadas = ler_processadas(caminho_jsonl)
+    pendentes = [relativo for relativo in listar_imagens(pasta) if relativo not in processadas]
+    threads = threads or max(1, (os.cpu_count() or 1) // processos)
+    pasta_anotadas = os.path.join(pasta_saida, 'anotadas') if anotar else None
+
+    if pendentes and processos > 1:
+        # Escolhe e exporta o backend uma vez antes de abrir os processos (senão cada um faria o benchmark)
+        carregar_modelo_otimizado(caminho_modelo)
+
+    inicio = time.perf_counter()
+    concluidas = 0
+    erros = 0
+    if pendentes:
+        lotes = [pendentes[i:i + lote] for i in range(0, len(pendentes), lote)]
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processos, mp_context=contexto, initializer=_iniciar_trabalhador,
+                                 initargs=(caminho_modelo, pasta, pasta_anotadas, conf_threshold, tuple(opcoes), threads)) as executor, \
+                open(caminho_jsonl, 'a', encoding='utf-8') as saida:
+            futuros = [executor.submit(processar_lote, relativos) for relativos in lotes]
+            for futuro in as_completed(futuros):
+                for registro in futuro.result():
+                    saida.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                    if 'error' in registro:
+                        erros += 1
+                    else:
+                        concluidas += 1
+                        if armazem is not None:
+                            instante = os.path.getmtime(os.path.join(pasta, registro['file']))
+                            armazem.registrar(fonte or os.path.basename(os.path.normpath(pasta)), registro['detections'], instante)
+                saida.flush()
+                decorrido = time.perf_counter() - inicio
+                print(f'{concluidas + erros}/{len(pendentes)} imagens ({concluidas / decorrido:.2f} img/s)', flush=True)
+
+    if armazem is not None:
+        armazem.descarregar()
+    if os.path.exists(caminho_jsonl):
+        gerar_csv(pasta_saida)
+
+    duracao = time.perf_counter() - inicio
+    return {
+        'images': concluidas,
+        'skipped': len(processadas),
+        'errors': erros,
+        'processes': processos,
+        'batch_size': lote,
+        'threads_per_process': threads,
+        'seconds': round(duracao, 3),
+        'images_per_second': round(concluidas / duracao, 2) if duracao and concluidas else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Roda a detecção em todas as imagens de uma pasta, sem interface.')
+    parser.add_argument('pasta', help='Pasta com as imagens (subpastas incluídas)')
+    parser.add_argument('--saida', help='Pasta de saída (padrão: <pasta>_deteccoes)')
+    parser.add_argument('--modelo', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'best.pt'))
+    parser.add_argument('--processos', type=int, default=2, help='Número de processos (cada um carrega um modelo)')
+    parser.add_argument('--lote', type=int, default=8, help='Imagens por chamada do modelo')
+    parser.add_argument('--threads', type=int, help='Threads do PyTorch por processo (padrão: núcleos / processos)')
+    parser.add_argument('--conf', type=float, default=25, help='Confiança mínima das detecções (%%)')
+    parser.add_argument('--filtros', default='', help=f'Pré-processamento, separado por vírgulas: {",".join(FILTROS)}')
+    parser.add_argument('--sem-imagens', action='store_true', help='Não grava as imagens anotadas')
+    parser.add_argument('--armazem', default=DETECTION_STORE,
+                        help='Banco SQLite onde as detecções também são gravadas (padrão: DETECTION_STORE)')
+    parser.add_argument('--fonte', help='Fonte das detecções no armazém, ex.: o canteiro (padrão: nome da pasta)')
+    args = parser.parse_args()
+
+    filtros = {f.strip() for f in args.filtros.split(',') if f.strip()}
+    desconhecidos = filtros - set(FILTROS)
+    if desconhecidos:
+        parser.error(f'filtros desconhecidos: {", ".join(sorted(desconhecidos))}')
+
+    relatorio = processar_pasta(
+        args.pasta,
+        args.saida or os.path.normpath(args.pasta) + '_deteccoes',
+        args.modelo,
+        processos=max(1, args.processos),
+        lote=max(1, args.lote),
+        conf_threshold=args.conf / 100,
+        opcoes=tuple(nome in filtros for nome in FILTROS),
+        anotar=not args.sem_imagens,
+        threads=args.threads,
+        armazem=ArmazemDeteccoes(args.armazem) if args.armazem else None,
+        fonte=args.fonte,
+    )
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+# Lupa de zoom que acompanha o mouse sobre um label com imagem
+# A versão ampliada da imagem é calculada uma única vez por imagem (de preferência a partir do original
+# em resolução total); a cada movimento só é recortado um pedaço dela e colado no mesmo PhotoImage.
+# As atualizações são limitadas à taxa de atualização da tela (intervalo_ms) para o cursor não atrasar
+class LupaZoom:
+    def __init__(self, label, zoom_factor=2, zoom_box_size=60, intervalo_ms=16):
+        self.label = label
+        self.zoom_factor = zoom_factor
+        self.lado = 2 * zoom_box_size * zoom_factor  # Tamanho da janela de zoom, igual ao da lupa antiga
+        self.intervalo_ms = intervalo_ms
+        self._ampliada = None
+        self._tamanho_exibicao = (1, 1)
+        self._pad = (0, 0)
+        self._foto = None
+        self._janela = None
+        self._evento = None
+        self._agendado = None
+
+    # Define a imagem exibida no label e calcula a versão ampliada
+    # original: imagem em resolução total (PIL ou array RGB) da qual a exibida foi gerada por letterbox
+    # escala e pad: parâmetros do letterbox (imagem exibida = original * escala + pad)
+    def definir_imagem(self, img_exibicao, original=None, escala=None, pad=(0, 0)):
+        img_exibicao = np.asarray(img_exibicao)
+        altura, largura = img_exibicao.shape[:2]
+        self._tamanho_exibicao = (largura, altura)
+
+        if original is not None and escala:
+            # Área útil da exibição ampliada, gerada direto do original (mais detalhe que ampliar a imagem de 640)
+            fonte = np.asarray(original)
+            self._pad = pad
+            tamanho = (max(1, round(fonte.shape[1] * escala * self.zoom_factor)), max(1, round(fonte.shape[0] * escala * self.zoom_factor)))
+            interpolacao = cv2.INTER_AREA if tamanho[0] < fonte.shape[1] else cv2.INTER_LINEAR
+        else:
+            fonte = img_exibicao
+            self._pad = (0, 0)
+            tamanho = (largura * self.zoom_factor, altura * self.zoom_factor)
+            interpolacao = cv2.INTER_LINEAR
+        self._ampliada = cv2.resize(fonte, tamanho, interpolation=interpolacao)
+        self.ativar()
+
+    def ativar(self):
+        self.label.bind("<Motion>", self._ao_mover)
+        self.label.bind("<Leave>", self.fechar)
+
+    def desativar(self):
+        self.label.unbind("<Motion>")
+        self.label.unbind("<Leave>")
+        self.fechar()
+        self._ampliada = None
+
+    # Guarda só o último evento; a lupa é redesenhada no máximo uma vez a cada intervalo_ms
+    def _ao_mover(self, event):
+        self._evento = event
+        if self._agendado is None:
+            self._agendado = self.label.after(self.intervalo_ms, self._atualizar)
+
+    # Recorta a área ao redor do mouse da imagem ampliada e cola no PhotoImage reaproveitado
+    def _atualizar(self):
+        self._agendado = None
+        event = self._evento
+        if event is None or self._ampliada is None:
+            return
+
+        # Coordenadas do mouse relativas à imagem exibida
+        largura, altura = self._tamanho_exibicao
+        x = event.x * largura / max(1, self.label.winfo_width())
+        y = event.y * altura / max(1, self.label.winfo_height())
+        recorte = self._recortar(x, y)
+
+        if self._janela is None or not self._janela.winfo_exists():
+            # Criar a janela Toplevel e o PhotoImage uma única vez
+            self._janela = tk.Toplevel()
+            self._janela.overrideredirect(True)  # Remover decoração da janela
+            self._janela.attributes('-topmost', True)
+            self._foto = ImageTk.PhotoImage(Image.fromarray(recorte))
+            tk.Label(self._janela, image=self._foto, borderwidth=0).pack()
+        else:
+            self._foto.paste(Image.fromarray(recorte))
+
+        # Posicionar a janela de zoom próximo ao cursor
+        self._janela.geometry(f"+{event.x_root + 20}+{event.y_root + 20}")
+
+    # Recorta da imagem ampliada a área centrada no ponto (x, y) da imagem exibida
+    def _recortar(self, x, y):
+        # Coordenadas correspondentes na imagem ampliada
+        cx = int((x - self._pad[0]) * self.zoom_factor)
+        cy = int((y - self._pad[1]) * self.zoom_factor)
+        metade = self.lado // 2
+        altura_amp, largura_amp = self._ampliada.shape[:2]
+        x1, y1 = max(0, cx - metade), max(0, cy - metade)
+        x2, y2 = min(largura_amp, cx + metade), min(altura_amp, cy + metade)
+
+        # Recorte de tamanho fixo (bordas pretas quando o mouse está perto da borda da imagem)
+        recorte = np.zeros((self.lado, self.lado) + self._ampliada.shape[2:], dtype=np.uint8)
+        if x2 > x1 and y2 > y1:
+            dx, dy = x1 - (cx - metade), y1 - (cy - metade)
+            recorte[dy:dy + y2 - y1, dx:dx + x2 - x1] = self._ampliada[y1:y2, x1:x2]
+        return recorte
+
+    # Fecha a janela de zoom ao sair do label
+    def fechar(self, event=None):
+        self._evento = None
+        if self._agendado is not None:
+            self.label.after_cancel(self._agendado)
+            self._agendado = None
+        if self._janela is not None and self._janela.winfo_exists():
+            self._janela.destroy()
+        self._janela = None
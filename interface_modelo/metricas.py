@@ -0,0 +1,164 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+try:
+    import psutil
+except ImportError:  # Opcional: sem o psutil a memória vem do resource (pico de RSS, só em Unix)
+    psutil = None
+
+
+# Configuração das métricas (pode ser ajustada por variáveis de ambiente)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+SERVER_TIMING = os.environ.get('SERVER_TIMING', '0').lower() in ('1', 'true', 'yes')
+# Limites dos buckets dos histogramas, em segundos
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULO = nullcontext()
+
+
+# Função para ler a memória do processo em bytes (RSS atual com psutil; pico de RSS sem ele)
+def memoria_processo():
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+# Histograma acumulado de uma etapa (contagem por bucket, soma e total)
+class _Histograma:
+    __slots__ = ('contagens', 'soma', 'total')
+
+    def __init__(self, n_buckets):
+        self.contagens = [0] * (n_buckets + 1)  # O último é o +Inf
+        self.soma = 0.0
+        self.total = 0
+
+
+# Cronômetro de uma etapa, usado como gerenciador de contexto (with metricas.etapa('decode'): ...)
+class _Cronometro:
+    __slots__ = ('metricas', 'nome', 'inicio')
+
+    def __init__(self, metricas, nome):
+        self.metricas = metricas
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.metricas.observar(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+# Métricas de latência por etapa e contadores de vazão, exportadas no formato texto do Prometheus
+# Cada etapa tem um histograma; as etapas medidas na thread de uma requisição também ficam em um dicionário
+# por requisição (iniciar_requisicao/tempos_requisicao), usado no cabeçalho Server-Timing
+# Desligadas (ativo=False), etapa() devolve um contexto vazio e observar()/contar() retornam na hora
+class Metricas:
+    def __init__(self, prefixo='jucabiluca', ativo=METRICS_ENABLED, buckets=BUCKETS):
+        self.prefixo = prefixo
+        self.ativo = ativo
+        self.buckets = tuple(buckets)
+        self._histogramas = {}
+        self._contadores = {}
+        self._coletores = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inicio = time.time()
+
+    # Mede o tempo do bloco with na etapa `nome`
+    def etapa(self, nome):
+        if not self.ativo:
+            return _NULO
+        return _Cronometro(self, nome)
+
+    # Registra a duração (em segundos) de uma etapa
+    def observar(self, nome, segundos):
+        if not self.ativo:
+            return
+        with self._lock:
+            histograma = self._histogramas.get(nome)
+            if histograma is None:
+                histograma = self._histogramas[nome] = _Histograma(len(self.buckets))
+            histograma.contagens[bisect_left(self.buckets, segundos)] += 1
+            histograma.soma += segundos
+            histograma.total += 1
+        tempos = getattr(self._local, 'tempos', None)
+        if tempos is not None:
+            tempos[nome] = tempos.get(nome, 0.0) + segundos
+
+    # Soma `valor` ao contador `nome` com os rótulos dados (ex.: contar('requests', endpoint='upload', status=200))
+    def contar(self, nome, valor=1, **rotulos):
+        if not self.ativo:
+            return
+        chave = (nome, tuple(sorted(rotulos.items())))
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    # Registra uma função chamada na exportação que retorna {nome: valor} de medidores (ex.: tamanho da fila)
+    def registrar_coletor(self, funcao):
+        self._coletores.append(funcao)
+
+    # Começa a guardar os tempos das etapas medidas nesta thread (uma requisição ou uma detecção da interface)
+    def iniciar_requisicao(self):
+        if self.ativo:
+            self._local.tempos = {}
+
+    # Retorna os tempos (ms) das etapas medidas nesta thread desde iniciar_requisicao e para de guardar
+    def tempos_requisicao(self):
+        tempos = getattr(self._local, 'tempos', None)
+        self._local.tempos = None
+        return {nome: round(segundos * 1000, 3) for nome, segundos in (tempos or {}).items()}
+
+    # Monta o valor do cabeçalho Server-Timing (ex.: decode;dur=3.1, inference;dur=41.7)
+    @staticmethod
+    def server_timing(tempos_ms):
+        return ', '.join(f'{nome};dur={ms:.3f}' for nome, ms in tempos_ms.items())
+
+    # Exporta todas as métricas no formato texto do Prometheus
+    def prometheus(self):
+        p = self.prefixo
+        linhas = []
+        with self._lock:
+            histogramas = {nome: (list(h.contagens), h.soma, h.total) for nome, h in self._histogramas.items()}
+            contadores = dict(self._contadores)
+
+        linhas.append(f'# HELP {p}_stage_seconds Duração de cada etapa do processamento')
+        linhas.append(f'# TYPE {p}_stage_seconds histogram')
+        for nome, (contagens, soma, total) in sorted(histogramas.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + ('+Inf',), contagens):
+                acumulado += contagem
+                linhas.append(f'{p}_stage_seconds_bucket{{stage="{nome}",le="{limite}"}} {acumulado}')
+            linhas.append(f'{p}_stage_seconds_sum{{stage="{nome}"}} {soma:.6f}')
+            linhas.append(f'{p}_stage_seconds_count{{stage="{nome}"}} {total}')
+
+        nomes_contadores = sorted({nome for nome, _ in contadores})
+        for nome in nomes_contadores:
+            linhas.append(f'# TYPE {p}_{nome}_total counter')
+            for (nome_contador, rotulos), valor in sorted(contadores.items(), key=lambda item: str(item[0])):
+                if nome_contador == nome:
+                    texto = ','.join(f'{k}="{v}"' for k, v in rotulos)
+                    linhas.append(f'{p}_{nome}_total{{{texto}}} {valor}' if texto else f'{p}_{nome}_total {valor}')
+
+        medidores = {'process_uptime_seconds': round(time.time() - self._inicio, 3)}
+        memoria = memoria_processo()
+        if memoria is not None:
+            medidores['process_resident_memory_bytes'] = memoria
+        for coletor in self._coletores:
+            try:
+                medidores.update(coletor())
+            except Exception:
+                continue
+        for nome, valor in medidores.items():
+            if valor is not None:
+                linhas.append(f'# TYPE {p}_{nome} gauge')
+                linhas.append(f'{p}_{nome} {valor}')
+        return '\n'.join(linhas) + '\n'
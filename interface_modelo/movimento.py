@@ -0,0 +1,97 @@
+import os
+import time
+
+import cv2
+
+
+# Configuração do filtro de movimento (pode ser ajustada por variáveis de ambiente)
+MOTION_GATE = os.environ.get('MOTION_GATE', '1').lower() in ('1', 'true', 'yes')
+MOTION_METHOD = os.environ.get('MOTION_METHOD', 'diff')  # 'diff' (diferença de quadros) ou 'mog2' (subtração de fundo)
+MOTION_AREA_THRESHOLD = float(os.environ.get('MOTION_AREA_THRESHOLD', '0.005'))  # Fração da imagem que precisa mudar
+MOTION_PIXEL_THRESHOLD = int(os.environ.get('MOTION_PIXEL_THRESHOLD', '25'))
+MOTION_REFRESH_SECONDS = float(os.environ.get('MOTION_REFRESH_SECONDS', '5'))
+MOTION_ANALYSIS_WIDTH = int(os.environ.get('MOTION_ANALYSIS_WIDTH', '320'))
+
+
+# Filtro de movimento na frente do detector para vídeos contínuos
+# Só roda a inferência completa quando a área alterada passa do limite (ou a cada refresh segundos);
+# nos outros quadros reaproveita as detecções anteriores
+class MotionGate:
+    def __init__(self, detector, limiar_area=MOTION_AREA_THRESHOLD, limiar_pixel=MOTION_PIXEL_THRESHOLD,
+                 refresh=MOTION_REFRESH_SECONDS, metodo=MOTION_METHOD, largura_analise=MOTION_ANALYSIS_WIDTH):
+        if metodo not in ('diff', 'mog2'):
+            raise ValueError(f"Método de movimento desconhecido: {metodo}")
+        self.detector = detector
+        self.limiar_area = limiar_area
+        self.limiar_pixel = limiar_pixel
+        self.refresh = refresh
+        self.metodo = metodo
+        self.largura_analise = largura_analise
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._subtrator = cv2.createBackgroundSubtractorMOG2(history=300, detectShadows=False) if metodo == 'mog2' else None
+        self._referencia = None
+        self._resultado = None
+        self._ultima_inferencia = None
+        self.quadros = 0
+        self.inferencias = 0
+        self.ultima_area = 0.0
+
+    # Função para reduzir o quadro para a análise de movimento (cinza, pequeno e suavizado)
+    def _reduzir(self, quadro):
+        altura, largura = quadro.shape[:2]
+        if largura > self.largura_analise:
+            escala = self.largura_analise / largura
+            quadro = cv2.resize(quadro, (self.largura_analise, max(1, int(altura * escala))), interpolation=cv2.INTER_AREA)
+        cinza = cv2.cvtColor(quadro, cv2.COLOR_BGR2GRAY) if quadro.ndim == 3 else quadro
+        return cv2.GaussianBlur(cinza, (5, 5), 0)
+
+    # Função para medir a fração da imagem que mudou
+    # Na diferença de quadros a comparação é com o último quadro que passou pelo detector,
+    # assim mudanças lentas se acumulam até disparar uma nova inferência
+    def area_movimento(self, quadro):
+        pequeno = self._reduzir(quadro)
+        if self._subtrator is not None:
+            mascara = self._subtrator.apply(pequeno)
+        else:
+            if self._referencia is None or self._referencia.shape != pequeno.shape:
+                return 1.0, pequeno
+            diferenca = cv2.absdiff(pequeno, self._referencia)
+            _, mascara = cv2.threshold(diferenca, self.limiar_pixel, 255, cv2.THRESH_BINARY)
+        mascara = cv2.morphologyEx(mascara, cv2.MORPH_OPEN, self._kernel)
+        return cv2.countNonZero(mascara) / mascara.size, pequeno
+
+    # Executa o detector apenas quando necessário
+    # timestamp permite usar o tempo do vídeo no processamento offline (padrão: relógio do sistema)
+    # Retorna o resultado do detector (novo ou reaproveitado)
+    def __call__(self, quadro, timestamp=None):
+        agora = time.monotonic() if timestamp is None else timestamp
+        self.quadros += 1
+        area, pequeno = self.area_movimento(quadro)
+        self.ultima_area = area
+
+        vencido = self._ultima_inferencia is None or agora - self._ultima_inferencia >= self.refresh
+        if self._resultado is not None and not vencido and area < self.limiar_area:
+            return self._resultado
+
+        self._resultado = self.detector(quadro)
+        self._referencia = pequeno
+        self._ultima_inferencia = agora
+        self.inferencias += 1
+        return self._resultado
+
+    # Número de quadros que reaproveitaram as detecções anteriores
+    @property
+    def pulos(self):
+        return self.quadros - self.inferencias
+
+    def stats(self):
+        return {
+            'method': self.metodo,
+            'frames': self.quadros,
+            'inferences': self.inferencias,
+            'skipped': self.pulos,
+            'skip_ratio': round(self.pulos / self.quadros, 4) if self.quadros else 0.0,
+            'last_motion_area': round(float(self.ultima_area), 5),
+            'area_threshold': self.limiar_area,
+            'refresh_seconds': self.refresh,
+        }
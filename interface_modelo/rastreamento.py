@@ -0,0 +1,125 @@
+import cv2
+import numpy as np
+
+from interface_modelo.backends import iou_matriz
+
+
+# Função para casar caixas de dois conjuntos pela maior IoU (gulosa), exigindo a mesma classe
+# Retorna a lista de pares (i, j)
+def casar_caixas(caixas_a, classes_a, caixas_b, classes_b, iou_min=0.3):
+    if len(caixas_a) == 0 or len(caixas_b) == 0:
+        return []
+    ious = iou_matriz(caixas_a, caixas_b)
+    ious[np.asarray(classes_a)[:, None] != np.asarray(classes_b)[None, :]] = 0
+    pares = []
+    while True:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        if ious[i, j] < iou_min:
+            return pares
+        pares.append((int(i), int(j)))
+        ious[i, :] = 0
+        ious[:, j] = 0
+
+
+# Objeto rastreado entre os quadros-chave
+class Trilha:
+    def __init__(self, id_trilha, caixa, classe, conf, quadro):
+        self.id = id_trilha
+        self.caixa = np.asarray(caixa, dtype=np.float32)
+        self.caixa_chave = self.caixa.copy()  # Caixa no último quadro-chave em que foi detectada
+        self.classe = int(classe)
+        self.conf = float(conf)
+        self.velocidade = np.zeros(4, dtype=np.float32)  # Deslocamento por quadro de (x1, y1, x2, y2)
+        self.quadro_chave = quadro
+        self.perdidas = 0
+
+
+# Rastreador leve para propagar as detecções entre quadros-chave
+# metodo='velocidade': interpola pela velocidade medida entre os dois últimos quadros-chave
+# metodo='fluxo': desloca cada caixa pela mediana do fluxo óptico (Lucas-Kanade) dos pontos dentro dela
+class RastreadorIoU:
+    def __init__(self, iou_min=0.3, max_perdidas=2, metodo='velocidade'):
+        if metodo not in ('velocidade', 'fluxo'):
+            raise ValueError(f"Método de rastreamento desconhecido: {metodo}")
+        self.iou_min = iou_min
+        self.max_perdidas = max_perdidas
+        self.metodo = metodo
+        self.trilhas = []
+        self._proximo_id = 1
+        self._cinza_anterior = None
+
+    # Atualiza as trilhas com as detecções de um quadro-chave
+    def atualizar(self, caixas, confs, classes, quadro, img_bgr=None):
+        caixas = np.asarray(caixas, dtype=np.float32).reshape(-1, 4)
+        previstas = np.array([t.caixa for t in self.trilhas], dtype=np.float32).reshape(-1, 4)
+        pares = casar_caixas(previstas, [t.classe for t in self.trilhas], caixas, classes, self.iou_min)
+
+        casadas = set()
+        novas = set(range(len(caixas)))
+        for i, j in pares:
+            trilha = self.trilhas[i]
+            decorridos = max(1, quadro - trilha.quadro_chave)
+            trilha.velocidade = (caixas[j] - trilha.caixa_chave) / decorridos
+            trilha.caixa = caixas[j].copy()
+            trilha.caixa_chave = caixas[j].copy()
+            trilha.conf = float(confs[j])
+            trilha.quadro_chave = quadro
+            trilha.perdidas = 0
+            casadas.add(i)
+            novas.discard(j)
+
+        # Trilhas sem detecção neste quadro-chave são mantidas por max_perdidas quadros-chave
+        sobreviventes = []
+        for i, trilha in enumerate(self.trilhas):
+            if i not in casadas:
+                trilha.perdidas += 1
+                if trilha.perdidas > self.max_perdidas:
+                    continue
+            sobreviventes.append(trilha)
+        self.trilhas = sobreviventes
+
+        for j in sorted(novas):
+            self.trilhas.append(Trilha(self._proximo_id, caixas[j], classes[j], confs[j], quadro))
+            self._proximo_id += 1
+
+        if self.metodo == 'fluxo' and img_bgr is not None:
+            self._cinza_anterior = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+
+    # Propaga as trilhas para um quadro intermediário (sem rodar o detector)
+    def propagar(self, quadro, img_bgr=None):
+        if self.metodo == 'fluxo' and img_bgr is not None:
+            self._propagar_fluxo(cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY))
+            return
+        for trilha in self.trilhas:
+            trilha.caixa = trilha.caixa_chave + trilha.velocidade * (quadro - trilha.quadro_chave)
+
+    # Calcula o fluxo óptico uma única vez para a imagem toda e desloca cada caixa pela mediana dos pontos dentro dela
+    def _propagar_fluxo(self, cinza):
+        anterior, self._cinza_anterior = self._cinza_anterior, cinza
+        if anterior is None or not self.trilhas:
+            return
+        pontos = cv2.goodFeaturesToTrack(anterior, maxCorners=500, qualityLevel=0.01, minDistance=7)
+        if pontos is None:
+            return
+        novos, status, _ = cv2.calcOpticalFlowPyrLK(anterior, cinza, pontos, None, winSize=(21, 21), maxLevel=2)
+        validos = status.reshape(-1) == 1
+        pontos = pontos.reshape(-1, 2)[validos]
+        deslocamentos = novos.reshape(-1, 2)[validos] - pontos
+
+        for trilha in self.trilhas:
+            x1, y1, x2, y2 = trilha.caixa
+            dentro = (pontos[:, 0] >= x1) & (pontos[:, 0] <= x2) & (pontos[:, 1] >= y1) & (pontos[:, 1] <= y2)
+            if dentro.sum() >= 3:
+                dx, dy = np.median(deslocamentos[dentro], axis=0)
+            else:
+                dx, dy = trilha.velocidade[0], trilha.velocidade[1]
+            trilha.caixa = trilha.caixa + np.array([dx, dy, dx, dy], dtype=np.float32)
+
+    # Retorna os objetos atualmente rastreados (caixas, confianças, classes e ids)
+    def estado(self):
+        if not self.trilhas:
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0), np.zeros(0, dtype=int), []
+        caixas = np.stack([t.caixa for t in self.trilhas])
+        confs = np.array([t.conf for t in self.trilhas])
+        classes = np.array([t.classe for t in self.trilhas], dtype=int)
+        return caixas, confs, classes, [t.id for t in self.trilhas]
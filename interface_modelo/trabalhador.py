@@ -0,0 +1,118 @@
+import queue
+import threading
+
+
+# Exceção usada para interromper uma tarefa cancelada ou substituída
+class TarefaCancelada(Exception):
+    pass
+
+
+# Tarefa enviada ao trabalhador; a função recebe a própria tarefa para informar o progresso
+# e chamar verificar() entre as etapas (o que interrompe a execução se ela foi cancelada)
+class Tarefa:
+    def __init__(self, chave, funcao, ao_concluir, ao_progresso=None, ao_erro=None):
+        self.chave = chave
+        self.funcao = funcao
+        self.ao_concluir = ao_concluir
+        self.ao_progresso = ao_progresso
+        self.ao_erro = ao_erro
+        self._cancelada = threading.Event()
+        self._saida = None
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    def verificar(self):
+        if self._cancelada.is_set():
+            raise TarefaCancelada()
+
+    def progresso(self, mensagem):
+        self.verificar()
+        if self.ao_progresso is not None:
+            self._saida.put(('progresso', self, mensagem))
+
+
+# Trabalhador em segundo plano para a interface Tk
+# Roda uma tarefa por vez em uma thread própria e devolve os resultados para a thread do Tk
+# por uma fila consultada com root.after (o Tk não pode ser chamado de outras threads)
+# Uma nova tarefa cancela a que está rodando e substitui a que estava esperando;
+# tarefas com a mesma chave da atual (cliques repetidos com as mesmas opções) são ignoradas
+class TrabalhadorTk:
+    def __init__(self, root, intervalo_ms=30):
+        self.root = root
+        self.intervalo_ms = intervalo_ms
+        self._saida = queue.Queue()
+        self._cond = threading.Condition()
+        self._pendente = None
+        self._atual = None
+        threading.Thread(target=self._loop, name='trabalhador-tk', daemon=True).start()
+        self.root.after(self.intervalo_ms, self._verificar_saida)
+
+    # Indica se há uma tarefa rodando ou esperando
+    @property
+    def ocupado(self):
+        with self._cond:
+            return self._pendente is not None or (self._atual is not None and not self._atual.cancelada)
+
+    # Envia uma tarefa; retorna False se ela foi agrupada com uma tarefa igual já em andamento
+    def enviar(self, chave, funcao, ao_concluir, ao_progresso=None, ao_erro=None):
+        with self._cond:
+            for existente in (self._atual, self._pendente):
+                if existente is not None and not existente.cancelada and existente.chave == chave:
+                    return False
+            if self._atual is not None:
+                self._atual.cancelar()
+            tarefa = Tarefa(chave, funcao, ao_concluir, ao_progresso, ao_erro)
+            tarefa._saida = self._saida
+            self._pendente = tarefa
+            self._cond.notify()
+            return True
+
+    # Cancela a tarefa atual e descarta a que estava esperando
+    def cancelar(self):
+        with self._cond:
+            if self._atual is not None:
+                self._atual.cancelar()
+            self._pendente = None
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendente is not None)
+                tarefa, self._pendente = self._pendente, None
+                self._atual = tarefa
+            try:
+                resultado = tarefa.funcao(tarefa)
+                tarefa.verificar()
+                self._saida.put(('concluida', tarefa, resultado))
+            except TarefaCancelada:
+                pass
+            except Exception as e:
+                self._saida.put(('erro', tarefa, e))
+            finally:
+                with self._cond:
+                    if self._atual is tarefa:
+                        self._atual = None
+
+    # Executado na thread do Tk: entrega progresso e resultados das tarefas que não foram canceladas
+    def _verificar_saida(self):
+        try:
+            while True:
+                tipo, tarefa, valor = self._saida.get_nowait()
+                if tarefa.cancelada:
+                    continue
+                if tipo == 'progresso':
+                    tarefa.ao_progresso(valor)
+                elif tipo == 'concluida':
+                    tarefa.ao_concluir(valor)
+                elif tarefa.ao_erro is not None:
+                    tarefa.ao_erro(valor)
+                else:
+                    print(f"Erro na tarefa em segundo plano: {valor}")
+        except queue.Empty:
+            pass
+        self.root.after(self.intervalo_ms, self._verificar_saida)
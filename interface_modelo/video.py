@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+# Permite rodar como script (python interface_modelo/video.py) e importar os módulos compartilhados
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from interface_modelo.backends import carregar_modelo_otimizado
+from interface_modelo.desenho import desenhar_deteccoes, arrays_resultado
+from interface_modelo.movimento import MotionGate
+from interface_modelo.rastreamento import RastreadorIoU
+
+_FIM = object()
+
+
+# Thread que executa uma função e guarda a exceção (se houver) para ser relançada no final
+# Se a função falhar, o evento `parar` avisa as outras etapas para não esperarem mais por ela
+class _Etapa(threading.Thread):
+    def __init__(self, alvo, nome, parar):
+        super().__init__(name=nome, daemon=True)
+        self.alvo = alvo
+        self.parar = parar
+        self.erro = None
+
+    def run(self):
+        try:
+            self.alvo()
+        except Exception as e:
+            self.erro = e
+            self.parar.set()
+
+
+# Função para colocar um item em uma fila limitada sem bloquear para sempre
+# Retorna False (sem colocar) se o processamento foi interrompido enquanto a fila estava cheia
+def _colocar(fila, item, parar):
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+# Função para retirar um item de uma fila; retorna _FIM se o processamento foi interrompido
+def _retirar(fila, parar):
+    while True:
+        try:
+            return fila.get(timeout=0.1)
+        except queue.Empty:
+            if parar.is_set():
+                return _FIM
+
+
+# Função para rodar o detector em um quadro BGR
+# Retorna as caixas, confianças e classes como arrays NumPy
+def detectar_quadro(modelo, quadro, conf_threshold):
+    return arrays_resultado(modelo(quadro, conf=conf_threshold, verbose=False)[0])
+
+
+# Função para processar um vídeo gravado rodando o detector só nos quadros-chave
+# Entre os quadros-chave as caixas são propagadas pelo rastreador
+# Decodificação, detecção/rastreamento e codificação rodam sobrepostas em threads ligadas por filas limitadas
+# Retorna o relatório com quadros processados, inferências e FPS de ponta a ponta
+def processar_video(modelo, class_names, entrada, saida_video, saida_jsonl, intervalo=5, conf_threshold=0.25,
+                    metodo='velocidade', movimento=False, tamanho_fila=16):
+    cap = cv2.VideoCapture(entrada)
+    if not cap.isOpened():
+        raise FileNotFoundError(f'Não foi possível abrir o vídeo: {entrada}')
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    largura = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    altura = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    fila_quadros = queue.Queue(maxsize=tamanho_fila)
+    fila_saida = queue.Queue(maxsize=tamanho_fila)
+    # Sinaliza que uma etapa falhou: as outras param em vez de esperar para sempre em uma fila cheia ou vazia
+    parar = threading.Event()
+
+    # Etapa 1: decodificação
+    def decodificar():
+        try:
+            while not parar.is_set():
+                sucesso, quadro = cap.read()
+                if not sucesso or not _colocar(fila_quadros, quadro, parar):
+                    break
+        finally:
+            cap.release()
+            _colocar(fila_quadros, _FIM, parar)
+
+    # Etapa 3: codificação do vídeo anotado e escrita do JSONL
+    def codificar():
+        escritor = cv2.VideoWriter(saida_video, cv2.VideoWriter_fourcc(*'mp4v'), fps, (largura, altura))
+        try:
+            with open(saida_jsonl, 'w', encoding='utf-8') as f:
+                while True:
+                    item = _retirar(fila_saida, parar)
+                    if item is _FIM:
+                        break
+                    quadro, registro = item
+                    escritor.write(quadro)
+                    f.write(json.dumps(registro) + '\n')
+        finally:
+            escritor.release()
+
+    detector = lambda quadro: detectar_quadro(modelo, quadro, conf_threshold)
+    filtro = MotionGate(detector) if movimento else None
+    rastreador = RastreadorIoU(metodo=metodo)
+
+    leitor = _Etapa(decodificar, 'video-decodificacao', parar)
+    escritor = _Etapa(codificar, 'video-codificacao', parar)
+    inicio = time.perf_counter()
+
+    # Etapa 2: detecção nos quadros-chave e rastreamento nos demais
+    indice = 0
+    inferencias = 0
+    tempo_inferencia = 0.0
+    try:
+        leitor.start()
+        escritor.start()
+        while True:
+            quadro = _retirar(fila_quadros, parar)
+            if quadro is _FIM:
+                break
+
+            chave = indice % intervalo == 0
+            if chave:
+                t0 = time.perf_counter()
+                if filtro is not None:
+                    # Com o filtro de movimento, o quadro-chave só roda o modelo se a cena mudou
+                    antes = filtro.inferencias
+                    caixas, confs, classes = filtro(quadro, timestamp=indice / fps)
+                    chave = filtro.inferencias > antes
+                else:
+                    caixas, confs, classes = detector(quadro)
+                if chave:
+                    inferencias += 1
+                    tempo_inferencia += time.perf_counter() - t0
+                    rastreador.atualizar(caixas, confs, classes, indice, quadro)
+            if not chave:
+                rastreador.propagar(indice, quadro)
+
+            caixas, confs, classes, ids = rastreador.estado()
+            desenhar_deteccoes(quadro, caixas, confs, classes, class_names, prefixos=[f'#{i}' for i in ids])
+            registro = {
+                'frame': indice,
+                'time': round(indice / fps, 3),
+                'keyframe': chave,
+                'objects': [
+                    {'id': i, 'class_id': int(c), 'class': class_names[int(c)], 'confidence': round(float(p), 4),
+                     'box': [round(float(v), 1) for v in caixa]}
+                    for i, caixa, p, c in zip(ids, caixas, confs, classes)
+                ],
+            }
+            if not _colocar(fila_saida, (quadro, registro), parar):
+                break  # A codificação falhou (o erro é relançado abaixo)
+            indice += 1
+    except BaseException:
+        parar.set()
+        raise
+    finally:
+        _colocar(fila_saida, _FIM, parar)
+        for etapa in (escritor, leitor):
+            if etapa.is_alive():
+                etapa.join()
+        cap.release()  # Caso a decodificação nem tenha começado (liberar de novo não tem efeito)
+
+    for etapa in (leitor, escritor):
+        if etapa.erro is not None:
+            raise etapa.erro
+
+    duracao = time.perf_counter() - inicio
+    return {
+        'frames': indice,
+        'inferences': inferencias,
+        'keyframe_interval': intervalo,
+        'tracker': metodo,
+        'motion_gate': filtro.stats() if filtro is not None else None,
+        'seconds': round(duracao, 3),
+        'fps': round(indice / duracao, 2) if duracao else 0.0,
+        'avg_inference_ms': round(tempo_inferencia / inferencias * 1000, 3) if inferencias else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Processa um vídeo gravado com detecção em quadros-chave e rastreamento entre eles.')
+    parser.add_argument('entrada', help='Arquivo de vídeo de entrada')
+    parser.add_argument('--saida', help='Vídeo anotado de saída (padrão: <entrada>_deteccoes.mp4)')
+    parser.add_argument('--jsonl', help='Arquivo JSONL com os objetos rastreados por quadro (padrão: <entrada>_deteccoes.jsonl)')
+    parser.add_argument('--modelo', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'best.pt'))
+    parser.add_argument('--intervalo', type=int, default=5, help='Roda o detector a cada N quadros')
+    parser.add_argument('--conf', type=float, default=25, help='Confiança mínima das detecções (%%)')
+    parser.add_argument('--rastreador', choices=('velocidade', 'fluxo'), default='velocidade')
+    parser.add_argument('--movimento', action='store_true', help='Pula quadros-chave sem movimento na cena')
+    args = parser.parse_args()
+
+    base, _ = os.path.splitext(args.entrada)
+    modelo, class_names, _ = carregar_modelo_otimizado(args.modelo)
+    relatorio = processar_video(
+        modelo, class_names, args.entrada,
+        args.saida or f'{base}_deteccoes.mp4',
+        args.jsonl or f'{base}_deteccoes.jsonl',
+        intervalo=max(1, args.intervalo),
+        conf_threshold=args.conf / 100,
+        metodo=args.rastreador,
+        movimento=args.movimento,
+    )
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == '__main__':
+    main()
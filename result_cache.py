@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+# Configuração do cache (pode ser ajustada por variáveis de ambiente)
+RESULT_CACHE_ITEMS = int(os.environ.get('RESULT_CACHE_ITEMS', '256'))
+RESULT_CACHE_MEMORY_MB = float(os.environ.get('RESULT_CACHE_MEMORY_MB', '128'))
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR') or None  # Sem diretório, o cache em disco fica desligado
+RESULT_CACHE_DISK_MB = float(os.environ.get('RESULT_CACHE_DISK_MB', '1024'))
+
+
+# Função para calcular o tamanho aproximado de uma entrada do cache em bytes
+def _tamanho_entrada(entrada):
+    imagem = entrada.get('image') or b''
+    return len(imagem) + len(json.dumps({k: v for k, v in entrada.items() if k != 'image'}))
+
+
+# Cache de resultados indexado pelo hash do arquivo enviado + parâmetros de inferência
+# Camada em memória (LRU limitada por itens e bytes) e camada opcional em disco que sobrevive a reinícios
+# As entradas guardam as detecções em JSON e, quando disponível, a imagem anotada já codificada
+class ResultCache:
+    def __init__(self, model_path, max_items=RESULT_CACHE_ITEMS, max_memory_mb=RESULT_CACHE_MEMORY_MB,
+                 disk_dir=RESULT_CACHE_DIR, disk_max_mb=RESULT_CACHE_DISK_MB):
+        self.model_path = model_path
+        self.max_items = max(0, int(max_items))
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = int(disk_max_mb * 1024 * 1024)
+        self._memoria = OrderedDict()
+        self._memoria_bytes = 0
+        self._disco = OrderedDict()  # chave -> bytes ocupados, da mais antiga para a mais recente
+        self._disco_bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {'hits_memory': 0, 'hits_disk': 0, 'misses': 0, 'evictions_memory': 0,
+                            'evictions_disk': 0, 'invalidations': 0}
+        self._ultima_verificacao = 0.0
+        self.model_fingerprint = self._impressao_modelo()
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._carregar_indice_disco()
+
+    # Função para gerar a "impressão digital" do arquivo do modelo (caminho, tamanho e data de modificação)
+    def _impressao_modelo(self):
+        try:
+            st = os.stat(self.model_path)
+            return f'{os.path.abspath(self.model_path)}:{st.st_size}:{st.st_mtime_ns}'
+        except OSError:
+            return f'{self.model_path}:missing'
+
+    # Invalida todo o cache quando o arquivo do modelo muda (verificado no máximo uma vez por segundo)
+    def _verificar_modelo(self):
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao < 1.0:
+            return
+        self._ultima_verificacao = agora
+        impressao = self._impressao_modelo()
+        if impressao != self.model_fingerprint:
+            self.model_fingerprint = impressao
+            self._limpar()
+            self._contadores['invalidations'] += 1
+
+    # Função para montar a chave a partir dos bytes enviados e dos parâmetros de inferência
+    def key(self, data, parametros=None):
+        h = hashlib.sha256(data)
+        h.update(repr(sorted(parametros or ())).encode())
+        h.update(self.model_fingerprint.encode())
+        return h.hexdigest()
+
+    # Busca uma entrada que contenha todos os campos pedidos (ex.: 'image' para /process-image)
+    # Retorna None em caso de falta
+    def get(self, chave, campos=('detections',)):
+        with self._lock:
+            self._verificar_modelo()
+            entrada = self._memoria.get(chave)
+            if entrada is not None and all(entrada.get(c) is not None for c in campos):
+                self._memoria.move_to_end(chave)
+                self._contadores['hits_memory'] += 1
+                return entrada
+
+            if self.disk_dir and chave in self._disco:
+                entrada = self._ler_disco(chave)
+                if entrada is not None and all(entrada.get(c) is not None for c in campos):
+                    self._disco.move_to_end(chave)
+                    self._guardar_memoria(chave, entrada)
+                    self._contadores['hits_disk'] += 1
+                    return entrada
+
+            self._contadores['misses'] += 1
+            return None
+
+    # Guarda (ou completa) uma entrada nas duas camadas
+    def put(self, chave, **campos):
+        with self._lock:
+            self._verificar_modelo()
+            entrada = dict(self._memoria.get(chave) or {})
+            entrada.update({k: v for k, v in campos.items() if v is not None})
+            self._guardar_memoria(chave, entrada)
+            if self.disk_dir:
+                self._gravar_disco(chave, entrada)
+
+    def _guardar_memoria(self, chave, entrada):
+        tamanho = _tamanho_entrada(entrada)
+        if self.max_items == 0 or tamanho > self.max_memory_bytes:
+            return
+        antiga = self._memoria.pop(chave, None)
+        if antiga is not None:
+            self._memoria_bytes -= antiga['_bytes']
+        entrada['_bytes'] = tamanho
+        self._memoria[chave] = entrada
+        self._memoria_bytes += tamanho
+
+        while len(self._memoria) > self.max_items or self._memoria_bytes > self.max_memory_bytes:
+            _, removida = self._memoria.popitem(last=False)
+            self._memoria_bytes -= removida['_bytes']
+            self._contadores['evictions_memory'] += 1
+
+    # A imagem anotada pode estar em JPEG, WebP, PNG ou AVIF (o formato fica em 'encoding' no JSON),
+    # então vai para um arquivo .bin neutro
+    def _caminhos(self, chave):
+        base = os.path.join(self.disk_dir, chave)
+        return base + '.json', base + '.bin'
+
+    # Monta o índice do disco a partir dos arquivos existentes, do mais antigo para o mais recente
+    def _carregar_indice_disco(self):
+        arquivos = []
+        for nome in os.listdir(self.disk_dir):
+            if nome.endswith('.jpg') and os.path.exists(os.path.join(self.disk_dir, nome[:-4] + '.json')):
+                # Imagem gravada por versões anteriores, sempre como .jpg: a entrada é completada de novo no próximo pedido
+                try:
+                    os.remove(os.path.join(self.disk_dir, nome))
+                except OSError:
+                    pass
+            if not nome.endswith('.json'):
+                continue
+            chave = nome[:-5]
+            caminho_json, caminho_img = self._caminhos(chave)
+            try:
+                st = os.stat(caminho_json)
+                tamanho = st.st_size + (os.path.getsize(caminho_img) if os.path.exists(caminho_img) else 0)
+            except OSError:
+                continue
+            arquivos.append((st.st_mtime, chave, tamanho))
+        for _, chave, tamanho in sorted(arquivos):
+            self._disco[chave] = tamanho
+            self._disco_bytes += tamanho
+        self._reduzir_disco()
+
+    def _ler_disco(self, chave):
+        caminho_json, caminho_img = self._caminhos(chave)
+        try:
+            with open(caminho_json, 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+            if entrada.get('model') != self.model_fingerprint:
+                return None
+            if os.path.exists(caminho_img):
+                with open(caminho_img, 'rb') as f:
+                    entrada['image'] = f.read()
+            return entrada
+        except (OSError, ValueError):
+            return None
+
+    # Grava a entrada de forma atômica (arquivo temporário + rename) para não deixar arquivos corrompidos
+    def _gravar_disco(self, chave, entrada):
+        caminho_json, caminho_img = self._caminhos(chave)
+        dados = {k: v for k, v in entrada.items() if k not in ('image', '_bytes')}
+        dados['model'] = self.model_fingerprint
+        try:
+            tamanho = 0
+            if entrada.get('image') is not None:
+                with open(caminho_img + '.tmp', 'wb') as f:
+                    f.write(entrada['image'])
+                os.replace(caminho_img + '.tmp', caminho_img)
+                tamanho += len(entrada['image'])
+            with open(caminho_json + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(dados, f)
+            os.replace(caminho_json + '.tmp', caminho_json)
+            tamanho += os.path.getsize(caminho_json)
+        except OSError as e:
+            print(f"Erro ao gravar o cache em disco: {e}")
+            return
+
+        self._disco_bytes += tamanho - self._disco.pop(chave, 0)
+        self._disco[chave] = tamanho
+        self._reduzir_disco()
+
+    # Remove as entradas mais antigas até respeitar o limite de tamanho em disco
+    def _reduzir_disco(self):
+        while self._disco and self._disco_bytes > self.disk_max_bytes:
+            chave, tamanho = self._disco.popitem(last=False)
+            self._disco_bytes -= tamanho
+            self._remover_arquivos(chave)
+            self._contadores['evictions_disk'] += 1
+
+    def _remover_arquivos(self, chave):
+        for caminho in self._caminhos(chave):
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+
+    def _limpar(self):
+        self._memoria.clear()
+        self._memoria_bytes = 0
+        if self.disk_dir:
+            for chave in list(self._disco):
+                self._remover_arquivos(chave)
+        self._disco.clear()
+        self._disco_bytes = 0
+
+    # Limpa o cache manualmente
+    def clear(self):
+        with self._lock:
+            self._limpar()
+            self._contadores['invalidations'] += 1
+
+    # Retorna os contadores de acertos, faltas e remoções
+    def stats(self):
+        with self._lock:
+            hits = self._contadores['hits_memory'] + self._contadores['hits_disk']
+            total = hits + self._contadores['misses']
+            return dict(self._contadores,
+                        hits=hits,
+                        hit_ratio=round(hits / total, 4) if total else 0.0,
+                        memory_items=len(self._memoria),
+                        memory_bytes=self._memoria_bytes,
+                        disk_enabled=bool(self.disk_dir),
+                        disk_items=len(self._disco),
+                        disk_bytes=self._disco_bytes,
+                        model=self.model_fingerprint)
@@ -0,0 +1,322 @@
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from batching import Sobrecarga
+from interface_modelo.movimento import MotionGate, MOTION_GATE
+
+
+# Configuração do stream (pode ser ajustada por variáveis de ambiente)
+STREAM_SOURCE = os.environ.get('STREAM_SOURCE', '0')
+# Fontes permitidas, separadas por vírgula: "nome=fonte" ou só a fonte (ex.: portao=rtsp://...,patio=1)
+STREAM_SOURCES = os.environ.get('STREAM_SOURCES', '')
+STREAM_JPEG_QUALITY = int(os.environ.get('STREAM_JPEG_QUALITY', '80'))
+STREAM_IDLE_SECONDS = float(os.environ.get('STREAM_IDLE_SECONDS', '5'))
+STREAM_MAX_PIPELINES = int(os.environ.get('STREAM_MAX_PIPELINES', '4'))
+
+
+# Fonte pedida que não está entre as fontes configuradas (HTTP 400)
+class FonteNaoPermitida(ValueError):
+    pass
+
+
+# Limite de pipelines simultâneos atingido (HTTP 503 com Retry-After)
+class LimiteStreams(Sobrecarga):
+    status = 503
+
+
+# Função para ler as fontes permitidas da configuração (STREAM_SOURCES; sem ela, só STREAM_SOURCE)
+# Entradas sem nome são conhecidas pela própria fonte; todas também podem ser pedidas pela posição (0, 1...)
+# Retorna o dicionário ordenado {nome: fonte}
+def ler_fontes(texto=STREAM_SOURCES, padrao=STREAM_SOURCE):
+    fontes = {}
+    for item in (texto or padrao).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        nome, separador, fonte = item.partition('=')
+        # Só é nome o que vem antes de um "=" e é um identificador simples (URLs também podem ter "=")
+        if separador and re.fullmatch(r'[\w.-]+', nome.strip()):
+            fontes[nome.strip()] = fonte.strip()
+        else:
+            fontes[item] = item
+    return fontes
+
+
+# Função para interpretar a fonte: índice de câmera ("0"), arquivo de vídeo ou URL (rtsp://, http://)
+# Retorna o valor aceito pelo cv2.VideoCapture e se a fonte é um arquivo local
+def interpretar_fonte(fonte):
+    fonte = str(fonte).strip()
+    if fonte.isdigit():
+        return int(fonte), False
+    return fonte, os.path.isfile(fonte)
+
+
+# Função para colocar um item na fila descartando o anterior se ela estiver cheia
+# Mantém sempre o quadro mais recente em vez de acumular atraso
+# Retorna True se um item antigo foi descartado
+def substituir(fila, item):
+    descartado = False
+    while True:
+        try:
+            fila.put_nowait(item)
+            return descartado
+        except queue.Full:
+            try:
+                fila.get_nowait()
+                descartado = True
+            except queue.Empty:
+                pass
+
+
+# Estatísticas de latência de uma etapa do pipeline (últimas N medições)
+class _Etapa:
+    def __init__(self, tamanho=120):
+        self.tempos = deque(maxlen=tamanho)
+
+    def registrar(self, segundos):
+        self.tempos.append(segundos * 1000)
+
+    def resumo(self):
+        if not self.tempos:
+            return {'avg_ms': 0.0, 'p95_ms': 0.0}
+        tempos = np.fromiter(self.tempos, dtype=np.float64)
+        return {'avg_ms': round(float(tempos.mean()), 3), 'p95_ms': round(float(np.percentile(tempos, 95)), 3)}
+
+
+# Pipeline de detecção em tempo real para uma fonte de vídeo
+# Captura, inferência e codificação rodam em threads separadas ligadas por filas de tamanho 1,
+# então quadros antigos são descartados quando a inferência não acompanha a câmera
+class StreamPipeline:
+    def __init__(self, fonte, inferir, desenhar, qualidade=STREAM_JPEG_QUALITY):
+        self.fonte = fonte
+        self.inferir = inferir      # quadro BGR -> resultado
+        self.desenhar = desenhar    # (quadro BGR, resultado) -> quadro BGR anotado
+        self.qualidade = qualidade
+        self.ativo = False
+        self._fila_inferencia = queue.Queue(maxsize=1)
+        self._fila_codificacao = queue.Queue(maxsize=1)
+        self._cond = threading.Condition()
+        self._jpeg = None
+        self._frame_id = 0
+        self._etapas = {'capture': _Etapa(), 'inference': _Etapa(), 'encode': _Etapa(), 'end_to_end': _Etapa()}
+        self._entregues = deque(maxlen=120)
+        self._capturados = 0
+        self._descartados = 0
+        self._erro = None
+        self._threads = []
+
+    def iniciar(self):
+        self.ativo = True
+        for alvo, nome in ((self._capturar, 'captura'), (self._inferir, 'inferencia'), (self._codificar, 'codificacao')):
+            thread = threading.Thread(target=alvo, name=f'stream-{nome}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def parar(self):
+        self.ativo = False
+        with self._cond:
+            self._cond.notify_all()
+
+    # Etapa 1: lê os quadros da fonte; arquivos locais são repetidos em loop no ritmo do vídeo
+    # para simular uma câmera ao vivo (ex.: substituto local de uma URL RTSP)
+    def _capturar(self):
+        origem, arquivo = interpretar_fonte(self.fonte)
+        cap = cv2.VideoCapture(origem)
+        intervalo = 0.0
+        if arquivo:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            intervalo = 1.0 / fps if fps and fps > 0 else 1.0 / 30
+        proximo = time.perf_counter()
+
+        try:
+            while self.ativo:
+                inicio = time.perf_counter()
+                sucesso, quadro = cap.read()
+                if not sucesso:
+                    if arquivo:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    # Câmera ou URL indisponível: tenta reabrir depois de um tempo
+                    self._erro = f'Falha ao capturar o quadro de {self.fonte}'
+                    cap.release()
+                    time.sleep(1.0)
+                    cap = cv2.VideoCapture(origem)
+                    continue
+
+                self._erro = None
+                self._capturados += 1
+                self._etapas['capture'].registrar(time.perf_counter() - inicio)
+                if substituir(self._fila_inferencia, (time.perf_counter(), quadro)):
+                    self._descartados += 1
+
+                if intervalo:
+                    proximo += intervalo
+                    espera = proximo - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                    else:
+                        proximo = time.perf_counter()
+        finally:
+            cap.release()
+
+    # Etapa 2: roda o detector no quadro mais recente
+    def _inferir(self):
+        while self.ativo:
+            try:
+                capturado_em, quadro = self._fila_inferencia.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            inicio = time.perf_counter()
+            try:
+                resultado = self.inferir(quadro)
+            except Exception as e:
+                self._erro = f'Erro na inferência: {e}'
+                continue
+            self._etapas['inference'].registrar(time.perf_counter() - inicio)
+            if substituir(self._fila_codificacao, (capturado_em, quadro, resultado)):
+                self._descartados += 1
+
+    # Etapa 3: desenha as detecções, codifica em JPEG e publica para os espectadores
+    def _codificar(self):
+        parametros = [int(cv2.IMWRITE_JPEG_QUALITY), self.qualidade]
+        while self.ativo:
+            try:
+                capturado_em, quadro, resultado = self._fila_codificacao.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            inicio = time.perf_counter()
+            anotado = self.desenhar(quadro, resultado)
+            sucesso, jpeg = cv2.imencode('.jpg', anotado, parametros)
+            if not sucesso:
+                continue
+            agora = time.perf_counter()
+            self._etapas['encode'].registrar(agora - inicio)
+            self._etapas['end_to_end'].registrar(agora - capturado_em)
+            self._entregues.append(agora)
+            with self._cond:
+                self._jpeg = jpeg.tobytes()
+                self._frame_id += 1
+                self._cond.notify_all()
+
+    # Gerador de partes multipart/x-mixed-replace para um espectador
+    # Cada espectador só recebe quadros novos; nenhum roda o modelo por conta própria
+    def quadros(self):
+        ultimo = 0
+        while self.ativo:
+            with self._cond:
+                self._cond.wait_for(lambda: self._frame_id != ultimo or not self.ativo, timeout=1.0)
+                if not self.ativo:
+                    break
+                if self._frame_id == ultimo:
+                    continue
+                ultimo, jpeg = self._frame_id, self._jpeg
+            yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+    # FPS alcançado (quadros publicados no último intervalo) e latência por etapa
+    def stats(self):
+        entregues = list(self._entregues)
+        fps = (len(entregues) - 1) / (entregues[-1] - entregues[0]) if len(entregues) > 1 and entregues[-1] > entregues[0] else 0.0
+        return {
+            'source': self.fonte,
+            'active': self.ativo,
+            'fps': round(fps, 2),
+            'frames_captured': self._capturados,
+            'frames_published': self._frame_id,
+            'frames_dropped': self._descartados,
+            'stages': {nome: etapa.resumo() for nome, etapa in self._etapas.items()},
+            'motion_gate': self.inferir.stats() if isinstance(self.inferir, MotionGate) else None,
+            'error': self._erro,
+        }
+
+
+# Registro de pipelines compartilhados: todos os espectadores da mesma fonte usam um único pipeline
+# O pipeline é encerrado quando o último espectador sai e a fonte fica ociosa por STREAM_IDLE_SECONDS
+# Com filtro_movimento, cada fonte ganha seu próprio MotionGate e só roda o modelo quando a cena muda
+# Só as fontes configuradas (fontes: {nome: fonte}) podem ser abertas, pelo nome ou pela posição, e no
+# máximo `maximo` pipelines rodam ao mesmo tempo (cada um captura e infere continuamente)
+class StreamRegistry:
+    def __init__(self, inferir, desenhar, ocioso=STREAM_IDLE_SECONDS, filtro_movimento=MOTION_GATE,
+                 fontes=None, maximo=STREAM_MAX_PIPELINES):
+        self.inferir = inferir
+        self.desenhar = desenhar
+        self.ocioso = ocioso
+        self.filtro_movimento = filtro_movimento
+        self.fontes = ler_fontes() if fontes is None else dict(fontes)
+        self.maximo = max(1, maximo)
+        self._pipelines = {}
+        self._espectadores = {}
+        self._lock = threading.Lock()
+
+    # Função para obter o nome da fonte configurada pedida pelo nome ou pela posição (None: a primeira)
+    # Lança FonteNaoPermitida para qualquer outro valor (arquivos, dispositivos e URLs não configurados)
+    def resolver(self, pedido=None):
+        if not self.fontes:
+            raise FonteNaoPermitida('Nenhuma fonte de stream configurada')
+        if pedido is None or pedido == '':
+            return next(iter(self.fontes))
+        pedido = str(pedido).strip()
+        if pedido in self.fontes:
+            return pedido
+        if pedido.isdigit() and int(pedido) < len(self.fontes):
+            return list(self.fontes)[int(pedido)]
+        raise FonteNaoPermitida(f'Fonte de stream não configurada: {pedido}')
+
+    # Verifica se um espectador da fonte seria aceito agora (sem entrar); lança LimiteStreams
+    # se for preciso abrir um pipeline novo e o limite já foi atingido
+    def verificar(self, nome):
+        with self._lock:
+            self._verificar_limite(nome)
+
+    def _verificar_limite(self, nome):
+        pipeline = self._pipelines.get(nome)
+        if pipeline is not None and pipeline.ativo:
+            return
+        ativos = sum(1 for outro, p in self._pipelines.items() if outro != nome and p.ativo)
+        if ativos >= self.maximo:
+            raise LimiteStreams(f'Limite de {self.maximo} streams simultâneos atingido', self.ocioso)
+
+    def _entrar(self, nome):
+        with self._lock:
+            pipeline = self._pipelines.get(nome)
+            if pipeline is None or not pipeline.ativo:
+                self._verificar_limite(nome)
+                inferir = MotionGate(self.inferir) if self.filtro_movimento else self.inferir
+                pipeline = StreamPipeline(self.fontes[nome], inferir, self.desenhar)
+                pipeline.iniciar()
+                self._pipelines[nome] = pipeline
+            self._espectadores[nome] = self._espectadores.get(nome, 0) + 1
+            return pipeline
+
+    def _sair(self, nome):
+        with self._lock:
+            self._espectadores[nome] -= 1
+            if self._espectadores[nome] > 0:
+                return
+        threading.Timer(self.ocioso, self._encerrar_se_ocioso, args=(nome,)).start()
+
+    def _encerrar_se_ocioso(self, nome):
+        with self._lock:
+            if self._espectadores.get(nome, 0) == 0 and nome in self._pipelines:
+                self._pipelines.pop(nome).parar()
+                self._espectadores.pop(nome, None)
+
+    # Gerador para a resposta HTTP de um espectador da fonte configurada `nome` (de resolver)
+    def assistir(self, nome):
+        pipeline = self._entrar(nome)
+        try:
+            yield from pipeline.quadros()
+        finally:
+            self._sair(nome)
+
+    # Estatísticas por nome da fonte (o endereço configurado não é exposto: URLs podem ter credenciais)
+    def stats(self):
+        with self._lock:
+            return {nome: dict(p.stats(), source=nome, viewers=self._espectadores.get(nome, 0))
+                    for nome, p in self._pipelines.items()}
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Tensor mínimo com a interface usada pelo app (.cpu().numpy())
+class _Tensor:
+    def __init__(self, valores):
+        self._valores = np.asarray(valores)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._valores
+
+
+# Resultado no formato do ultralytics (boxes.xyxy/conf/cls e speed) com uma detecção no centro da imagem
+class _Resultado:
+    def __init__(self, img):
+        altura, largura = img.shape[:2]
+        self.boxes = type('Caixas', (), {})()
+        self.boxes.xyxy = _Tensor([[largura / 4, altura / 4, largura * 3 / 4, altura * 3 / 4]])
+        self.boxes.conf = _Tensor([0.9])
+        self.boxes.cls = _Tensor([0.0])
+        self.speed = {'preprocess': 1.0, 'inference': 5.0, 'postprocess': 1.0}
+
+
+# Modelo falso: o ultralytics e o best.pt não fazem parte dos testes
+class ModeloFalso:
+    def __init__(self):
+        self.chamadas = 0
+        self.imagens = []  # Imagens recebidas, na ordem das chamadas
+
+    def __call__(self, imagens, **parametros):
+        self.chamadas += 1
+        self.imagens.extend(imagens)
+        return [_Resultado(img) for img in imagens]
+
+
+# App com o modelo falso no lugar do carregado em segundo plano e o cache de resultados vazio
+@pytest.fixture
+def app_teste(monkeypatch):
+    import app as modulo_app
+
+    try:
+        modulo_app.carregador.aguardar(timeout=30)
+    except Exception:
+        pass  # Sem o ultralytics o carregamento falha; o modelo falso entra no lugar
+    modelo = ModeloFalso()
+    monkeypatch.setattr(modulo_app.carregador, '_modelo', modelo)
+    monkeypatch.setattr(modulo_app.carregador, '_class_names', {0: 'capacete'})
+    monkeypatch.setattr(modulo_app.carregador, '_erro', None)
+    modulo_app.cache.clear()
+    modulo_app.app.config['TESTING'] = True
+    return modulo_app, modelo
@@ -0,0 +1,72 @@
+import io
+import threading
+import time
+
+import pytest
+
+from batching import FilaCheia, MicroBatcher, PrazoInviavel
+from test_upload_batch import imagem_codificada
+
+
+# Agrupador com o modelo travado em um pedido e outro esperando na fila (max_queue=1: a fila está cheia)
+@pytest.fixture
+def agrupador_cheio():
+    liberar = threading.Event()
+
+    def inferir(imagens, parametros):
+        liberar.wait(10)
+        return list(imagens)
+
+    agrupador = MicroBatcher(inferir, max_batch_size=1, max_wait_ms=0, max_queue=1)
+    futuros = [agrupador.submit_async('a', prazo=time.perf_counter() + 30)]
+    limite = time.time() + 5
+    while agrupador._tem_pedidos() and time.time() < limite:
+        time.sleep(0.01)  # Espera o modelo pegar o primeiro pedido
+    futuros.append(agrupador.submit_async('b', prazo=time.perf_counter() + 30))
+    yield agrupador
+    liberar.set()
+    assert [f.result(timeout=5) for f in futuros] == ['a', 'b']
+
+
+def test_fila_cheia_recusa_na_hora(agrupador_cheio):
+    for prioridade in ('interactive', 'batch'):
+        with pytest.raises(FilaCheia) as erro:
+            agrupador_cheio.submit_async('c', prioridade=prioridade)
+        assert erro.value.status == 429 and erro.value.retry_after >= 1
+    assert agrupador_cheio.stats()['rejected']['queue_full'] == 2
+
+
+def test_prazo_inviavel_recusa_antes_de_enfileirar():
+    agrupador = MicroBatcher(lambda imagens, parametros: list(imagens), max_wait_ms=50)
+    with pytest.raises(PrazoInviavel) as erro:
+        agrupador.submit_async('a', prazo=time.perf_counter() + 0.001)
+    assert erro.value.status == 503 and erro.value.retry_after >= 1
+    assert agrupador.submit('b', timeout=5) == 'b'
+
+
+def enviar(cliente, **parametros):
+    dados = {'file': (io.BytesIO(imagem_codificada(cor=77)), 'um.jpg')}
+    return cliente.post('/upload', data=dict(dados, **parametros), content_type='multipart/form-data')
+
+
+def test_upload_com_fila_cheia_responde_429(app_teste, agrupador_cheio, monkeypatch):
+    modulo_app, modelo = app_teste
+    monkeypatch.setattr(modulo_app, 'batcher', agrupador_cheio)
+
+    resposta = enviar(modulo_app.app.test_client())
+
+    assert resposta.status_code == 429
+    assert int(resposta.headers['Retry-After']) >= 1
+    assert resposta.get_json()['retry_after'] == int(resposta.headers['Retry-After'])
+    assert modelo.chamadas == 0
+
+
+def test_upload_com_prazo_inviavel_responde_503(app_teste):
+    modulo_app, modelo = app_teste
+
+    resposta = enviar(modulo_app.app.test_client(), deadline_ms='0')
+
+    assert resposta.status_code == 503
+    assert int(resposta.headers['Retry-After']) >= 1
+    assert 'error' in resposta.get_json()
+    assert modelo.chamadas == 0
@@ -0,0 +1,57 @@
+import pytest
+
+from interface_modelo.armazenamento import ArmazemDeteccoes
+
+T0 = 1_699_999_200  # Início de uma hora exata
+
+
+def deteccoes(*classes):
+    return [{'class_id': c, 'confidence': 0.9, 'box': [0, 0, 10, 10]} for c in classes]
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    armazem = ArmazemDeteccoes(str(tmp_path / 'deteccoes.sqlite3'), intervalo_ms=0)
+    armazem.registrar('portao', deteccoes(0, 1), T0 + 10)
+    armazem.registrar('portao', deteccoes(0), T0 + 70)
+    armazem.registrar('portao', deteccoes(1, 1), T0 + 3600 + 5)
+    armazem.registrar('patio', deteccoes(2), T0 + 20)
+    armazem.descarregar()
+    yield armazem
+    armazem.fechar()
+
+
+def test_contagens_por_hora(armazem):
+    janelas = armazem.contagens(T0, T0 + 7200, 3600, fonte='portao')
+    assert janelas == [
+        {'start': T0, 'images': 2, 'counts': {0: 2, 1: 1}},
+        {'start': T0 + 3600, 'images': 1, 'counts': {1: 2}},
+    ]
+    # Todas as fontes, só a classe 1 (o número de imagens continua sendo o da janela)
+    assert armazem.contagens(T0, T0 + 7200, 3600, classes=[1]) == [
+        {'start': T0, 'images': 3, 'counts': {1: 1}},
+        {'start': T0 + 3600, 'images': 1, 'counts': {1: 2}},
+    ]
+    # Um dia inteiro em uma janela só
+    assert armazem.contagens(T0, T0 + 7200, 7200)[0]['counts'] == {0: 2, 1: 3, 2: 1}
+
+
+def test_contagens_por_minuto(armazem):
+    assert armazem.contagens(T0, T0 + 120, 60, fonte='portao') == [
+        {'start': T0, 'images': 1, 'counts': {0: 1, 1: 1}},
+        {'start': T0 + 60, 'images': 1, 'counts': {0: 1}},
+    ]
+
+
+def test_contagens_abaixo_de_um_minuto_usam_as_deteccoes(armazem):
+    assert armazem.contagens(T0, T0 + 120, 30) == [
+        {'start': T0, 'images': None, 'counts': {0: 1, 1: 1, 2: 1}},
+        {'start': T0 + 60, 'images': None, 'counts': {0: 1}},
+    ]
+
+
+def test_fonte_desconhecida_e_stats(armazem):
+    assert armazem.contagens(T0, T0 + 7200, 3600, fonte='nenhuma') == []
+    assert sorted(armazem.fontes()) == ['patio', 'portao']
+    stats = armazem.stats()
+    assert stats['images'] == 4 and stats['written'] == 6 and stats['dropped'] == 0
@@ -0,0 +1,35 @@
+import json
+
+from result_cache import ResultCache
+
+
+def test_imagem_em_disco_nao_usa_extensao_jpg(tmp_path):
+    cache = ResultCache(str(tmp_path / 'best.pt'), disk_dir=str(tmp_path / 'cache'))
+    chave = cache.key(b'dados')
+    webp = b'RIFF\x00\x00\x00\x00WEBPVP8 '
+    cache.put(chave, detections=[], image=webp, encoding={'format': 'webp', 'bytes': len(webp)})
+
+    arquivos = sorted(p.name for p in (tmp_path / 'cache').iterdir())
+    assert arquivos == [chave + '.bin', chave + '.json']
+    with open(tmp_path / 'cache' / (chave + '.json'), encoding='utf-8') as f:
+        assert json.load(f)['encoding']['format'] == 'webp'
+
+    # Um novo processo lê a entrada do disco com a imagem e o formato
+    outro = ResultCache(str(tmp_path / 'best.pt'), disk_dir=str(tmp_path / 'cache'))
+    entrada = outro.get(chave, ('detections', 'image'))
+    assert entrada['image'] == webp
+    assert entrada['encoding']['format'] == 'webp'
+    assert outro.stats()['hits_disk'] == 1
+
+
+def test_imagem_jpg_de_versao_anterior_e_removida(tmp_path):
+    diretorio = tmp_path / 'cache'
+    cache = ResultCache(str(tmp_path / 'best.pt'), disk_dir=str(diretorio))
+    chave = cache.key(b'dados')
+    cache.put(chave, detections=[])
+    (diretorio / (chave + '.jpg')).write_bytes(b'antiga')
+
+    outro = ResultCache(str(tmp_path / 'best.pt'), disk_dir=str(diretorio))
+    assert not (diretorio / (chave + '.jpg')).exists()
+    assert outro.get(chave, ('detections', 'image')) is None
+    assert outro.get(chave)['detections'] == []
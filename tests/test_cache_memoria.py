@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+from PIL import Image
+
+from interface_modelo.cache_memoria import CacheMemoria, chave_arquivo, tamanho_aproximado
+
+
+def array_mb(mb=1):
+    return np.zeros(int(mb * 1024 * 1024), dtype=np.uint8)
+
+
+def test_tamanho_de_arrays_imagens_e_tuplas():
+    assert tamanho_aproximado(np.zeros((10, 20, 3), dtype=np.uint8)) == 600
+    assert tamanho_aproximado(Image.new('RGB', (10, 20))) == 600
+    assert tamanho_aproximado((np.zeros(100, dtype=np.uint8), {'a': np.zeros(50, dtype=np.uint8)})) == 150
+
+
+def test_remove_o_menos_usado_quando_passa_do_limite():
+    cache = CacheMemoria(limite_mb=2.5)
+    cache.guardar('a', array_mb())
+    cache.guardar('b', array_mb())
+    assert cache.obter('a') is not None  # 'a' passa a ser o mais recente
+    cache.guardar('c', array_mb())
+
+    assert cache.obter('b') is None
+    assert cache.obter('a') is not None and cache.obter('c') is not None
+    assert cache.stats() == {'itens': 2, 'bytes': 2 * 1024 * 1024, 'acertos': 3, 'faltas': 1}
+
+
+def test_substituir_e_item_grande_demais_mantem_a_contagem_de_bytes():
+    cache = CacheMemoria(limite_mb=1)
+    cache.guardar('a', np.zeros(1000, dtype=np.uint8))
+    cache.guardar('a', np.zeros(3000, dtype=np.uint8))
+    assert cache.stats()['bytes'] == 3000
+
+    grande = array_mb(2)
+    assert cache.guardar('a', grande) is grande  # Retornado mesmo sem caber no cache
+    assert cache.obter('a') is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_chave_muda_quando_o_arquivo_e_alterado(tmp_path):
+    caminho = tmp_path / 'foto.jpg'
+    caminho.write_bytes(b'um')
+    antes = chave_arquivo(str(caminho))
+    caminho.write_bytes(b'outro conteudo')
+    os.utime(caminho, ns=(0, 10 ** 18))
+
+    assert chave_arquivo(str(caminho)) != antes
+    assert chave_arquivo(str(tmp_path / 'nao-existe.jpg'))[1:] == (None, None)
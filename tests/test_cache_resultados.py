@@ -0,0 +1,26 @@
+import io
+
+from test_upload_batch import imagem_codificada
+
+
+def enviar(cliente, dados):
+    resposta = cliente.post('/upload', data={'file': (io.BytesIO(dados), 'um.jpg')}, content_type='multipart/form-data')
+    assert resposta.status_code == 200
+    return resposta.get_json()
+
+
+def test_acerto_do_cache_nao_repete_os_tempos(app_teste):
+    modulo_app, modelo = app_teste
+    cliente = modulo_app.app.test_client()
+    dados = imagem_codificada(cor=90)
+
+    primeira = enviar(cliente, dados)
+    assert primeira['timing']['cache'] == 'miss'
+    assert 'decode_ms' in primeira['timing'] and 'inference_ms' in primeira['timing']
+    chamadas = modelo.chamadas
+
+    segunda = enviar(cliente, dados)
+    assert modelo.chamadas == chamadas
+    assert segunda['detections'] == primeira['detections']
+    assert set(segunda['timing']) == {'cache', 'lookup_ms'}
+    assert segunda['timing']['cache'] == 'hit'
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from interface_modelo.codificacao import (FormatoInvalido, codificadores_escolhidos, codificar_imagem, limitar_tamanho,
+                                          negociar_formato, normalizar_formato)
+
+
+def test_negociar_formato_com_q():
+    assert negociar_formato('image/webp,image/*;q=0.8', padrao='jpeg') == 'webp'
+    assert negociar_formato('image/png;q=0.5,image/webp;q=0.9', padrao='jpeg') == 'webp'
+    assert negociar_formato('image/webp;q=0,image/png', padrao='webp') == 'png'
+
+
+def test_negociar_formato_curingas():
+    # Sem Accept, só */* ou image/* o formato padrão vence o empate
+    assert negociar_formato(None, padrao='png') == 'png'
+    assert negociar_formato('*/*', padrao='webp') == 'webp'
+    assert negociar_formato('image/*', padrao='jpeg') == 'jpeg'
+    # Tipo exato vale mais que o curinga com o mesmo q
+    assert negociar_formato('*/*,image/png', padrao='jpeg') == 'png'
+    # Nada aceitável: fica o padrão
+    assert negociar_formato('text/html', padrao='jpeg') == 'jpeg'
+
+
+def test_normalizar_formato():
+    assert normalizar_formato(' JPG ') == 'jpeg'
+    assert normalizar_formato('image/png') == 'png'
+    with pytest.raises(FormatoInvalido):
+        normalizar_formato('gif')
+
+
+def test_codificar_imagem_reduz_e_registra_o_codificador(capsys):
+    img = np.zeros((100, 200, 3), dtype=np.uint8)
+    dados, info = codificar_imagem(img, 'png', 85, lado_maximo=50)
+    assert dados.startswith(b'\x89PNG')
+    assert info['size'] == [50, 25] and info['quality'] is None
+    assert codificadores_escolhidos()['png']['encoder'] == info['encoder']
+    assert capsys.readouterr().out == ''  # O benchmark da primeira codificação não escreve na saída
+    assert limitar_tamanho(img, 0)[1] == 1.0
@@ -0,0 +1,66 @@
+import numpy as np
+
+from conftest import _Tensor
+from interface_modelo.fatiamento import gerar_fatias, inferencia_fatiada, nms_por_classe
+
+
+def test_fatias_cobrem_a_imagem_com_sobreposicao():
+    fatias = gerar_fatias(1500, 700, tamanho=640, sobreposicao=0.2)
+
+    assert {(x1, x2) for x1, _, x2, _ in fatias} == {(0, 640), (512, 1152), (860, 1500)}
+    assert {(y1, y2) for _, y1, _, y2 in fatias} == {(0, 640), (60, 700)}
+    cobertura = np.zeros((700, 1500), dtype=bool)
+    for x1, y1, x2, y2 in fatias:
+        cobertura[y1:y2, x1:x2] = True
+    assert cobertura.all()
+
+
+def test_imagem_menor_que_a_fatia_tem_uma_fatia():
+    assert gerar_fatias(300, 200, tamanho=640) == [(0, 0, 300, 200)]
+
+
+def test_nms_mantem_classes_separadas():
+    caixas = np.array([[10, 10, 110, 110], [12, 12, 112, 112], [10, 10, 110, 110], [300, 300, 400, 400]], dtype=np.float32)
+    confs = np.array([0.6, 0.9, 0.8, 0.5], dtype=np.float32)
+    classes = np.array([0, 0, 1, 0])
+
+    mantidos = nms_por_classe(caixas, confs, classes, iou_limite=0.5)
+
+    # A caixa 0 é suprimida pela 1 (mesma classe); a 2 coincide com a 0, mas é de outra classe
+    assert mantidos.tolist() == [1, 2, 3]
+    assert nms_por_classe(np.zeros((0, 4), dtype=np.float32), np.zeros(0), np.zeros(0)).tolist() == []
+
+
+# Resultado de um detector que encontra os pixels claros da imagem (um objeto por imagem, classe 0)
+class _Caixas:
+    def __init__(self, img):
+        ys, xs = np.nonzero(img[..., 0] > 128)
+        caixas = [[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]] if len(xs) else np.zeros((0, 4))
+        self.xyxy = _Tensor(np.asarray(caixas, dtype=np.float32))
+        self.conf = _Tensor(np.full(len(caixas), 0.8, dtype=np.float32))
+        self.cls = _Tensor(np.zeros(len(caixas), dtype=np.float32))
+
+    def __len__(self):
+        return len(self.xyxy.numpy())
+
+
+class _ResultadoClaro:
+    def __init__(self, img):
+        self.boxes = _Caixas(img)
+
+
+def test_objeto_na_sobreposicao_vira_uma_deteccao():
+    img = np.zeros((700, 1500, 3), dtype=np.uint8)
+    img[300:400, 540:620] = 255  # Dentro da sobreposição das duas primeiras fatias em x e das duas em y
+    chamadas = []
+
+    def inferir_lote(imagens):
+        chamadas.append(len(imagens))
+        return [_ResultadoClaro(i) for i in imagens]
+
+    caixas, confs, classes, tempos = inferencia_fatiada(inferir_lote, img, tamanho=640, sobreposicao=0.2, lote=4)
+
+    assert tempos['tiles'] == 6
+    assert chamadas == [4, 3]  # 6 fatias + a imagem inteira, em lotes de 4
+    np.testing.assert_allclose(caixas, [[540, 300, 620, 400]])
+    assert classes.tolist() == [0]
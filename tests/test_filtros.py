@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from interface_modelo.filtros import COMBINACOES, PipelinePreprocessamento, VariantesFiltros
+
+
+# Cadeia original de filtros da interface, um cv2 por etapa (referência do pipeline com a LUT combinada)
+def filtros_originais(img, equalizacao, suavizacao, nitidez, brilho, normalizacao):
+    img = img.copy()
+    if equalizacao:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        for c in range(3):
+            img[:, :, c] = clahe.apply(img[:, :, c])
+    if suavizacao:
+        img = cv2.bilateralFilter(img, 9, 75, 75)
+    if nitidez:
+        img = cv2.filter2D(img, -1, np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]))
+        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
+    if brilho:
+        img = cv2.convertScaleAbs(img, alpha=2, beta=20)
+    if normalizacao:
+        img = cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX)
+    return img
+
+
+# Imagem escura e de baixo contraste (faixa 30..120), para a normalização e o brilho mudarem os valores
+@pytest.fixture(scope='module')
+def imagem():
+    gerador = np.random.default_rng(7)
+    y, x = np.mgrid[0:72, 0:96]
+    base = 30 + (x * 0.6 + y * 0.4)[..., None] + gerador.integers(0, 30, (72, 96, 3))
+    return np.clip(base, 30, 120).astype(np.uint8)
+
+
+@pytest.mark.parametrize('combinacao', COMBINACOES, ids=lambda c: ''.join('1' if o else '0' for o in c))
+def test_pipeline_igual_a_cadeia_original(imagem, combinacao):
+    esperado = filtros_originais(imagem, *combinacao)
+    pipeline = PipelinePreprocessamento(*combinacao)
+
+    np.testing.assert_array_equal(pipeline(imagem), esperado)
+    np.testing.assert_array_equal(pipeline(imagem), esperado)  # Buffers reaproveitados na segunda chamada
+
+
+def test_variantes_iguais_ao_pipeline(imagem):
+    variantes = VariantesFiltros(imagem)
+    for combinacao in COMBINACOES:
+        np.testing.assert_array_equal(variantes(combinacao), PipelinePreprocessamento(*combinacao)(imagem))
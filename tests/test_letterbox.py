@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from interface_modelo.letterbox import Letterbox
+
+CAIXAS = np.array([[0, 0, 50, 40], [120, 30, 399, 299], [10.5, 20.25, 200.75, 100.5]], dtype=np.float32)
+
+
+@pytest.mark.parametrize('largura, altura', [(400, 300), (300, 400), (1280, 720), (64, 64)])
+def test_coordenadas_voltam_para_a_imagem_original(largura, altura):
+    letterbox = Letterbox(tamanho=320)
+    letterbox(np.zeros((altura, largura, 3), dtype=np.uint8), gerar_tensor=False)
+    caixas = CAIXAS * [largura / 400, altura / 300, largura / 400, altura / 300]
+
+    np.testing.assert_allclose(letterbox.para_original(letterbox.para_letterbox(caixas)), caixas, atol=1e-3)
+
+
+def test_caixa_do_letterbox_cai_sobre_o_objeto():
+    img = np.zeros((300, 400, 3), dtype=np.uint8)
+    img[100:200, 40:120] = 255
+    letterbox = Letterbox(tamanho=320)
+    letterbox(img, gerar_tensor=False)
+
+    x1, y1, x2, y2 = letterbox.para_letterbox([40, 100, 120, 200])[0].round().astype(int)
+    assert letterbox.pad == (0, 40)
+    assert (letterbox.imagem[y1 + 1:y2 - 1, x1 + 1:x2 - 1] == 255).all()
+    assert (letterbox.imagem[:40] == 114).all() and (letterbox.imagem[280:] == 114).all()
+
+
+def test_caixas_na_borda_cinza_sao_cortadas_na_imagem():
+    letterbox = Letterbox(tamanho=320)
+    letterbox(np.zeros((300, 400, 3), dtype=np.uint8), gerar_tensor=False)
+
+    np.testing.assert_allclose(letterbox.para_original([[-5, 0, 330, 320]]), [[0, 0, 400, 300]])
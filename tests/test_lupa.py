@@ -0,0 +1,78 @@
+import numpy as np
+
+from interface_modelo.lupa import LupaZoom
+
+
+# Label mínimo: registra os binds e os after agendados, sem abrir janelas
+class LabelFalso:
+    def __init__(self, largura=320, altura=320):
+        self.largura, self.altura = largura, altura
+        self.binds = {}
+        self.agendados = []
+        self.cancelados = []
+
+    def bind(self, evento, funcao):
+        self.binds[evento] = funcao
+
+    def unbind(self, evento):
+        self.binds.pop(evento, None)
+
+    def after(self, ms, funcao):
+        self.agendados.append((ms, funcao))
+        return f'after#{len(self.agendados)}'
+
+    def after_cancel(self, identificador):
+        self.cancelados.append(identificador)
+
+    def winfo_width(self):
+        return self.largura
+
+    def winfo_height(self):
+        return self.altura
+
+
+class Evento:
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+        self.x_root, self.y_root = x, y
+
+
+# Original 640x480 exibido com letterbox em 320x320 (escala 0,5 e 40 px de borda em cima e embaixo)
+def lupa_com_imagem():
+    label = LabelFalso()
+    lupa = LupaZoom(label, zoom_factor=2, zoom_box_size=10)
+    original = np.random.default_rng(3).integers(1, 256, (480, 640, 3), dtype=np.uint8)
+    exibicao = np.zeros((320, 320, 3), dtype=np.uint8)
+    lupa.definir_imagem(exibicao, original=original, escala=0.5, pad=(0, 40))
+    return lupa, label, original
+
+
+def test_ampliada_vem_do_original_e_recorte_centrado_no_mouse():
+    lupa, _, original = lupa_com_imagem()
+
+    assert lupa._ampliada.shape == (480, 640, 3)  # 0,5 * 2 = resolução do original
+    # Ponto (160, 160) da exibição = (320, 240) do original
+    np.testing.assert_array_equal(lupa._recortar(160, 160), original[220:260, 300:340])
+
+
+def test_recorte_na_borda_completa_com_preto():
+    lupa, _, original = lupa_com_imagem()
+
+    recorte = lupa._recortar(0, 40)  # Canto superior esquerdo da área útil
+
+    assert recorte.shape == (40, 40, 3)
+    assert (recorte[:20] == 0).all() and (recorte[:, :20] == 0).all()
+    np.testing.assert_array_equal(recorte[20:, 20:], original[:20, :20])
+
+
+def test_movimentos_agendam_uma_atualizacao_por_intervalo():
+    lupa, label, _ = lupa_com_imagem()
+
+    for x in range(10):
+        label.binds['<Motion>'](Evento(x, 50))
+
+    assert len(label.agendados) == 1 and label.agendados[0][0] == lupa.intervalo_ms
+    assert lupa._evento.x == 9  # Só o último evento é desenhado
+
+    label.binds['<Leave>']()
+    assert label.cancelados == ['after#1'] and lupa._evento is None
@@ -0,0 +1,34 @@
+import io
+
+import cv2
+import numpy as np
+
+from decoding import decodificar_imagem
+
+
+# PNG (sem perdas) todo vermelho, codificado pelo OpenCV a partir de BGR
+def png_vermelho(lado=64):
+    img_bgr = np.zeros((lado, lado, 3), dtype=np.uint8)
+    img_bgr[..., 2] = 255
+    return cv2.imencode('.png', img_bgr)[1].tobytes()
+
+
+def test_decodificar_em_bgr():
+    rgb, _ = decodificar_imagem(png_vermelho())
+    bgr, _ = decodificar_imagem(png_vermelho(), bgr=True)
+    assert rgb[0, 0].tolist() == [255, 0, 0]
+    assert bgr[0, 0].tolist() == [0, 0, 255]
+    assert bgr.flags.c_contiguous and bgr.flags.writeable
+
+
+def test_modelo_recebe_bgr_e_imagem_anotada_mantem_as_cores(app_teste):
+    modulo_app, modelo = app_teste
+    resposta = modulo_app.app.test_client().post(
+        '/process-image?format=png', data={'file': (io.BytesIO(png_vermelho()), 'vermelho.png')},
+        content_type='multipart/form-data')
+    assert resposta.status_code == 200
+
+    # O ultralytics lê arrays NumPy como BGR, igual aos quadros do stream e à interface
+    assert modelo.imagens[-1][0, 0].tolist() == [0, 0, 255]
+    anotada = cv2.imdecode(np.frombuffer(resposta.data, np.uint8), cv2.IMREAD_COLOR)
+    assert anotada[0, 0].tolist() == [0, 0, 255]  # Canto fora da caixa desenhada continua vermelho
@@ -0,0 +1,42 @@
+import pytest
+
+from streaming import FonteNaoPermitida, LimiteStreams, StreamRegistry, ler_fontes
+
+
+def test_ler_fontes_com_e_sem_nome():
+    fontes = ler_fontes('portao=rtsp://camera/stream?canal=1, 0 ,teste=video.mp4')
+    assert fontes == {'portao': 'rtsp://camera/stream?canal=1', '0': '0', 'teste': 'video.mp4'}
+    assert ler_fontes('', padrao='1') == {'1': '1'}
+    # O "=" de uma URL sem nome não vira nome
+    assert ler_fontes('rtsp://camera/stream?canal=1') == {'rtsp://camera/stream?canal=1': 'rtsp://camera/stream?canal=1'}
+
+
+def test_resolver_so_aceita_fontes_configuradas():
+    streams = StreamRegistry(None, None, fontes={'portao': 'rtsp://a', 'patio': 'rtsp://b'})
+    assert streams.resolver(None) == 'portao'
+    assert streams.resolver('patio') == 'patio'
+    assert streams.resolver('1') == 'patio'
+    for pedido in ('2', '/etc/passwd', 'rtsp://a', 'http://169.254.169.254/', '/dev/video0'):
+        with pytest.raises(FonteNaoPermitida):
+            streams.resolver(pedido)
+
+
+class _PipelineAtivo:
+    ativo = True
+
+
+def test_limite_de_pipelines_simultaneos():
+    streams = StreamRegistry(None, None, fontes={'a': '0', 'b': '1'}, maximo=1)
+    streams._pipelines['a'] = _PipelineAtivo()
+    streams.verificar('a')  # Entrar em uma fonte que já está rodando não abre pipeline novo
+    with pytest.raises(LimiteStreams) as erro:
+        streams.verificar('b')
+    assert erro.value.status == 503
+    assert erro.value.retry_after >= 1
+
+
+def test_endpoint_recusa_fonte_nao_configurada(app_teste):
+    modulo_app, _ = app_teste
+    resposta = modulo_app.app.test_client().get('/stream?source=/etc/passwd')
+    assert resposta.status_code == 400
+    assert resposta.get_json()['sources'] == list(modulo_app.streams.fontes)
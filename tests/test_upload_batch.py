@@ -0,0 +1,72 @@
+import io
+import json
+import zipfile
+
+import cv2
+import numpy as np
+
+
+# Função para gerar uma imagem codificada (com um retângulo, para variar entre os arquivos)
+def imagem_codificada(extensao='.jpg', lado=96, cor=200):
+    img = np.full((lado, lado, 3), 40, dtype=np.uint8)
+    cv2.rectangle(img, (lado // 4, lado // 4), (lado * 3 // 4, lado * 3 // 4), (cor, cor, cor), -1)
+    sucesso, dados = cv2.imencode(extensao, img)
+    assert sucesso
+    return dados.tobytes()
+
+
+def zip_com_imagens():
+    saida = io.BytesIO()
+    with zipfile.ZipFile(saida, 'w') as zip_envio:
+        zip_envio.writestr('pasta/a.jpg', imagem_codificada(cor=120))
+        zip_envio.writestr('pasta/b.png', imagem_codificada('.png', cor=160))
+        zip_envio.writestr('pasta/leia-me.txt', 'ignorado')
+    return saida.getvalue()
+
+
+def enviar(cliente, arquivos, **parametros):
+    resposta = cliente.post('/upload-batch', data=dict(parametros, file=arquivos), content_type='multipart/form-data')
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'application/x-ndjson'
+    return [json.loads(linha) for linha in resposta.get_data(as_text=True).splitlines()]
+
+
+def test_upload_batch_com_arquivos_e_zip(app_teste):
+    modulo_app, modelo = app_teste
+    arquivos = [
+        (io.BytesIO(imagem_codificada(cor=220)), 'um.jpg'),
+        (io.BytesIO(imagem_codificada('.png', cor=180)), 'dois.png'),
+        (io.BytesIO(zip_com_imagens()), 'fotos.zip'),
+    ]
+    linhas = enviar(modulo_app.app.test_client(), arquivos)
+
+    resumo = linhas[-1]
+    assert resumo['done'] is True
+    assert resumo['images'] == 4
+    assert resumo['errors'] == 0
+
+    imagens = sorted(linhas[:-1], key=lambda linha: linha['index'])
+    assert [linha['filename'] for linha in imagens] == ['um.jpg', 'dois.png', 'fotos.zip/pasta/a.jpg', 'fotos.zip/pasta/b.png']
+    for linha in imagens:
+        assert linha['image_size'] == [96, 96]
+        assert linha['total'] == 1
+        assert linha['counts'] == {'capacete': 1}
+        assert linha['detections'][0]['box'] == [24.0, 24.0, 72.0, 72.0]
+    assert modelo.chamadas >= 1
+
+
+def test_upload_batch_zip_invalido_e_render(app_teste):
+    modulo_app, _ = app_teste
+    arquivos = [
+        (io.BytesIO(b'nao e um zip'), 'quebrado.zip'),
+        (io.BytesIO(imagem_codificada()), 'um.jpg'),
+    ]
+    linhas = enviar(modulo_app.app.test_client(), arquivos, render='1', format='png')
+
+    assert linhas[-1]['done'] is True
+    assert linhas[-1]['images'] == 2
+    assert linhas[-1]['errors'] == 1
+    por_nome = {linha['filename']: linha for linha in linhas[:-1]}
+    assert 'error' in por_nome['quebrado.zip']
+    assert por_nome['um.jpg']['image_mimetype'] == 'image/png'
+    assert por_nome['um.jpg']['image']
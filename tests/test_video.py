@@ -0,0 +1,72 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from conftest import _Resultado
+from interface_modelo.video import processar_video
+
+
+# Grava um vídeo curto de quadros sólidos com um quadrado se movendo
+@pytest.fixture
+def video_curto(tmp_path):
+    caminho = str(tmp_path / 'entrada.mp4')
+    escritor = cv2.VideoWriter(caminho, cv2.VideoWriter_fourcc(*'mp4v'), 30.0, (96, 64))
+    if not escritor.isOpened():
+        pytest.skip('Codificador mp4v indisponível')
+    for i in range(60):
+        quadro = np.full((64, 96, 3), 40, dtype=np.uint8)
+        cv2.rectangle(quadro, (i, 16), (i + 24, 40), (0, 200, 0), -1)
+        escritor.write(quadro)
+    escritor.release()
+    return caminho
+
+
+# Detector do vídeo: recebe um quadro por chamada
+class DetectorQuadro:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.chamadas = 0
+
+    def __call__(self, quadro, **parametros):
+        self.chamadas += 1
+        if self.falhar:
+            raise RuntimeError('falha na detecção')
+        return [_Resultado(quadro)]
+
+
+def _rodar(modelo, video_curto, tmp_path, tempo_max=10.0):
+    resultado = {}
+
+    def alvo():
+        try:
+            resultado['relatorio'] = processar_video(modelo, {0: 'capacete'}, video_curto, str(tmp_path / 'saida.mp4'),
+                                                     str(tmp_path / 'saida.jsonl'), intervalo=5, tamanho_fila=2)
+        except Exception as e:
+            resultado['erro'] = e
+
+    thread = threading.Thread(target=alvo, daemon=True)
+    thread.start()
+    thread.join(tempo_max)
+    assert not thread.is_alive(), 'processar_video travou'
+    return resultado
+
+
+def test_video_processado_ate_o_fim(video_curto, tmp_path):
+    modelo = DetectorQuadro()
+    resultado = _rodar(modelo, video_curto, tmp_path)
+
+    assert 'erro' not in resultado
+    assert resultado['relatorio']['frames'] == 60
+    assert resultado['relatorio']['inferences'] == modelo.chamadas == 12
+    with open(tmp_path / 'saida.jsonl', encoding='utf-8') as f:
+        assert sum(1 for _ in f) == 60
+
+
+def test_falha_na_deteccao_nao_trava_a_decodificacao(video_curto, tmp_path):
+    # Com a fila de 2 quadros cheia, a decodificação ficaria presa no put se ninguém a avisasse
+    resultado = _rodar(DetectorQuadro(falhar=True), video_curto, tmp_path)
+
+    assert isinstance(resultado.get('erro'), RuntimeError)
+    assert not any(t.name.startswith('video-') for t in threading.enumerate())